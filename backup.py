@@ -0,0 +1,461 @@
+"""
+Online snapshots of the SQLite database, and restore from them.
+
+A snapshot is copied with SQLite's online backup API (sqlite3_backup_step),
+BACKUP_PAGES_PER_STEP pages at a time, while the server keeps serving. In
+WAL mode the copy reads from one read transaction held for the whole
+backup, so it is a consistent image of a single moment and writers never
+wait for it: they append to the WAL while the backup reads the main file.
+(Without that transaction, a commit between two steps would restart the
+copy, and a busy database would never finish.) The copy is then
+gzip-compressed (BACKUP_COMPRESSION_LEVEL) and its SHA-256 recorded in a
+JSON manifest next to it.
+
+Restore verifies the checksum while decompressing into a file beside the
+database and renames it into place, so the database is swapped whole, with
+its indexes, instead of replayed. It needs the server stopped, and refuses
+to replace a database another process has open.
+
+    python backup.py create
+    python backup.py list
+    python backup.py verify inventory-20240101T120000Z
+    python backup.py restore inventory-20240101T120000Z
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import count
+from pathlib import Path
+from typing import Callable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows runs a single process
+    fcntl = None
+
+from database import SQLITE_PRAGMAS, database_file
+
+logger = logging.getLogger(__name__)
+
+# Where snapshots go; by default a "backups" directory next to the database
+BACKUP_DIR = os.getenv("BACKUP_DIR")
+
+# Pages copied per backup step (4 MiB at SQLite's default 4 KiB page size)
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", 1024))
+
+# Seconds to pause between steps, leaving disk bandwidth to the server
+BACKUP_STEP_SLEEP = float(os.getenv("BACKUP_STEP_SLEEP", 0.01))
+
+# gzip level for snapshots; 0 stores them uncompressed
+BACKUP_COMPRESSION_LEVEL = int(os.getenv("BACKUP_COMPRESSION_LEVEL", 1))
+
+# Newest snapshots kept after each backup; 0 keeps them all
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", 7))
+
+# Outside WAL mode every commit restarts the copy; give up after this many
+BACKUP_MAX_RESTARTS = 10
+
+CHUNK_SIZE = 1024 * 1024
+
+class BackupError(Exception):
+    """A snapshot could not be taken, verified or restored"""
+
+class BackupInProgress(BackupError):
+    """Another backup of the same database is running"""
+
+def backup_dir(database: Optional[str] = None) -> Path:
+    """The snapshot directory for database (the configured database by default)"""
+    if BACKUP_DIR:
+        return Path(BACKUP_DIR)
+    database = database or database_file()
+    if database is None:
+        raise BackupError("Snapshots need a SQLite database file; back up PostgreSQL with pg_dump")
+    return Path(database).parent / "backups"
+
+@contextmanager
+def _backup_lock(directory: Path):
+    """Exclusive lock on the snapshot directory, held across threads and processes"""
+    if fcntl is None:
+        yield
+        return
+    with open(directory / ".backup.lock", "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise BackupInProgress("A backup is already running")
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def _fsync_dir(directory: Path):
+    """Make a rename in directory durable"""
+    if os.name == "nt":  # pragma: no cover - directories can't be opened on Windows
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _copy_database(source: str, target: Path, pages_per_step: int, step_sleep: float,
+                   progress: Optional[Callable[[int, int], None]]) -> dict:
+    """Copy source to target with the backup API, returning page counts and steps"""
+    src = sqlite3.connect(f"file:{source}?mode=ro", uri=True, isolation_level=None,
+                          timeout=SQLITE_PRAGMAS["busy_timeout"] / 1000)
+    dst = sqlite3.connect(target, isolation_level=None)
+    stats = {"steps": 0, "restarts": 0, "remaining": None, "pages": 0}
+
+    def step(status, remaining, total):
+        if stats["remaining"] is not None and remaining > stats["remaining"]:
+            stats["restarts"] += 1
+            if stats["restarts"] > BACKUP_MAX_RESTARTS:
+                raise BackupError(
+                    f"The database changed under the backup {stats['restarts']} times; "
+                    "use WAL mode to back up while it is being written"
+                )
+        stats.update(steps=stats["steps"] + 1, remaining=remaining, pages=total)
+        if progress is not None:
+            progress(total - remaining, total)
+        if step_sleep and remaining:
+            time.sleep(step_sleep)
+
+    try:
+        wal = src.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        if wal:
+            # Every step reads this one snapshot; commits go to the WAL meanwhile
+            src.execute("BEGIN")
+            src.execute("SELECT 1 FROM sqlite_master LIMIT 1")
+        src.backup(dst, pages=pages_per_step, progress=step)
+        if wal:
+            src.execute("COMMIT")
+        # A self-contained file: no -wal to carry along with it
+        dst.execute("PRAGMA journal_mode = DELETE")
+        stats["page_size"] = dst.execute("PRAGMA page_size").fetchone()[0]
+        stats["pages"] = dst.execute("PRAGMA page_count").fetchone()[0]
+        try:
+            stats["items_version"] = dst.execute(
+                "SELECT version FROM table_versions WHERE name = 'items'"
+            ).fetchone()[0]
+        except (sqlite3.Error, TypeError):
+            stats["items_version"] = None
+    finally:
+        src.close()
+        dst.close()
+    return stats
+
+def _quick_check(path: Path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        result = conn.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        conn.close()
+    if result != "ok":
+        raise BackupError(f"{path.name} failed its integrity check: {result}")
+
+def _store(raw: Path, target: Path, level: int) -> str:
+    """Write raw to target, gzip-compressed unless level is 0, returning the stored file's SHA-256"""
+    digest = hashlib.sha256()
+
+    class HashingWriter:
+        def __init__(self, file):
+            self.file = file
+
+        def write(self, data):
+            digest.update(data)
+            return self.file.write(data)
+
+        def flush(self):
+            self.file.flush()
+
+    with open(raw, "rb") as source, open(target, "wb") as stored:
+        writer = HashingWriter(stored)
+        if level:
+            # No file name or time in the header, so equal databases give equal snapshots
+            with gzip.GzipFile(filename="", mode="wb", compresslevel=level, fileobj=writer, mtime=0) as out:
+                while chunk := source.read(CHUNK_SIZE):
+                    out.write(chunk)
+        else:
+            while chunk := source.read(CHUNK_SIZE):
+                writer.write(chunk)
+        stored.flush()
+        os.fsync(stored.fileno())
+    return digest.hexdigest()
+
+def create_snapshot(database: Optional[str] = None, directory: Optional[Path] = None,
+                    pages_per_step: int = BACKUP_PAGES_PER_STEP, step_sleep: float = BACKUP_STEP_SLEEP,
+                    level: int = BACKUP_COMPRESSION_LEVEL, keep: int = BACKUP_KEEP, check: bool = False,
+                    progress: Optional[Callable[[int, int], None]] = None) -> dict:
+    """Take a snapshot of the live database and return its manifest.
+
+    With check=True the copy is run through PRAGMA quick_check before it is
+    compressed. progress, if given, is called with (pages copied, total
+    pages) after every step. Snapshots beyond the newest keep are deleted.
+    """
+    database = database or database_file()
+    if database is None:
+        raise BackupError("Snapshots need a SQLite database file; back up PostgreSQL with pg_dump")
+    if not os.path.exists(database):
+        raise BackupError(f"Database {database} does not exist")
+    directory = Path(directory) if directory else backup_dir(database)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    with _backup_lock(directory):
+        created = datetime.now(timezone.utc)
+        name = stem = f"{Path(database).stem}-{created.strftime('%Y%m%dT%H%M%S')}Z"
+        for n in count(2):
+            if not (directory / f"{name}.json").exists():
+                break
+            name = f"{stem}-{n}"
+        file = f"{name}.db.gz" if level else f"{name}.db"
+        raw = directory / f"{name}.copy"
+        partial = directory / f"{file}.partial"
+        try:
+            start = time.perf_counter()
+            stats = _copy_database(database, raw, pages_per_step, step_sleep, progress)
+            copy_seconds = time.perf_counter() - start
+            if check:
+                _quick_check(raw)
+            start = time.perf_counter()
+            sha256 = _store(raw, partial, level)
+            store_seconds = time.perf_counter() - start
+            size = raw.stat().st_size
+            os.replace(partial, directory / file)
+        finally:
+            raw.unlink(missing_ok=True)
+            partial.unlink(missing_ok=True)
+
+        manifest = {
+            "name": name,
+            "file": file,
+            "created_at": created.isoformat(),
+            "compression": "gzip" if level else "none",
+            "size": size,
+            "stored_size": (directory / file).stat().st_size,
+            "sha256": sha256,
+            "page_size": stats["page_size"],
+            "pages": stats["pages"],
+            "items_version": stats["items_version"],
+            "steps": stats["steps"],
+            "restarts": stats["restarts"],
+            "copy_seconds": round(copy_seconds, 3),
+            "compress_seconds": round(store_seconds, 3),
+        }
+        (directory / f"{name}.json").write_text(json.dumps(manifest, indent=2))
+        _fsync_dir(directory)
+        logger.info(
+            f"Backed up {size / 1e6:.1f} MB to {file} ({manifest['stored_size'] / 1e6:.1f} MB) "
+            f"in {copy_seconds:.1f}s copy + {store_seconds:.1f}s compress"
+        )
+        if keep:
+            prune_snapshots(directory, keep)
+    return manifest
+
+def list_snapshots(directory: Optional[Path] = None) -> List[dict]:
+    """Manifests of the snapshots in directory, newest first"""
+    directory = Path(directory) if directory else backup_dir()
+    if not directory.is_dir():
+        return []
+    manifests = []
+    for path in directory.glob("*.json"):
+        try:
+            manifest = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        if (directory / manifest.get("file", "")).is_file():
+            manifests.append(manifest)
+    return sorted(manifests, key=lambda manifest: manifest["created_at"], reverse=True)
+
+def prune_snapshots(directory: Path, keep: int) -> List[str]:
+    """Delete all but the newest keep snapshots, returning the names deleted"""
+    deleted = []
+    for manifest in list_snapshots(directory)[keep:]:
+        (directory / manifest["file"]).unlink(missing_ok=True)
+        (directory / f"{manifest['name']}.json").unlink(missing_ok=True)
+        deleted.append(manifest["name"])
+    if deleted:
+        logger.info(f"Deleted old snapshots: {', '.join(deleted)}")
+    return deleted
+
+def find_snapshot(name: str, directory: Optional[Path] = None) -> dict:
+    """The manifest of a snapshot given by name (or by manifest or snapshot path)"""
+    path = Path(name)
+    if path.suffix == ".json" and path.is_file():
+        manifest, directory = json.loads(path.read_text()), path.parent
+    else:
+        directory = Path(directory) if directory else (path.parent if path.parent != Path(".") else backup_dir())
+        stem = path.name.removesuffix(".gz").removesuffix(".db")
+        manifest_path = directory / f"{stem}.json"
+        if not manifest_path.is_file():
+            raise BackupError(f"No snapshot named {stem} in {directory}")
+        manifest = json.loads(manifest_path.read_text())
+    manifest["path"] = str(directory / manifest["file"])
+    return manifest
+
+def _read_verified(manifest: dict, sink: Optional[Callable[[bytes], None]] = None) -> int:
+    """Stream a snapshot's contents to sink, checking its SHA-256 on the way.
+
+    Raises BackupError if the stored file or its gzip stream is damaged;
+    sink has then seen data that must be thrown away.
+    """
+    digest = hashlib.sha256()
+
+    class HashingReader:
+        def __init__(self, file):
+            self.file = file
+
+        def read(self, size=-1):
+            data = self.file.read(size)
+            digest.update(data)
+            return data
+
+    size = 0
+    try:
+        with open(manifest["path"], "rb") as stored:
+            reader = HashingReader(stored)
+            source = gzip.GzipFile(fileobj=reader, mode="rb") if manifest["compression"] == "gzip" else reader
+            while chunk := source.read(CHUNK_SIZE):
+                size += len(chunk)
+                if sink is not None:
+                    sink(chunk)
+            # Hash anything the decompressor left unread
+            while reader.read(CHUNK_SIZE):
+                pass
+    except (OSError, EOFError, gzip.BadGzipFile) as e:
+        raise BackupError(f"Snapshot {manifest['name']} is damaged: {e}")
+    if digest.hexdigest() != manifest["sha256"]:
+        raise BackupError(f"Snapshot {manifest['name']} does not match its checksum")
+    if size != manifest["size"]:
+        raise BackupError(f"Snapshot {manifest['name']} holds {size} bytes, expected {manifest['size']}")
+    return size
+
+def verify_snapshot(name: str, directory: Optional[Path] = None) -> dict:
+    """Check a snapshot against its manifest without restoring it"""
+    manifest = find_snapshot(name, directory)
+    _read_verified(manifest)
+    return manifest
+
+def _check_not_in_use(database: str):
+    """Raise BackupError if another connection has database open.
+
+    SQLite only leaves WAL mode with exclusive access, and switching also
+    checkpoints the WAL into the file and deletes it.
+    """
+    conn = sqlite3.connect(database, timeout=0)
+    try:
+        mode = conn.execute("PRAGMA journal_mode = DELETE").fetchone()[0]
+    except sqlite3.OperationalError as e:
+        raise BackupError(f"Database {database} is in use ({e}); stop the server before restoring")
+    finally:
+        conn.close()
+    if mode != "delete":
+        raise BackupError(f"Database {database} is in use; stop the server before restoring")
+
+def _reset_versions(path: Path):
+    """Start the restored database's change counters afresh, as a new database
+    would, so it doesn't hand out versions (and ETags) already used for
+    changes made after the snapshot"""
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.execute("UPDATE table_versions SET version = abs(random() % 1000000000000)")
+    except sqlite3.OperationalError:
+        pass  # A database from before table_versions existed
+    finally:
+        conn.close()
+
+def restore_snapshot(name: str, database: Optional[str] = None, directory: Optional[Path] = None,
+                     check: bool = False) -> dict:
+    """Replace the database with a snapshot, returning the snapshot's manifest and timings.
+
+    The snapshot is verified while it is decompressed next to the database,
+    and only then renamed over it, so a damaged snapshot leaves the database
+    untouched. With check=True the restored file also passes PRAGMA
+    quick_check first.
+    """
+    database = database or database_file()
+    if database is None:
+        raise BackupError("Restore needs a SQLite database file")
+    manifest = find_snapshot(name, directory)
+    target = Path(database)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(f"{target.name}.restoring")
+
+    start = time.perf_counter()
+    try:
+        with open(partial, "wb") as out:
+            _read_verified(manifest, out.write)
+            out.flush()
+            os.fsync(out.fileno())
+        if check:
+            _quick_check(partial)
+        _reset_versions(partial)
+        if target.exists():
+            _check_not_in_use(database)
+        for suffix in ("-wal", "-shm", "-journal"):
+            Path(f"{database}{suffix}").unlink(missing_ok=True)
+        os.replace(partial, target)
+        _fsync_dir(target.parent)
+    finally:
+        partial.unlink(missing_ok=True)
+    manifest["restore_seconds"] = round(time.perf_counter() - start, 3)
+    logger.info(f"Restored {database} from {manifest['file']} in {manifest['restore_seconds']}s")
+    return manifest
+
+def _print_progress(copied: int, total: int):
+    print(f"\r  {copied}/{total} pages ({copied * 100 // max(total, 1)}%)", end="", file=sys.stderr, flush=True)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Snapshot and restore the inventory database")
+    parser.add_argument("--database", help="SQLite database file (default: from DATABASE_URL)")
+    parser.add_argument("--dir", help="Snapshot directory (default: BACKUP_DIR, or backups/ next to the database)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="Take a snapshot while the server is running")
+    create.add_argument("--check", action="store_true", help="Run PRAGMA quick_check on the copy first")
+    create.add_argument("--level", type=int, default=BACKUP_COMPRESSION_LEVEL, help="gzip level, 0 for none")
+    create.add_argument("--keep", type=int, default=BACKUP_KEEP, help="Newest snapshots to keep, 0 for all")
+    commands.add_parser("list", help="List snapshots, newest first")
+    verify = commands.add_parser("verify", help="Check a snapshot against its checksum")
+    verify.add_argument("name")
+    restore = commands.add_parser("restore", help="Replace the database with a snapshot (server stopped)")
+    restore.add_argument("name")
+    restore.add_argument("--check", action="store_true", help="Run PRAGMA quick_check before swapping it in")
+    args = parser.parse_args(argv)
+
+    directory = Path(args.dir) if args.dir else None
+    try:
+        if args.command == "create":
+            manifest = create_snapshot(args.database, directory, level=args.level, keep=args.keep,
+                                       check=args.check, progress=_print_progress)
+            print(file=sys.stderr)
+            print(f"Created {manifest['file']}: {manifest['size'] / 1e6:.1f} MB -> "
+                  f"{manifest['stored_size'] / 1e6:.1f} MB in "
+                  f"{manifest['copy_seconds'] + manifest['compress_seconds']:.1f}s")
+        elif args.command == "list":
+            if directory is None and args.database:
+                directory = backup_dir(args.database)
+            for manifest in list_snapshots(directory):
+                print(f"{manifest['name']}  {manifest['created_at']}  {manifest['stored_size'] / 1e6:9.1f} MB  "
+                      f"items version {manifest['items_version']}")
+        elif args.command == "verify":
+            manifest = verify_snapshot(args.name, directory)
+            print(f"{manifest['file']} matches its checksum")
+        elif args.command == "restore":
+            manifest = restore_snapshot(args.name, args.database, directory, check=args.check)
+            print(f"Restored {manifest['file']} in {manifest['restore_seconds']:.1f}s")
+    except BackupError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Minimal in-process HTTP driver for ASGI apps, used by the load benchmarks
+"""
+
+import asyncio
+import json
+import statistics
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+async def request(app, method: str, url: str, body=None,
+                  headers: Optional[dict] = None) -> Tuple[int, dict, bytes]:
+    """Send one request straight into the ASGI app and return (status, headers, body)"""
+    parts = urlsplit(url)
+    raw_headers = [(b"host", b"bench")]
+    if body is not None and not isinstance(body, bytes):
+        body = json.dumps(body).encode()
+        raw_headers.append((b"content-type", b"application/json"))
+    for name, value in (headers or {}).items():
+        raw_headers.append((name.lower().encode(), value.encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": parts.path,
+        "raw_path": parts.path.encode(),
+        "query_string": parts.query.encode(),
+        "headers": raw_headers,
+        "server": ("bench", 80),
+        "client": ("127.0.0.1", 50000),
+    }
+    sent = False
+    # Streaming responses watch receive() for a disconnect, so only report
+    # one once the whole response has been read
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body or b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    response = {"status": 0, "headers": {}, "body": []}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {
+                name.decode().lower(): value.decode() for name, value in message.get("headers", [])
+            }
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        finished.set()
+    return response["status"], response["headers"], b"".join(response["body"])
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def summarize(latencies_ms, elapsed: float, errors: int = 0) -> dict:
+    """Throughput and latency percentiles for a list of request latencies"""
+    latencies = sorted(latencies_ms)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+    }
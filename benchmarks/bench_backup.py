@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Snapshot and restore timings for backup.py on a generated catalog.
+
+Item writes run against the app first on their own, then while a snapshot
+is copied and while it is compressed, so the latency lines show what each
+phase of a backup costs the server.
+Then the snapshot is verified and restored over the (closed) database.
+A multi-GB catalog takes a while to build the first time:
+
+    python benchmarks/bench_backup.py --rows 3000000
+    python benchmarks/bench_backup.py --rows 3000000 --level 0 --pages 4096
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import harness
+from harness import HTTP_SCENARIOS, Workload, add_backend_arguments, cached_database, reset_database
+from asgi_client import request, summarize
+
+import database
+from backup import (
+    BACKUP_COMPRESSION_LEVEL, BACKUP_PAGES_PER_STEP, BACKUP_STEP_SLEEP, create_snapshot, restore_snapshot,
+    verify_snapshot
+)
+
+# scenario name -> relative weight, as in bench_group_commit.py
+WRITE_MIX = {"update_item": 80, "create_item": 20}
+
+async def drive(app, workload: Workload, concurrency: int, until) -> dict:
+    """Run closed-loop writers over WRITE_MIX until until() is true"""
+    names, weights = list(WRITE_MIX), list(WRITE_MIX.values())
+    latencies = []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        while not until():
+            method, _, make_request, expected, _ = HTTP_SCENARIOS[workload.rng.choices(names, weights)[0]]
+            url, body = make_request(workload)
+            began = time.perf_counter()
+            status, _, _ = await request(app, method, url, body)
+            latencies.append((time.perf_counter() - began) * 1000)
+            if status != expected:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+def report(label: str, stats: dict):
+    print(
+        f"{label:<22} {stats['throughput_rps']:>8.1f} writes/s  p50 {stats['p50_ms']:7.2f} ms  "
+        f"p95 {stats['p95_ms']:7.2f} ms  p99 {stats['p99_ms']:8.2f} ms  errors {stats['errors']}",
+        flush=True
+    )
+
+def rate(size: int, seconds: float) -> str:
+    return f"{seconds:7.1f}s  {size / 1e6 / max(seconds, 1e-9):7.1f} MB/s"
+
+async def main(args):
+    from main import app
+
+    if database.DATABASE_BACKEND != "sqlite":
+        raise SystemExit("Snapshots are SQLite only; PostgreSQL is backed up with pg_dump")
+    logging.disable(logging.WARNING)
+    backups = Path(harness.WORK_DIR) / "backups"
+    try:
+        source = cached_database(Path(args.data_dir), args.rows, args.rebuild)
+        size = os.path.getsize(source)
+        print(f"{args.rows} items, {size / 1e9:.2f} GB; pages per step {args.pages}, "
+              f"step sleep {args.step_sleep * 1000:g} ms, gzip level {args.level}", flush=True)
+
+        start = time.perf_counter()
+        shutil.copyfile(source, harness.DB_PATH)
+        print(f"{'file copy (reference)':<22} {rate(size, time.perf_counter() - start)}", flush=True)
+
+        await reset_database(source)
+        database.create_tables()
+        workload = Workload(args.rows)
+        deadline = time.perf_counter() + args.duration
+        report("writes alone", await drive(app, workload, args.concurrency, lambda: time.perf_counter() > deadline))
+
+        copied = threading.Event()
+        snapshot = asyncio.create_task(asyncio.to_thread(
+            create_snapshot, harness.DB_PATH, backups, args.pages, args.step_sleep, args.level, 0,
+            progress=lambda done, total: done == total and copied.set()
+        ))
+        report("writes during copy", await drive(
+            app, workload, args.concurrency, lambda: copied.is_set() or snapshot.done()
+        ))
+        report("writes during compress", await drive(app, workload, args.concurrency, snapshot.done))
+        manifest = await snapshot
+
+        print(f"{'backup copy':<22} {rate(manifest['size'], manifest['copy_seconds'])}  "
+              f"{manifest['steps']} steps, {manifest['restarts']} restarts")
+        print(f"{'compress' if args.level else 'store':<22} {rate(manifest['size'], manifest['compress_seconds'])}  "
+              f"{manifest['stored_size'] / 1e6:.0f} MB stored ({manifest['size'] / manifest['stored_size']:.1f}x)")
+        start = time.perf_counter()
+        verify_snapshot(manifest["name"], backups)
+        print(f"{'verify':<22} {rate(manifest['size'], time.perf_counter() - start)}")
+
+        await database.async_engine.dispose()
+        await database.async_read_engine.dispose()
+        database.engine.dispose()
+        database.read_engine.dispose()
+        restored = restore_snapshot(manifest["name"], harness.DB_PATH, backups)
+        print(f"{'restore':<22} {rate(manifest['size'], restored['restore_seconds'])}")
+        conn = sqlite3.connect(harness.DB_PATH)
+        try:
+            items = conn.execute("SELECT count(*) FROM items").fetchone()[0]
+        finally:
+            conn.close()
+        print(f"restored database holds {items} items", flush=True)
+    finally:
+        await database.async_engine.dispose()
+        await database.async_read_engine.dispose()
+        database.engine.dispose()
+        database.read_engine.dispose()
+        shutil.rmtree(harness.WORK_DIR, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time snapshots and restores of a generated catalog")
+    parser.add_argument("--rows", type=int, default=100000, help="Catalog size")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of writes before the backup")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent writers")
+    parser.add_argument("--pages", type=int, default=BACKUP_PAGES_PER_STEP, help="Pages copied per backup step")
+    parser.add_argument("--step-sleep", type=float, default=BACKUP_STEP_SLEEP, help="Seconds between backup steps")
+    parser.add_argument("--level", type=int, default=BACKUP_COMPRESSION_LEVEL, help="gzip level, 0 for none")
+    add_backend_arguments(parser)
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate the cached database")
+    args = parser.parse_args()
+    asyncio.run(main(args))
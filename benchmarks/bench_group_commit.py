@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Item write throughput with and without group commit (writes.py).
+
+Closed-loop clients send a mix of item updates and creates straight into the
+app, once with every request committing its own transaction and once through
+the write pipeline, at each concurrency level. Commits cost the most when
+each one is an fsync, so compare SQLite's synchronous settings too:
+
+    python benchmarks/bench_group_commit.py --concurrency 1 8 32 128
+    python benchmarks/bench_group_commit.py --synchronous FULL
+    python benchmarks/bench_group_commit.py --backend postgresql
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+
+# Must be set before harness creates the app's engines
+_pragma_parser = argparse.ArgumentParser(add_help=False)
+_pragma_parser.add_argument("--synchronous")
+if _pragma_parser.parse_known_args()[0].synchronous:
+    os.environ["SQLITE_SYNCHRONOUS"] = _pragma_parser.parse_known_args()[0].synchronous
+
+import harness
+from harness import HTTP_SCENARIOS, Workload, add_backend_arguments, cached_database, reset_database
+from asgi_client import request, summarize
+
+import database
+from writes import write_pipeline
+
+# scenario name -> relative weight: mostly scanner quantity updates
+WRITE_MIX = {"update_item": 80, "create_item": 20}
+
+async def drive(app, workload: Workload, duration: float, concurrency: int) -> dict:
+    """Run closed-loop clients over WRITE_MIX for a fixed time"""
+    names, weights = list(WRITE_MIX), list(WRITE_MIX.values())
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            method, _, make_request, expected, _ = HTTP_SCENARIOS[workload.rng.choices(names, weights)[0]]
+            url, body = make_request(workload)
+            began = time.perf_counter()
+            status, _, _ = await request(app, method, url, body)
+            latencies.append((time.perf_counter() - began) * 1000)
+            if status != expected:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+async def main(args):
+    from main import app
+
+    logging.disable(logging.WARNING)
+    if database.DATABASE_BACKEND == "sqlite":
+        print(f"SQLite synchronous={database.SQLITE_PRAGMAS['synchronous']}")
+    try:
+        source = cached_database(Path(args.data_dir), args.rows, args.rebuild)
+        for concurrency in args.concurrency:
+            for mode in ("direct", "pipeline"):
+                await reset_database(source)
+                database.create_tables()
+                commits = -write_pipeline.batches
+                if mode == "pipeline":
+                    write_pipeline.start()
+                try:
+                    stats = await drive(app, Workload(args.rows), args.duration, concurrency)
+                finally:
+                    await write_pipeline.close()
+                commits = commits + write_pipeline.batches if mode == "pipeline" else stats["requests"]
+                print(
+                    f"{mode:<9} {concurrency:>4} clients {stats['throughput_rps']:>9.1f} writes/s  "
+                    f"p50 {stats['p50_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms  "
+                    f"{stats['requests'] / max(commits, 1):6.1f} writes/commit  errors {stats['errors']}",
+                    flush=True
+                )
+    finally:
+        await database.async_engine.dispose()
+        await database.async_read_engine.dispose()
+        database.engine.dispose()
+        database.read_engine.dispose()
+        shutil.rmtree(harness.WORK_DIR, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare item write throughput with and without group commit")
+    parser.add_argument("--rows", type=int, default=10000, help="Catalog size")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128], help="Concurrent clients")
+    parser.add_argument("--synchronous", help="SQLite synchronous pragma for the run (default SQLITE_SYNCHRONOUS)")
+    add_backend_arguments(parser)
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate the cached database")
+    args = parser.parse_args()
+    asyncio.run(main(args))
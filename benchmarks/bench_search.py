@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Search benchmark: FTS5 index vs LIKE scan for ItemCRUD.search_items
+"""
+
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from crud import ItemCRUD
+from datagen import build_database
+
+# Mix of keystroke prefixes, full words, SKU fragments and misses
+SEARCH_TERMS = ["la", "lapt", "laptop", "logitech mouse", "KEYLO", "wireless pro", "zzz"]
+
+def time_search(session, search, terms, repeat):
+    """Return per-call latencies in milliseconds"""
+    latencies = []
+    for _ in range(repeat):
+        for term in terms:
+            start = time.perf_counter()
+            search(session, term, 1, 50)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def run(sizes, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            engine = build_database(f"{tmp}/search_{size}.db", size)
+            session = sessionmaker(bind=engine)()
+            try:
+                for label, search in (
+                    ("fts5", ItemCRUD.search_items),
+                    ("like", ItemCRUD._search_items_like),
+                ):
+                    latencies = time_search(session, search, SEARCH_TERMS, repeat)
+                    latencies.sort()
+                    print(
+                        f"{size:>9} rows  {label:<5} "
+                        f"median {statistics.median(latencies):8.2f} ms  "
+                        f"p95 {latencies[int(len(latencies) * 0.95) - 1]:8.2f} ms"
+                    )
+            finally:
+                session.close()
+                engine.dispose()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare FTS5 and LIKE search")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    run(args.sizes, args.repeat)
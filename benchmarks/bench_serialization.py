@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+List-endpoint serialization benchmark: ORM + double Pydantic validation vs
+column-projected rows encoded straight to JSON bytes.
+"""
+
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from crud import ItemCRUD
+from database import Item
+from datagen import build_database
+from models import ItemListResponse
+from serialization import dumps, item_list_payload
+
+def legacy_page(session, page: int, per_page: int) -> bytes:
+    """What the list routes did before: ORM objects, ItemListResponse, then
+    FastAPI's response_model pass (dump, re-validate, dump, json.dumps)"""
+    total = session.query(Item).count()
+    items = session.query(Item).order_by(Item.id).offset((page - 1) * per_page).limit(per_page).all()
+    model = ItemListResponse(
+        items=items, total=total, page=page, per_page=per_page,
+        total_pages=(total + per_page - 1) // per_page
+    )
+    validated = ItemListResponse.model_validate(model.model_dump())
+    return json.dumps(
+        jsonable_encoder(validated.model_dump(mode="json")), ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+def fast_page(session, page: int, per_page: int) -> bytes:
+    """The current path: projected rows encoded once"""
+    return dumps(item_list_payload(ItemCRUD.get_all_paginated(session, page, per_page)))
+
+def measure(fn, session, per_page: int, repeat: int):
+    latencies = []
+    for i in range(repeat):
+        session.expunge_all()
+        start = time.perf_counter()
+        fn(session, 1 + i % 20, per_page)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def run(rows: int, per_page: int, repeat: int) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_database(f"{tmp}/serialize.db", rows)
+        session = sessionmaker(bind=engine)()
+        try:
+            # Both paths must produce the same document
+            if json.loads(legacy_page(session, 2, per_page))["items"] != \
+                    json.loads(fast_page(session, 2, per_page))["items"]:
+                raise AssertionError("Serialization paths disagree")
+            for label, fn in (("orm+pydantic", legacy_page), ("rows+json", fast_page)):
+                measure(fn, session, per_page, 5)  # warm up
+                latencies = sorted(measure(fn, session, per_page, repeat))
+                result = {
+                    "path": label,
+                    "rows": rows,
+                    "per_page": per_page,
+                    "median_ms": round(statistics.median(latencies), 3),
+                    "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+                }
+                results.append(result)
+                print(f"{label:<13} {per_page} rows/page  median {result['median_ms']:7.3f} ms  "
+                      f"p95 {result['p95_ms']:7.3f} ms")
+        finally:
+            session.close()
+            engine.dispose()
+    return results
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare list serialization paths")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.per_page, args.repeat)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
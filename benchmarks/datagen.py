@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Synthetic inventory data for Tuari Inventory benchmarks
+"""
+
+import random
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert, make_url, text, update
+from sqlalchemy.orm import Session
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import postgres
+from database import Base, Item, Location, LocationStock, LOCATION_KINDS, create_tables
+
+# Bumped whenever generated databases change shape, so cached copies get rebuilt
+DATASET_VERSION = 6
+
+CATEGORIES = [
+    "Electronics", "Accessories", "Storage", "Networking", "Office",
+    "Furniture", "Audio", "Cables", "Tools", "Lighting",
+]
+BRANDS = ["Apple", "Dell", "Samsung", "Logitech", "Anker", "Corsair", "LG", "JBL", "Sony", "Lenovo"]
+PRODUCTS = [
+    "Laptop", "Monitor", "Keyboard", "Mouse", "Headset", "Speaker", "Cable",
+    "Charger", "Router", "Switch", "Webcam", "Tablet", "Stand", "Lamp", "Drive",
+]
+ADJECTIVES = ["Pro", "Ultra", "Mini", "Max", "Wireless", "Portable", "Gaming", "Slim", "Plus", "Air"]
+
+def generate_items(count: int, seed: int = 42):
+    """Yield item rows with a skewed category mix and unique SKUs"""
+    rng = random.Random(seed)
+    # Zipf-like weights: a few categories hold most of the catalog
+    weights = [1.0 / (rank + 1) for rank in range(len(CATEGORIES))]
+    for i in range(count):
+        brand = rng.choice(BRANDS)
+        product = rng.choice(PRODUCTS)
+        adjective = rng.choice(ADJECTIVES)
+        yield {
+            "name": f"{brand} {product} {adjective} {rng.randint(1, 999)}",
+            "category": rng.choices(CATEGORIES, weights)[0],
+            "sku": f"{product[:3].upper()}{brand[:2].upper()}-{i:08d}",
+            "description": f"{brand} {adjective.lower()} {product.lower()} model {rng.randint(100, 9999)}",
+            "quantity": int(rng.expovariate(1 / 40)),
+            "price": round(rng.lognormvariate(4, 1), 2),
+            "location": f"Warehouse {rng.choice('ABCD')} - Shelf {rng.randint(1, 50)}",
+        }
+
+# Items are stocked on the shelves their location string names, ten shelves to
+# an aisle; some have part of their stock on a second shelf somewhere else.
+# Half of each item's stock is shelved, up to MAX_SHELVED units so the
+# benchmarks' quantity updates (100 and up) never cut into it; the rest is
+# unassigned, for picks and for the benchmarks to put in bins
+WAREHOUSES = "ABCD"
+SHELVES = 50
+SHELVES_PER_AISLE = 10
+SPLIT_SHARE = 0.2
+MAX_SHELVED = 80
+
+def insert_locations(conn) -> dict:
+    """Create the warehouse > aisle > shelf hierarchy, returning shelf (bin) ids by location string"""
+    def add(kind: str, name: str, parent=None) -> tuple:
+        path = f"{parent[1]}/{name}" if parent else name
+        location_id = conn.execute(insert(Location).returning(Location.id), {
+            "kind": LOCATION_KINDS[kind], "name": name, "path": path,
+            "parent_id": parent[0] if parent else None, "warehouse_id": parent[2] if parent else None,
+        }).scalar_one()
+        if parent is None:
+            conn.execute(update(Location).where(Location.id == location_id).values(warehouse_id=location_id))
+        return location_id, path, parent[2] if parent else location_id
+
+    bins = {}
+    for letter in WAREHOUSES:
+        warehouse = add("warehouse", f"Warehouse {letter}")
+        for aisle in range(SHELVES // SHELVES_PER_AISLE):
+            zone = add("zone", f"Aisle {aisle + 1}", warehouse)
+            for shelf in range(aisle * SHELVES_PER_AISLE + 1, (aisle + 1) * SHELVES_PER_AISLE + 1):
+                bins[f"Warehouse {letter} - Shelf {shelf}"] = add("bin", f"Shelf {shelf}", zone)[0]
+    return bins
+
+def place_stock(item_id: int, row: dict, bins: dict, rng: random.Random) -> list:
+    """location_stock rows holding half an item's quantity, mostly on the shelf its location names"""
+    home = bins[row["location"]]
+    shelved = min(row["quantity"] // 2, MAX_SHELVED)
+    if shelved > 1 and rng.random() < SPLIT_SHARE:
+        elsewhere = rng.choice([location_id for location_id in bins.values() if location_id != home])
+        moved = rng.randint(1, shelved - 1)
+        return [
+            {"location_id": home, "item_id": item_id, "quantity": shelved - moved},
+            {"location_id": elsewhere, "item_id": item_id, "quantity": moved},
+        ]
+    if shelved > 0:
+        return [{"location_id": home, "item_id": item_id, "quantity": shelved}]
+    return []
+
+class HotKeySampler:
+    """Draw ids in 1..count with a power-law skew, like real SKU traffic.
+
+    log-uniform ranks make a small set of hot items take most requests; the
+    ranks are scattered over the id space so hot items aren't all adjacent.
+    """
+
+    def __init__(self, count: int, seed: int = 7):
+        self.count = count
+        self.rng = random.Random(seed)
+
+    def __call__(self) -> int:
+        rank = int(self.count ** self.rng.random()) - 1
+        return (rank * 2654435761) % self.count + 1
+
+def build_database(path: str, count: int, batch_size: int = 10000, seed: int = 42):
+    """Create a fresh SQLite database at path holding count synthetic items.
+
+    Rows are loaded into the bare tables first; create_tables then adds the
+    triggers and backfills the search index and summaries in one pass each,
+    which is much faster than maintaining them row by row. Items get ids
+    1..count in order, which their location_stock rows refer to.
+    """
+    for suffix in ("", "-wal", "-shm"):
+        Path(path + suffix).unlink(missing_ok=True)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+
+    rng = random.Random(seed + 1)
+    batch, stock = [], []
+    with engine.begin() as conn:
+        conn.exec_driver_sql("PRAGMA synchronous = OFF")
+        bins = insert_locations(conn)
+        for item_id, row in enumerate(generate_items(count, seed), 1):
+            batch.append(row)
+            stock.extend(place_stock(item_id, row, bins, rng))
+            if len(batch) >= batch_size:
+                conn.execute(insert(Item), batch)
+                conn.execute(insert(LocationStock), stock)
+                batch, stock = [], []
+        if batch:
+            conn.execute(insert(Item), batch)
+        if stock:
+            conn.execute(insert(LocationStock), stock)
+    create_tables(engine)
+    return engine
+
+def build_postgres_database(url: str, count: int, batch_size: int = 10000, seed: int = 42):
+    """Fill the empty PostgreSQL database at url with count synthetic items.
+
+    The same generated rows as build_database, loaded with COPY before
+    create_tables adds the triggers and indexes.
+    """
+    engine = create_engine(make_url(url).set(drivername="postgresql+psycopg"))
+    Base.metadata.create_all(engine)
+
+    rng = random.Random(seed + 1)
+    batch, stock = [], []
+    with Session(engine) as db:
+        db.execute(text("SET LOCAL synchronous_commit = off"))
+        bins = insert_locations(db.connection())
+        for item_id, row in enumerate(generate_items(count, seed), 1):
+            batch.append(row)
+            stock.extend(place_stock(item_id, row, bins, rng))
+            if len(batch) >= batch_size:
+                postgres.copy_rows(db, Item.__table__, batch, returning_ids=False)
+                postgres.copy_rows(db, LocationStock.__table__, stock, returning_ids=False)
+                batch, stock = [], []
+        postgres.copy_rows(db, Item.__table__, batch, returning_ids=False)
+        postgres.copy_rows(db, LocationStock.__table__, stock, returning_ids=False)
+        db.commit()
+    create_tables(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    return engine
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a synthetic inventory database")
+    parser.add_argument("path", help="SQLite file to create, or a postgresql:// URL of an empty database")
+    parser.add_argument("--rows", type=int, default=10000, help="Number of items")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    if args.path.startswith("postgresql"):
+        build_postgres_database(args.path, args.rows, seed=args.seed)
+    else:
+        build_database(args.path, args.rows, seed=args.seed)
+    print(f"✅ Created {args.path} with {args.rows} items")
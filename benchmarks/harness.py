@@ -0,0 +1,580 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmark harness: ItemCRUD micro-benchmarks and an in-process
+HTTP load driver for every route in main.py, with JSON results that can be
+compared between commits.
+
+    python benchmarks/harness.py --rows 10000 100000 --output results.json
+    python benchmarks/harness.py --rows 10000 --compare results.json
+
+Generated databases are cached per row count in --data-dir and copied to a
+scratch file before each section, so writes never leak between runs.
+
+With --backend postgresql the same suite runs against PostgreSQL: a private
+server is started from pg_server.py (or --postgres-url names an existing
+one), generated catalogs are kept there as template databases, and each
+section gets a fresh scratch database cloned from the template.
+
+    python benchmarks/harness.py --backend postgresql --rows 10000 --output pg.json
+"""
+
+import argparse
+import asyncio
+import atexit
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from itertools import count
+from pathlib import Path
+from urllib.parse import urlencode
+
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.pool import NullPool
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+os.chdir(ROOT)
+
+# Generated databases are kept here between runs
+DATA_DIR = os.path.join(tempfile.gettempdir(), "inventory-bench-data")
+
+# Scratch database the PostgreSQL runs work in
+PG_SCRATCH_DATABASE = "inventory_bench"
+
+def add_backend_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--backend", choices=["sqlite", "postgresql"], default="sqlite",
+                        help="Database backend to benchmark")
+    parser.add_argument("--postgres-url",
+                        help="Use this PostgreSQL server instead of starting a private one (any database on it)")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Where generated databases are cached")
+
+def _backend_url() -> str:
+    """Pick the scratch database from the command line, starting PostgreSQL if needed"""
+    backend_parser = argparse.ArgumentParser(add_help=False)
+    add_backend_arguments(backend_parser)
+    options, _ = backend_parser.parse_known_args()
+    if options.backend == "sqlite":
+        return f"sqlite:///{DB_PATH}"
+
+    from pg_server import PostgresServer
+
+    server_url = options.postgres_url
+    if server_url is None:
+        server = PostgresServer(Path(options.data_dir) / "postgres")
+        print(f"Starting PostgreSQL in {server.data_dir} ...", flush=True)
+        server_url = server.start()
+        atexit.register(server.stop)
+    return make_url(server_url).set(database=PG_SCRATCH_DATABASE).render_as_string(hide_password=False)
+
+# Must be set before the app's engines are created
+WORK_DIR = tempfile.mkdtemp(prefix="inventory-bench-")
+DB_PATH = os.path.join(WORK_DIR, "bench.db")
+os.environ["DATABASE_URL"] = _backend_url()
+if "--response-cache" not in sys.argv:
+    # Measure the routes themselves rather than repeated cache hits
+    os.environ["RESPONSE_CACHE_MAX_ENTRIES"] = "0"
+if "--read-replica" in sys.argv:
+    os.environ["READ_REPLICA"] = "1"
+
+from asgi_client import request, summarize
+from datagen import CATEGORIES, DATASET_VERSION, HotKeySampler, build_database, build_postgres_database
+
+import database
+from crud import ItemCRUD, StockAllocationError, encode_cursor
+from models import (
+    ItemCreate, ItemQuery, ItemUpdate, ItemUpsert, LocationCreate, StockMovementBatchItem, StockMovementCreate
+)
+from replica import READ_REPLICA, catalog_replica
+
+SEARCH_TERMS = ["laptop", "wireless", "logitech mouse", "pro", "gaming headset", "anker"]
+
+# Scenarios that stream or scan large result sets run a bounded number of times
+HEAVY_LIMIT = 20
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(
+                ["git", *args], cwd=ROOT, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+def metadata(args) -> dict:
+    server_version = None
+    if database.DATABASE_BACKEND == "postgresql":
+        admin = _postgres_admin()
+        with admin.connect() as conn:
+            server_version = conn.exec_driver_sql("SHOW server_version").scalar()
+        admin.dispose()
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "backend": database.DATABASE_BACKEND,
+        "sqlite": sqlite3.sqlite_version,
+        "postgresql": server_version,
+        "platform": platform.platform(),
+        "duration": args.duration,
+        "concurrency": args.concurrency,
+        "response_cache": args.response_cache,
+        # scaling.py has no --read-replica; its workers read READ_REPLICA
+        "read_replica": getattr(args, "read_replica", READ_REPLICA),
+    }
+
+def _postgres_admin():
+    """AUTOCOMMIT engine on the server's maintenance database, for CREATE/DROP DATABASE"""
+    url = make_url(database.DATABASE_URL).set(database="postgres")
+    return create_engine(url, isolation_level="AUTOCOMMIT", poolclass=NullPool)
+
+def cached_database(data_dir: Path, rows: int, rebuild: bool = False):
+    """Build (once) and return the generated database for a row count.
+
+    A file path on SQLite; on PostgreSQL the name of a template database.
+    """
+    if database.DATABASE_BACKEND == "postgresql":
+        return _cached_postgres_database(rows, rebuild)
+    path = data_dir / f"items-{rows}-v{DATASET_VERSION}.db"
+    if rebuild or not path.exists():
+        data_dir.mkdir(parents=True, exist_ok=True)
+        print(f"Building {rows} item database at {path} ...", flush=True)
+        start = time.perf_counter()
+        partial = str(path) + ".partial"
+        build_database(partial, rows).dispose()
+        os.replace(partial, path)
+        print(f"Built in {time.perf_counter() - start:.1f}s", flush=True)
+    return path
+
+def _cached_postgres_database(rows: int, rebuild: bool = False) -> str:
+    name = f"inventory_items_v{DATASET_VERSION}_{rows}"
+    admin = _postgres_admin()
+    try:
+        with admin.connect() as conn:
+            exists = conn.execute(text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": name}).first()
+            if exists and not rebuild:
+                return name
+            print(f"Building {rows} item database {name} ...", flush=True)
+            start = time.perf_counter()
+            partial = f"{name}_partial"
+            for stale in (partial, name):
+                conn.exec_driver_sql(f"DROP DATABASE IF EXISTS {stale} WITH (FORCE)")
+            conn.exec_driver_sql(f"CREATE DATABASE {partial}")
+            url = make_url(database.DATABASE_URL).set(database=partial)
+            build_postgres_database(url.render_as_string(hide_password=False), rows).dispose()
+            conn.exec_driver_sql(f"ALTER DATABASE {partial} RENAME TO {name}")
+            print(f"Built in {time.perf_counter() - start:.1f}s", flush=True)
+            return name
+    finally:
+        admin.dispose()
+
+async def reset_database(source):
+    """Close every pooled connection and replace the scratch database with a fresh copy"""
+    await database.async_engine.dispose()
+    await database.async_read_engine.dispose()
+    database.engine.dispose()
+    database.read_engine.dispose()
+    if database.DATABASE_BACKEND == "postgresql":
+        admin = _postgres_admin()
+        with admin.connect() as conn:
+            conn.exec_driver_sql(f"DROP DATABASE IF EXISTS {PG_SCRATCH_DATABASE} WITH (FORCE)")
+            conn.exec_driver_sql(f"CREATE DATABASE {PG_SCRATCH_DATABASE} TEMPLATE {source}")
+        admin.dispose()
+    else:
+        for suffix in ("-wal", "-shm"):
+            Path(DB_PATH + suffix).unlink(missing_ok=True)
+        shutil.copyfile(source, DB_PATH)
+    # Open one connection per engine up front: a recreated pool runs its
+    # first-connect hooks under a thread lock, which concurrent clients deadlock on
+    for async_engine in (database.async_engine, database.async_read_engine):
+        async with async_engine.connect():
+            pass
+
+class Workload:
+    """Skewed keys and values shared by the micro and HTTP benchmarks"""
+
+    def __init__(self, rows: int, seed: int = 7):
+        self.rows = rows
+        self.rng = random.Random(seed)
+        self.hot_id = HotKeySampler(rows, seed)
+        self.category_weights = [1.0 / (rank + 1) for rank in range(len(CATEGORIES))]
+        self.new_sku = (f"BENCH-{n:09d}" for n in count())
+        self.new_shelf = (f"Bench Shelf {n}" for n in count())
+        # Deleted ids come from the top of the table so reads rarely hit them
+        self.doomed_ids = iter(range(rows, 0, -1))
+        with database.engine.connect() as conn:
+            ids = sorted({self.hot_id() for _ in range(min(rows, 5000))})
+            self.skus = [sku for (sku,) in conn.exec_driver_sql(
+                f"SELECT sku FROM items WHERE id IN ({','.join(map(str, ids))})"
+            )]
+            locations = {code: [] for code in database.LOCATION_KINDS.values()}
+            for location_id, kind in conn.exec_driver_sql("SELECT id, kind FROM locations"):
+                locations[kind].append(location_id)
+        self.warehouses, self.zones, self.bins = (
+            locations[database.LOCATION_KINDS[kind]] for kind in ("warehouse", "zone", "bin")
+        )
+
+    def category(self) -> str:
+        return self.rng.choices(CATEGORIES, self.category_weights)[0]
+
+    def search(self) -> str:
+        return self.rng.choice(SEARCH_TERMS)
+
+    def cursor(self) -> str:
+        return encode_cursor([self.rng.randint(1, self.rows)])
+
+    def new_item(self) -> dict:
+        return {
+            "name": f"Bench Widget {self.rng.randint(1, 999)}",
+            "category": self.category(),
+            "sku": next(self.new_sku),
+            "description": "Generated by the benchmark harness",
+            "quantity": self.rng.randint(0, 100),
+            "price": round(self.rng.uniform(1, 500), 2),
+            "location": "Warehouse Z",
+        }
+
+    def upsert(self) -> dict:
+        return {"sku": self.rng.choice(self.skus), "quantity_delta": self.rng.randint(-5, 5)}
+
+    def update(self) -> dict:
+        # Generated items shelve at most datagen.MAX_SHELVED units, so this
+        # doesn't cut into them (which gets 409)
+        return {"quantity": self.rng.randint(100, 200)}
+
+    def batch_keys(self, count: int) -> dict:
+        """A batch-get body: half ids, half SKUs"""
+        return {
+            "ids": [self.hot_id() for _ in range(count // 2)],
+            "skus": [self.rng.choice(self.skus) for _ in range(count - count // 2)],
+        }
+
+    def location(self) -> str:
+        return f"Warehouse {self.rng.choice('ABCD')} - Shelf {self.rng.randint(1, 50)}"
+
+    def item_query(self) -> dict:
+        """Filters a catalog browser sends: a category or location, a price or quantity range, a sort"""
+        price = round(self.rng.lognormvariate(4, 1), 2)
+        return self.rng.choice((
+            {"category": [self.category()], "min_price": price, "sort": "-price"},
+            {"min_price": price, "max_price": round(price * 1.2, 2), "sort": "price"},
+            {"location": [self.location()], "sort": "name"},
+            {"category": [self.category()], "max_quantity": 20, "sort": "-quantity"},
+        ))
+
+    def new_location(self) -> dict:
+        return {"name": next(self.new_shelf), "kind": "bin", "parent_id": self.rng.choice(self.zones)}
+
+    def location_stock(self) -> dict:
+        # Bins take stock the item has unassigned; asking for more gets 409
+        return {"quantity": self.rng.randint(0, 10)}
+
+    def movement(self) -> dict:
+        # Receipts outweigh picks so hot items don't run dry and get rejected
+        kind = self.rng.choices(("receipt", "pick", "adjustment"), (3, 6, 1))[0]
+        quantity = self.rng.randint(1, 10) if kind == "pick" else self.rng.randint(1, 25)
+        if kind == "adjustment":
+            quantity = self.rng.choice((-1, 1)) * self.rng.randint(1, 3)
+        return {"sku": self.rng.choice(self.skus), "kind": kind, "quantity": quantity}
+
+def _set_location_stock(db, w: Workload):
+    """A bin asking for more than the item has unassigned is expected, as the 409 is over HTTP"""
+    try:
+        ItemCRUD.set_location_stock(db, w.hot_id(), w.rng.choice(w.bins), **w.location_stock())
+    except StockAllocationError:
+        db.rollback()
+
+# name -> (callable(db, workload), limit)
+MICRO_BENCHMARKS = {
+    "add": (lambda db, w: ItemCRUD.add(db, ItemCreate(**w.new_item())), None),
+    "add_many[100]": (lambda db, w: ItemCRUD.add_many(db, [ItemCreate(**w.new_item()) for _ in range(100)]), None),
+    "upsert_many[100]": (lambda db, w: ItemCRUD.upsert_many(db, [ItemUpsert(**w.upsert()) for _ in range(100)]), None),
+    "record_movements[100]": (
+        lambda db, w: ItemCRUD.record_movements(db, [StockMovementBatchItem(**w.movement()) for _ in range(100)]), None),
+    "record_movement": (
+        lambda db, w: ItemCRUD.record_movement(db, w.hot_id(), StockMovementCreate(kind="receipt", quantity=5)), None),
+    "get_movements": (lambda db, w: ItemCRUD.get_movements(db, w.hot_id()), None),
+    "get_stock_at": (lambda db, w: ItemCRUD.get_stock_at(db, w.hot_id(), datetime.utcnow()), None),
+    "add_location": (lambda db, w: ItemCRUD.add_location(db, LocationCreate(**w.new_location())), None),
+    "get_locations": (lambda db, w: ItemCRUD.get_locations(db, w.rng.choice(w.warehouses)), None),
+    "get_warehouses": (lambda db, w: ItemCRUD.get_warehouses(db), None),
+    "get_warehouse_stock": (
+        lambda db, w: ItemCRUD.get_warehouse_stock(db, w.rng.choice(w.warehouses), w.rng.randint(1, 20)), None),
+    "get_item_locations": (lambda db, w: ItemCRUD.get_item_locations(db, w.hot_id()), None),
+    "set_location_stock": (_set_location_stock, None),
+    "get_one": (lambda db, w: ItemCRUD.get_one(db, w.hot_id()), None),
+    "get_by_sku": (lambda db, w: ItemCRUD.get_by_sku(db, w.rng.choice(w.skus)), None),
+    "get_many[100]": (lambda db, w: ItemCRUD.get_many(db, **w.batch_keys(100)), None),
+    "update": (lambda db, w: ItemCRUD.update(db, w.hot_id(), ItemUpdate(**w.update())), None),
+    "delete": (lambda db, w: ItemCRUD.delete(db, next(w.doomed_ids)), None),
+    "write_batch[100]": (
+        lambda db, w: ItemCRUD.write_batch(db, [("update", w.hot_id(), ItemUpdate(**w.update())) for _ in range(100)]),
+        None),
+    "get_category": (lambda db, w: ItemCRUD.get_category(db, w.category(), w.rng.randint(1, 20)), None),
+    "get_category[no-total]": (
+        lambda db, w: ItemCRUD.get_category(db, w.category(), include_total=False), None),
+    "get_categories": (lambda db, w: ItemCRUD.get_categories(db), None),
+    "search_items": (lambda db, w: ItemCRUD.search_items(db, w.search()), None),
+    "get_low_stock": (lambda db, w: ItemCRUD.get_low_stock(db), None),
+    "count_low_stock": (lambda db, w: ItemCRUD.count_low_stock(db), None),
+    "get_all_paginated": (lambda db, w: ItemCRUD.get_all_paginated(db, w.rng.randint(1, 20)), None),
+    "query_items": (lambda db, w: ItemCRUD.query_items(db, ItemQuery(**w.item_query())), None),
+    "query_items[facets]": (
+        lambda db, w: ItemCRUD.query_items(db, ItemQuery(**w.item_query(), facets="category,location")), None),
+    "get_all_paginated[cursor]": (
+        lambda db, w: ItemCRUD.get_all_paginated(db, cursor=w.cursor(), include_total=False), None),
+    "export_select[search]": (
+        lambda db, w: db.execute(ItemCRUD.export_select(search=w.search())).all(), HEAVY_LIMIT),
+}
+
+# The same reads answered by the read replica, run with --read-replica
+REPLICA_BENCHMARKS = {
+    "replica.get_one": (lambda db, w: catalog_replica.get_one(w.hot_id()), None),
+    "replica.get_by_sku": (lambda db, w: catalog_replica.get_by_sku(w.rng.choice(w.skus)), None),
+    "replica.get_many[100]": (lambda db, w: catalog_replica.get_many(**w.batch_keys(100)), None),
+    "replica.get_category": (lambda db, w: catalog_replica.get_category(w.category(), w.rng.randint(1, 20)), None),
+    "replica.search_items": (lambda db, w: catalog_replica.search_items(w.search()), None),
+    "replica.get_low_stock": (lambda db, w: catalog_replica.get_low_stock(), None),
+    "replica.count_low_stock": (lambda db, w: catalog_replica.count_low_stock(), None),
+    "replica.get_all_paginated": (lambda db, w: catalog_replica.get_all_paginated(w.rng.randint(1, 20)), None),
+    "replica.get_all_paginated[cursor]": (
+        lambda db, w: catalog_replica.get_all_paginated(cursor=w.cursor(), include_total=False), None),
+}
+
+def covered_methods() -> set:
+    return {name.split("[")[0] for name in MICRO_BENCHMARKS}
+
+def run_micro(workload: Workload, duration: float, only=None) -> dict:
+    """Time each ItemCRUD method on a sync Session, one call at a time"""
+    results = {}
+    benchmarks = {**MICRO_BENCHMARKS, **(REPLICA_BENCHMARKS if catalog_replica.ready else {})}
+    db = database.SessionLocal()
+    try:
+        for name, (fn, limit) in benchmarks.items():
+            if only and not any(pattern in name for pattern in only):
+                continue
+            latencies = []
+            errors = 0
+            start = time.perf_counter()
+            while time.perf_counter() - start < duration and (limit is None or len(latencies) < limit):
+                db.expunge_all()
+                began = time.perf_counter()
+                try:
+                    fn(db, workload)
+                except Exception:
+                    errors += 1
+                    db.rollback()
+                latencies.append((time.perf_counter() - began) * 1000)
+            results[name] = summarize(latencies, time.perf_counter() - start, errors)
+            report("micro", name, results[name])
+    finally:
+        db.close()
+    return results
+
+# name -> (method, route path, request factory(workload) -> (url, body),
+#          expected status (or a tuple of them), limit)
+HTTP_SCENARIOS = {
+    "index": ("GET", "/", lambda w: ("/", None), 200, None),
+    "health": ("GET", "/api/health", lambda w: ("/api/health", None), 200, None),
+    "metrics": ("GET", "/api/metrics", lambda w: ("/api/metrics", None), 200, None),
+    "get_item": ("GET", "/api/items/{item_id}", lambda w: (f"/api/items/{w.hot_id()}", None), 200, None),
+    "batch_get[100]": ("POST", "/api/items/batch-get",
+                       lambda w: ("/api/items/batch-get", w.batch_keys(100)), 200, None),
+    "list_items": ("GET", "/api/items", lambda w: (f"/api/items?page={w.rng.randint(1, 20)}&per_page=50", None), 200, None),
+    "list_items_cursor": ("GET", "/api/items",
+                          lambda w: (f"/api/items?cursor={w.cursor()}&include_total=false", None), 200, None),
+    "search_items": ("GET", "/api/items", lambda w: (f"/api/items?search={w.search()}", None), 200, None),
+    "category_items": ("GET", "/api/items/category/{category}",
+                       lambda w: (f"/api/items/category/{w.category()}?page={w.rng.randint(1, 5)}", None), 200, None),
+    "query_items": ("GET", "/api/items/query",
+                    lambda w: (f"/api/items/query?{urlencode(w.item_query(), doseq=True)}", None), 200, None),
+    "query_items[facets]": ("GET", "/api/items/query",
+                            lambda w: (f"/api/items/query?{urlencode(w.item_query(), doseq=True)}"
+                                       "&facets=category,location", None), 200, None),
+    "categories": ("GET", "/api/categories", lambda w: ("/api/categories", None), 200, None),
+    "low_stock": ("GET", "/api/items/low-stock", lambda w: ("/api/items/low-stock", None), 200, None),
+    "low_stock_count": ("GET", "/api/items/low-stock",
+                        lambda w: ("/api/items/low-stock?count_only=true", None), 200, None),
+    "export_search": ("GET", "/api/items/export",
+                      lambda w: (f"/api/items/export?format=ndjson&search={w.search()}", None), 200, HEAVY_LIMIT),
+    "create_item": ("POST", "/api/items", lambda w: ("/api/items", w.new_item()), 201, None),
+    "bulk_import[100]": ("POST", "/api/items/bulk",
+                         lambda w: ("/api/items/bulk", [w.new_item() for _ in range(100)]), 200, None),
+    "bulk_upsert[100]": ("PUT", "/api/items/bulk",
+                         lambda w: ("/api/items/bulk", [w.upsert() for _ in range(100)]), 200, None),
+    "record_movement": ("POST", "/api/items/{item_id}/movements",
+                        lambda w: (f"/api/items/{w.hot_id()}/movements", {"kind": "receipt", "quantity": 5}), 201, None),
+    "record_movements[100]": ("POST", "/api/movements",
+                              lambda w: ("/api/movements", [w.movement() for _ in range(100)]), 200, None),
+    "item_movements": ("GET", "/api/items/{item_id}/movements",
+                       lambda w: (f"/api/items/{w.hot_id()}/movements", None), 200, None),
+    "stock_at": ("GET", "/api/items/{item_id}/stock",
+                 lambda w: (f"/api/items/{w.hot_id()}/stock", None), 200, None),
+    "locations": ("GET", "/api/locations",
+                  lambda w: (f"/api/locations?warehouse_id={w.rng.choice(w.warehouses)}", None), 200, None),
+    "create_location": ("POST", "/api/locations", lambda w: ("/api/locations", w.new_location()), 201, None),
+    "warehouses": ("GET", "/api/warehouses", lambda w: ("/api/warehouses", None), 200, None),
+    "warehouse_stock": ("GET", "/api/warehouses/{warehouse_id}/stock",
+                        lambda w: (f"/api/warehouses/{w.rng.choice(w.warehouses)}/stock?page={w.rng.randint(1, 20)}",
+                                   None), 200, None),
+    "item_locations": ("GET", "/api/items/{item_id}/locations",
+                       lambda w: (f"/api/items/{w.hot_id()}/locations", None), 200, None),
+    "set_location_stock": ("PUT", "/api/items/{item_id}/locations/{location_id}",
+                           lambda w: (f"/api/items/{w.hot_id()}/locations/{w.rng.choice(w.bins)}", w.location_stock()),
+                           (200, 409), None),
+    # Concurrent clients find a backup already running: 409 until it finishes
+    "create_backup": ("POST", "/api/admin/backups", lambda w: ("/api/admin/backups", None),
+                      (201, 409) if database.DATABASE_BACKEND == "sqlite" else 400, HEAVY_LIMIT),
+    "backups": ("GET", "/api/admin/backups", lambda w: ("/api/admin/backups", None),
+                200 if database.DATABASE_BACKEND == "sqlite" else 400, None),
+    "update_item": ("PUT", "/api/items/{item_id}", lambda w: (f"/api/items/{w.hot_id()}", w.update()), 200, None),
+    "delete_item": ("DELETE", "/api/items/{item_id}", lambda w: (f"/api/items/{next(w.doomed_ids)}", None), 204, None),
+}
+
+def expected_statuses(expected) -> tuple:
+    return expected if isinstance(expected, tuple) else (expected,)
+
+# Long-lived streams have no per-request latency to time; the cost of feeding
+# them is paid by the write routes above, which publish to the change feed
+STREAMING_ROUTES = {("GET", "/api/events")}
+
+def uncovered_routes(app) -> list:
+    covered = {(method, path) for method, path, *_ in HTTP_SCENARIOS.values()} | STREAMING_ROUTES
+    missing = []
+    for route in app.routes:
+        for method in sorted(getattr(route, "methods", None) or ()):
+            if method in ("HEAD", "OPTIONS") or route.path.startswith(("/docs", "/redoc", "/openapi")):
+                continue
+            if (method, route.path) not in covered:
+                missing.append(f"{method} {route.path}")
+    return missing
+
+async def run_http(app, workload: Workload, duration: float, concurrency: int, only=None) -> dict:
+    """Drive each route with concurrent closed-loop clients for a fixed time"""
+    results = {}
+    for name, (method, _, make_request, expected, limit) in HTTP_SCENARIOS.items():
+        if only and not any(pattern in name for pattern in only):
+            continue
+        latencies = []
+        errors = 0
+        deadline = time.perf_counter() + duration
+
+        async def client():
+            nonlocal errors
+            while time.perf_counter() < deadline and (limit is None or len(latencies) < limit):
+                url, body = make_request(workload)
+                began = time.perf_counter()
+                status, _, _ = await request(app, method, url, body)
+                latencies.append((time.perf_counter() - began) * 1000)
+                if status not in expected_statuses(expected):
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        results[name] = summarize(latencies, time.perf_counter() - start, errors)
+        report("http", name, results[name])
+    return results
+
+def report(section: str, name: str, stats: dict):
+    print(
+        f"{section:<5} {name:<36} {stats['throughput_rps']:>9.1f} ops/s  "
+        f"p50 {stats['p50_ms']:8.2f} ms  p95 {stats['p95_ms']:8.2f} ms  "
+        f"p99 {stats['p99_ms']:8.2f} ms  errors {stats['errors']}",
+        flush=True
+    )
+
+def compare(results: dict, baseline: dict):
+    """Print throughput and latency changes against an earlier results file"""
+    base_runs = {run["rows"]: run for run in baseline["runs"]}
+    print(f"\nCompared with {baseline['metadata']['git'].get('commit') or 'unknown commit'}"
+          f" ({baseline['metadata']['timestamp']})")
+
+    def change(new, old):
+        return f"{(new - old) / old * 100:+7.1f}%" if old else "    n/a"
+
+    for run in results["runs"]:
+        base_run = base_runs.get(run["rows"])
+        if base_run is None:
+            print(f"{run['rows']} rows: no baseline")
+            continue
+        for section in ("micro", "http"):
+            for name, stats in run.get(section, {}).items():
+                old = base_run.get(section, {}).get(name)
+                if old is None:
+                    continue
+                print(
+                    f"{run['rows']:>9} {section:<5} {name:<36} "
+                    f"ops/s {change(stats['throughput_rps'], old['throughput_rps'])}  "
+                    f"p50 {change(stats['p50_ms'], old['p50_ms'])}  "
+                    f"p99 {change(stats['p99_ms'], old['p99_ms'])}"
+                )
+
+async def main(args):
+    from main import app
+
+    logging.disable(logging.INFO)
+
+    missing = uncovered_routes(app)
+    if missing:
+        print(f"WARNING: routes without a benchmark scenario: {', '.join(missing)}")
+    crud_methods = {name for name in vars(ItemCRUD) if not name.startswith("_")}
+    if crud_methods - covered_methods():
+        print(f"WARNING: ItemCRUD methods without a micro-benchmark: {', '.join(sorted(crud_methods - covered_methods()))}")
+
+    results = {"metadata": metadata(args), "runs": []}
+    try:
+        for rows in args.rows:
+            source = cached_database(Path(args.data_dir), rows, args.rebuild)
+            run = {"rows": rows}
+            if not args.skip_micro:
+                await reset_database(source)
+                database.create_tables()
+                if args.read_replica:
+                    await catalog_replica.load()
+                run["micro"] = run_micro(Workload(rows), args.duration, args.only)
+            if not args.skip_http:
+                await reset_database(source)
+                database.create_tables()
+                if args.read_replica:
+                    await catalog_replica.load()
+                run["http"] = await run_http(app, Workload(rows), args.duration, args.concurrency, args.only)
+            results["runs"].append(run)
+    finally:
+        await database.async_engine.dispose()
+        await database.async_read_engine.dispose()
+        database.engine.dispose()
+        database.read_engine.dispose()
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"Results written to {args.output}")
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text()))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every ItemCRUD method and API route")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000], help="Catalog sizes to benchmark")
+    parser.add_argument("--duration", type=float, default=2.0, help="Seconds per benchmark")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent HTTP clients")
+    parser.add_argument("--only", nargs="+", help="Only run benchmarks whose name contains one of these")
+    parser.add_argument("--skip-micro", action="store_true", help="Skip the ItemCRUD micro-benchmarks")
+    parser.add_argument("--skip-http", action="store_true", help="Skip the HTTP load driver")
+    parser.add_argument("--response-cache", action="store_true", help="Keep the response cache enabled")
+    parser.add_argument("--read-replica", action="store_true", help="Serve item reads from the in-memory replica")
+    add_backend_arguments(parser)
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate cached databases")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Index usage audit for the items table.
+
+Runs every ItemCRUD benchmark from harness.py against a scratch copy of a
+database, captures the SQL each one issues, and replays it through
+EXPLAIN QUERY PLAN. Indexes no statement uses, and indexes whose columns are
+a prefix of another index, are reported as candidates to drop.
+
+    python benchmarks/index_audit.py --rows 100000
+    python benchmarks/index_audit.py --database data/inventory.db --verbose
+    python benchmarks/index_audit.py --migrate    # audit the current model's index set
+"""
+
+import asyncio
+import re
+import shutil
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+# harness changes directory to the project root on import
+CALLER_DIR = Path.cwd()
+
+from sqlalchemy import event, inspect, text
+
+import harness
+from harness import MICRO_BENCHMARKS, Workload, cached_database, reset_database
+
+import database
+
+_INDEX_PATTERN = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+
+def capture_statements(rows: int, repeat: int = 3) -> dict:
+    """Run each ItemCRUD benchmark and return {statement: (benchmark, parameters)}"""
+    statements = {}
+    current = {"name": None}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.setdefault(statement, (current["name"], parameters))
+
+    event.listen(database.engine, "before_cursor_execute", record)
+    db = database.SessionLocal()
+    workload = Workload(rows)
+    try:
+        for name, (fn, _) in MICRO_BENCHMARKS.items():
+            current["name"] = name
+            for _ in range(repeat):
+                fn(db, workload)
+    finally:
+        db.close()
+        event.remove(database.engine, "before_cursor_execute", record)
+    return statements
+
+def explain(statements: dict) -> list:
+    """(benchmark, statement, plan lines) for every statement touching items"""
+    plans = []
+    with database.engine.connect() as conn:
+        for statement, (name, parameters) in statements.items():
+            if not re.search(r"\bitems\b", statement) or statement.lstrip().upper().startswith("PRAGMA"):
+                continue
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            plans.append((name, statement, [row[-1] for row in rows]))
+    return plans
+
+def audit(plans: list) -> list:
+    """One finding per index on items: its columns, users and a verdict"""
+    with database.engine.connect() as conn:
+        indexes = inspect(conn).get_indexes("items")
+    used_by = defaultdict(set)
+    for name, _, plan in plans:
+        for line in plan:
+            for index in _INDEX_PATTERN.findall(line):
+                used_by[index].add(name)
+
+    findings = []
+    for index in indexes:
+        columns = index["column_names"]
+        wider = [
+            other["name"] for other in indexes
+            if other is not index and other["column_names"][:len(columns)] == columns
+            and len(other["column_names"]) > len(columns)
+        ]
+        if index["unique"]:
+            verdict = "keep (enforces uniqueness)"
+        elif wider:
+            verdict = f"redundant (prefix of {', '.join(wider)})"
+        elif used_by[index["name"]]:
+            verdict = "keep"
+        else:
+            verdict = "unused"
+        findings.append({
+            "index": index["name"],
+            "columns": columns,
+            "used_by": sorted(used_by[index["name"]]),
+            "verdict": verdict,
+        })
+    return findings
+
+def main(args):
+    if args.database:
+        asyncio.run(reset_database(CALLER_DIR / args.database))
+    else:
+        asyncio.run(reset_database(cached_database(Path(args.data_dir), args.rows, args.rebuild)))
+    # The schema is audited as it is on disk unless asked to migrate it first
+    if args.migrate:
+        database.migrate_indexes()
+    with database.engine.connect() as conn:
+        rows = conn.execute(text("SELECT max(id) FROM items")).scalar() or 0
+    if not rows:
+        sys.exit("The database has no items to audit")
+
+    plans = explain(capture_statements(rows))
+    findings = audit(plans)
+
+    if args.verbose:
+        for name, statement, plan in plans:
+            print(f"-- {name}\n{' '.join(statement.split())}")
+            for line in plan:
+                print(f"   {line}")
+        print()
+    scans = sorted({name for name, _, plan in plans for line in plan if re.match(r"SCAN items\b(?! USING)", line)})
+    for finding in findings:
+        print(f"{finding['index']:<22} {', '.join(finding['columns']):<22} {finding['verdict']}")
+        if finding["used_by"]:
+            print(f"{'':<22} used by: {', '.join(finding['used_by'])}")
+    print(f"\n{len(findings)} indexes on items, "
+          f"{sum(1 for f in findings if not f['verdict'].startswith('keep'))} candidates to drop")
+    if scans:
+        print(f"Scans of items without an index: {', '.join(scans)}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Report unused and redundant indexes on items")
+    parser.add_argument("--rows", type=int, default=20000, help="Size of the generated catalog to audit")
+    parser.add_argument("--database", help="Audit a copy of this SQLite file instead")
+    parser.add_argument("--data-dir", default=harness.DATA_DIR, help="Where generated databases are cached")
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate the cached database")
+    parser.add_argument("--migrate", action="store_true", help="Apply migrate_indexes before auditing")
+    parser.add_argument("--verbose", action="store_true", help="Print every statement and its plan")
+    args = parser.parse_args()
+    try:
+        main(args)
+    finally:
+        database.engine.dispose()
+        shutil.rmtree(harness.WORK_DIR, ignore_errors=True)
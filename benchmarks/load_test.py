@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Concurrent read/write load test: async (aiosqlite) vs blocking sync sessions.
+
+"blocking" runs the routes with a synchronous Session that executes on the
+event loop, the way every route worked before the async database layer;
+"threaded" is ASYNC_SESSIONS=off and "async" the default.
+The app is pointed at a scratch database through DATABASE_URL.
+"""
+
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+os.chdir(ROOT)
+
+# Must be set before the app's engines are created
+WORK_DIR = tempfile.mkdtemp(prefix="inventory-load-")
+DB_PATH = os.path.join(WORK_DIR, "load.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from asgi_client import request, summarize
+from datagen import build_database
+from database import (
+    AsyncReadSessionLocal, AsyncSessionLocal, ThreadedSession, configure_sqlite, get_async_db, get_async_read_db
+)
+
+app = None
+
+SEARCH_TERMS = ["laptop", "wireless", "logitech mouse", "pro"]
+
+class _BlockingSession(ThreadedSession):
+    """Runs every query on the event loop with a sync Session"""
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return fn(self.session, *args, **kwargs)
+
+def use_database(mode: str, db_path: str):
+    """Swap in the sessions a mode runs the routes on, returning a cleanup callback"""
+    if mode == "async":
+        async def write_session():
+            async with AsyncSessionLocal() as db:
+                yield db
+
+        async def read_session():
+            async with AsyncReadSessionLocal() as db:
+                yield db
+
+        async def dispose():
+            app.dependency_overrides.clear()
+
+        app.dependency_overrides[get_async_db] = write_session
+        app.dependency_overrides[get_async_read_db] = read_session
+        return dispose
+
+    engine = configure_sqlite(
+        create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    )
+    factory = sessionmaker(bind=engine)
+
+    async def override():
+        db = factory()
+        try:
+            yield (ThreadedSession if mode == "threaded" else _BlockingSession)(db)
+        finally:
+            db.close()
+
+    async def dispose():
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+    app.dependency_overrides[get_async_db] = override
+    app.dependency_overrides[get_async_read_db] = override
+    return dispose
+
+def pick_request(rng: random.Random, rows: int, write_ratio: float):
+    """Choose one (kind, method, url, body) from the dashboard-like mix"""
+    if rng.random() < write_ratio:
+        item_id = rng.randint(1, rows)
+        # Above the stock generated items shelve (datagen.MAX_SHELVED)
+        return "write", "PUT", f"/api/items/{item_id}", {"quantity": rng.randint(100, 200)}
+    choice = rng.random()
+    if choice < 0.4:
+        return "read", "GET", f"/api/items/{rng.randint(1, rows)}", None
+    if choice < 0.7:
+        return "read", "GET", f"/api/items?page={rng.randint(1, 20)}&per_page=50", None
+    if choice < 0.85:
+        return "read", "GET", f"/api/items?search={rng.choice(SEARCH_TERMS)}", None
+    return "read", "GET", "/api/categories", None
+
+async def run_mode(mode: str, db_path: str, rows: int, rate: float,
+                   duration: float, write_ratio: float) -> dict:
+    """Fire requests open-loop at a fixed Poisson rate.
+    
+    Latency is measured from each request's scheduled arrival, so time spent
+    waiting for a blocked event loop counts against it.
+    """
+    dispose = use_database(mode, db_path)
+    rng = random.Random(1)
+    latencies = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+    loop_lag = []
+
+    async def send(kind, method, url, body, scheduled):
+        status, _, _ = await request(app, method, url, body)
+        latencies[kind].append((time.perf_counter() - scheduled) * 1000)
+        if status >= 500:
+            errors[kind] += 1
+
+    async def probe(stop):
+        # How late a 10 ms timer fires is how long the loop was blocked
+        while not stop.is_set():
+            expected = time.perf_counter() + 0.01
+            await asyncio.sleep(0.01)
+            loop_lag.append(max(0.0, (time.perf_counter() - expected) * 1000))
+
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(stop))
+    tasks = []
+    start = time.perf_counter()
+    scheduled = start
+    try:
+        while scheduled < start + duration:
+            scheduled += rng.expovariate(rate)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(*pick_request(rng, rows, write_ratio), scheduled)))
+        await asyncio.gather(*tasks)
+    finally:
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await prober
+        await dispose()
+
+    lag = summarize(loop_lag, elapsed)
+    return {
+        "mode": mode,
+        "all": summarize(latencies["read"] + latencies["write"], elapsed, errors["read"] + errors["write"]),
+        "read": summarize(latencies["read"], elapsed, errors["read"]),
+        "write": summarize(latencies["write"], elapsed, errors["write"]),
+        "loop_lag": {key: lag[key] for key in ("mean_ms", "p99_ms")},
+    }
+
+async def main(args):
+    global app
+    results = []
+    try:
+        build_database(DB_PATH, args.rows).dispose()
+        from main import app
+        for mode in args.modes:
+            result = await run_mode(mode, DB_PATH, args.rows, args.rate,
+                                    args.duration, args.write_ratio)
+            results.append(result)
+            for kind in ("all", "read", "write"):
+                stats = result[kind]
+                print(
+                    f"{mode:<9} {kind:<5} {stats['throughput_rps']:>8.1f} req/s  "
+                    f"p50 {stats['p50_ms']:8.2f} ms  p95 {stats['p95_ms']:8.2f} ms  "
+                    f"p99 {stats['p99_ms']:8.2f} ms  errors {stats['errors']}"
+                )
+            print(f"{mode:<9} event loop lag mean {result['loop_lag']['mean_ms']:.2f} ms  "
+                  f"p99 {result['loop_lag']['p99_ms']:.2f} ms")
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Concurrent read/write load test")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--rate", type=float, default=100.0, help="Requests per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per mode")
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--modes", nargs="+", default=["blocking", "async"], choices=["blocking", "threaded", "async"])
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+A private PostgreSQL server for benchmarking the postgresql backend.
+
+The cluster is created once under the data directory with initdb and
+started with pg_ctl, listening only on a unix socket there. Binaries are
+taken from PG_BIN, then PATH, then the usual distribution locations. The
+server needs the pg_trgm extension (postgresql-contrib on most distros).
+
+    python benchmarks/pg_server.py start   # prints the URL to pass as DATABASE_URL
+    python benchmarks/pg_server.py stop
+"""
+
+import glob
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+# Distribution install locations searched after PG_BIN and PATH
+SEARCH_PATHS = ["/usr/lib/postgresql/*/bin", "/usr/pgsql-*/bin", "/usr/local/pgsql/bin", "/opt/homebrew/opt/postgresql*/bin"]
+
+# Matches SQLite's synchronous=NORMAL in WAL mode: a crash may lose the last
+# commits but never corrupts, so neither backend pays an fsync per commit
+SERVER_SETTINGS = {
+    "listen_addresses": "''",
+    "synchronous_commit": "off",
+    "max_connections": "200",
+    "shared_buffers": "256MB",
+}
+
+def find_binary(name: str) -> str:
+    candidates = [os.path.join(os.environ["PG_BIN"], name)] if os.getenv("PG_BIN") else []
+    if shutil.which(name):
+        candidates.append(shutil.which(name))
+    for pattern in SEARCH_PATHS:
+        candidates.extend(sorted(glob.glob(os.path.join(pattern, name)), reverse=True))
+    for candidate in candidates:
+        if os.access(candidate, os.X_OK):
+            return candidate
+    raise RuntimeError(f"{name} not found; install PostgreSQL or set PG_BIN to its bin directory")
+
+class PostgresServer:
+    """A PostgreSQL cluster in data_dir, reused across runs"""
+
+    def __init__(self, data_dir: Path, port: int = 5432):
+        self.data_dir = Path(data_dir).resolve()
+        self.port = port
+        self.started = False
+
+    @property
+    def url(self) -> str:
+        """URL of the maintenance database, as the superuser"""
+        return f"postgresql://postgres@/postgres?host={self.data_dir}&port={self.port}"
+
+    def _pg_ctl(self, *args, check: bool = True) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [find_binary("pg_ctl"), "-D", str(self.data_dir), *args],
+            capture_output=True, text=True, check=check
+        )
+
+    def running(self) -> bool:
+        return (self.data_dir / "PG_VERSION").exists() and self._pg_ctl("status", check=False).returncode == 0
+
+    def start(self) -> str:
+        """Create the cluster if needed, start it unless already running, and return its URL"""
+        if os.name == "posix" and os.geteuid() == 0:
+            raise RuntimeError("PostgreSQL refuses to run as root; run as another user or pass --postgres-url")
+        if not (self.data_dir / "PG_VERSION").exists():
+            shutil.rmtree(self.data_dir, ignore_errors=True)
+            subprocess.run(
+                [find_binary("initdb"), "-D", str(self.data_dir), "-U", "postgres",
+                 "--auth=trust", "--encoding=UTF8", "--no-sync"],
+                capture_output=True, text=True, check=True
+            )
+        if not self.running():
+            options = " ".join(f"-c {name}={value}" for name, value in SERVER_SETTINGS.items())
+            self._pg_ctl("-l", str(self.data_dir / "server.log"), "-w",
+                         "-o", f"-k {self.data_dir} -p {self.port} {options}", "start")
+            self.started = True
+        return self.url
+
+    def stop(self):
+        """Stop the server if this process started it"""
+        if self.started:
+            self._pg_ctl("-m", "fast", "-w", "stop", check=False)
+            self.started = False
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Start or stop the benchmark PostgreSQL server")
+    parser.add_argument("action", choices=["start", "stop"])
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "inventory-bench-data"),
+                        help="Benchmark data directory; the cluster lives in its postgres/ subdirectory")
+    parser.add_argument("--port", type=int, default=5432, help="Port number for the socket file")
+    args = parser.parse_args()
+
+    server = PostgresServer(Path(args.data_dir) / "postgres", args.port)
+    if args.action == "start":
+        print(server.start())
+    else:
+        server.started = server.running()
+        server.stop()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Throughput scaling of the production server from 1 to N worker processes.
+
+For each worker count, start.py --production is launched against a fresh
+copy of a generated database and driven over real TCP connections by
+separate client processes. Requests come from the harness.py HTTP scenarios,
+grouped into read, write and mixed workloads.
+
+    python benchmarks/scaling.py --rows 100000 --workers 1 2 4
+    python benchmarks/scaling.py --mix read write --duration 10 --output scaling.json
+    python benchmarks/scaling.py --backend postgresql --workers 1 4
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+import harness
+from harness import HTTP_SCENARIOS, ROOT, Workload, add_backend_arguments, cached_database, metadata, reset_database
+
+from asgi_client import summarize
+
+import database
+
+# scenario name -> relative weight
+MIXES = {
+    "read": {
+        "get_item": 40, "list_items_cursor": 15, "search_items": 15,
+        "category_items": 15, "low_stock_count": 5, "stock_at": 10,
+    },
+    "write": {"update_item": 40, "record_movement": 40, "create_item": 20},
+}
+MIXES["mixed"] = {
+    **{name: weight * 9 for name, weight in MIXES["read"].items()},
+    **MIXES["write"],
+}
+
+def build_requests(workload: Workload, mix: str, count: int) -> list:
+    """(method, path, body, expected status) for count requests drawn from a mix"""
+    names = list(MIXES[mix])
+    weights = list(MIXES[mix].values())
+    requests = []
+    for name in workload.rng.choices(names, weights, k=count):
+        method, _, build, status, _ = HTTP_SCENARIOS[name]
+        path, body = build(workload)
+        payload = json.dumps(body).encode() if body is not None else b""
+        requests.append((method, quote(path, safe="/?&="), payload, status))
+    return requests
+
+async def _drive(host: str, port: int, requests: list, deadline: float, latencies: list) -> int:
+    """Send requests one at a time over a keep-alive connection; returns the error count"""
+    errors = 0
+    reader = writer = None
+    for method, path, payload, expected in requests:
+        if time.perf_counter() >= deadline:
+            break
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(
+                f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+            )
+            lines = (await reader.readuntil(b"\r\n\r\n")).split(b"\r\n")
+            status = int(lines[0].split()[1])
+            length = 0
+            for line in lines[1:]:
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+        except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            errors += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+        if status != expected:
+            errors += 1
+    if writer is not None:
+        writer.close()
+    return errors
+
+def run_client(host: str, port: int, requests: list, connections: int, duration: float):
+    """One client process: (latencies, errors, elapsed) over its share of the requests"""
+
+    async def run():
+        deadline = time.perf_counter() + duration
+        latencies = []
+        errors = await asyncio.gather(*[
+            _drive(host, port, requests[index::connections], deadline, latencies)
+            for index in range(connections)
+        ])
+        return latencies, sum(errors)
+
+    start = time.perf_counter()
+    latencies, errors = asyncio.run(run())
+    return latencies, errors, time.perf_counter() - start
+
+def load(host: str, port: int, requests: list, clients: int, connections: int, duration: float) -> dict:
+    """Split requests across client processes and combine their results"""
+    per_client = max(1, connections // clients)
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.starmap(run_client, [
+            (host, port, requests[index::clients], per_client, duration) for index in range(clients)
+        ])
+    latencies = [latency for result in results for latency in result[0]]
+    return summarize(latencies, max(result[2] for result in results), sum(result[1] for result in results))
+
+def start_server(workers: int, port: int, pin: bool) -> subprocess.Popen:
+    """Launch start.py in production mode on the scratch database and wait until it answers.
+
+    The server inherits DATABASE_URL and RESPONSE_CACHE_MAX_ENTRIES from the
+    environment harness.py sets up on import, so it uses the same backend.
+    """
+    command = [sys.executable, "start.py", "--production", "--workers", str(workers),
+               "--host", "127.0.0.1", "--port", str(port), "--skip-install"]
+    if not pin:
+        command.append("--no-pin")
+    server = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        if _healthy(port, workers):
+            return server
+        time.sleep(0.5)
+    stop_server(server)
+    raise RuntimeError(f"Server with {workers} workers did not start within 60s")
+
+def _healthy(port: int, workers: int) -> bool:
+    """True once enough health checks succeed that every worker is likely accepting"""
+    async def check():
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /api/health HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        status = (await reader.readline()).split()[1]
+        writer.close()
+        return status == b"200"
+    try:
+        return all(asyncio.run(check()) for _ in range(workers * 2))
+    except (OSError, IndexError):
+        return False
+
+def stop_server(server: subprocess.Popen):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+async def prepare(source):
+    """Fresh scratch database, with no connections left open in this process"""
+    await reset_database(source)
+    await database.async_engine.dispose()
+    await database.async_read_engine.dispose()
+    database.read_engine.dispose()
+
+def report(workers: int, mix: str, stats: dict, baseline: dict = None):
+    speedup = f"x{stats['throughput_rps'] / baseline['throughput_rps']:.2f}" if baseline else "   -"
+    print(
+        f"{workers:>3} workers  {mix:<6} {stats['throughput_rps']:>9.1f} req/s  {speedup:>6}  "
+        f"p50 {stats['p50_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms  errors {stats['errors']}",
+        flush=True
+    )
+
+def main(args):
+    source = cached_database(Path(args.data_dir), args.rows, args.rebuild)
+    results = {"metadata": {**metadata(args), "rows": args.rows, "cpus": os.cpu_count()}, "runs": []}
+    baselines = {}
+    for workers in args.workers:
+        asyncio.run(prepare(source))
+        database.create_tables()
+        workload = Workload(args.rows)
+        # The server is the only one touching the database from here on
+        database.engine.dispose()
+        server = start_server(workers, args.port, not args.no_pin)
+        try:
+            for mix in args.mix:
+                requests = build_requests(workload, mix, args.requests)
+                stats = load("127.0.0.1", args.port, requests, args.clients, args.concurrency, args.duration)
+                report(workers, mix, stats, baselines.get(mix))
+                baselines.setdefault(mix, stats)
+                results["runs"].append({"workers": workers, "mix": mix, **stats})
+        finally:
+            stop_server(server)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure throughput from 1 to N server workers")
+    parser.add_argument("--rows", type=int, default=10000, help="Size of the generated catalog")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, os.cpu_count() or 1}), help="Worker counts to compare")
+    parser.add_argument("--mix", nargs="+", choices=list(MIXES), default=list(MIXES), help="Workloads to run")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per workload")
+    parser.add_argument("--requests", type=int, default=50000,
+                        help="Requests generated per workload (an upper bound on each run)")
+    parser.add_argument("--clients", type=int, default=2, help="Client processes generating load")
+    parser.add_argument("--concurrency", type=int, default=32, help="Keep-alive connections across all clients")
+    parser.add_argument("--response-cache", action="store_true", help="Keep the response cache enabled")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the server under test")
+    parser.add_argument("--no-pin", action="store_true", help="Don't pin server workers to CPUs")
+    add_backend_arguments(parser)
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate the cached database")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+    try:
+        main(args)
+    finally:
+        database.engine.dispose()
+        shutil.rmtree(harness.WORK_DIR, ignore_errors=True)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+SQL statements per request, for every route in harness.py's HTTP scenarios.
+
+Each scenario is sent a few times against a scratch copy of a generated
+catalog, and the most statements any one request ran is checked against
+STATEMENT_BUDGETS. Exits non-zero when a route goes over its budget (or has
+none), so a change that adds a round-trip to a route fails loudly.
+
+    python benchmarks/statement_counts.py
+    python benchmarks/statement_counts.py --backend postgresql --postgres-url postgresql://postgres@localhost/postgres
+"""
+
+import argparse
+import asyncio
+import logging
+import shutil
+import sys
+from pathlib import Path
+
+from sqlalchemy import event
+
+import harness
+from harness import (
+    HTTP_SCENARIOS, Workload, add_backend_arguments, cached_database, expected_statuses, reset_database
+)
+from asgi_client import request
+
+import database
+
+# Most statements one request to each scenario may run. Write transactions
+# count their BEGIN (SQLite's BEGIN IMMEDIATE is a statement) but not COMMIT,
+# and cached GET routes one lookup of the items version.
+STATEMENT_BUDGETS = {
+    "index": 0,
+    "health": 0,
+    "metrics": 0,
+    "get_item": 2,
+    # One IN query for the ids and one for the SKUs, per 500 keys
+    "batch_get[100]": 2,
+    "list_items": 3,
+    "list_items_cursor": 2,
+    "search_items": 3,
+    "category_items": 3,
+    # The version lookup, the page, and the count (or the facet GROUP BY, which gives the total)
+    "query_items": 3,
+    "query_items[facets]": 3,
+    "categories": 2,
+    "low_stock": 3,
+    "low_stock_count": 2,
+    "export_search": 1,
+    # BEGIN, then the write with RETURNING (PostgreSQL: the version lock instead of BEGIN)
+    "create_item": 2,
+    "update_item": 2,
+    "delete_item": 2,
+    # Batches: a fixed number of set-based statements, whatever the batch size
+    # (an upsert adds one per round of SKUs repeated within the batch)
+    "bulk_import[100]": 5,
+    "bulk_upsert[100]": 10,
+    "record_movement": 10,
+    "record_movements[100]": 9,
+    # The item, then the count and the page
+    "item_movements": 3,
+    # The item, the snapshots either side of the time, and the movements between
+    "stock_at": 4,
+    "locations": 1,
+    # BEGIN, the parent, the insert (and for a warehouse, setting its own id as its warehouse)
+    "create_location": 4,
+    "warehouses": 1,
+    # The warehouse with its summary total, then the page
+    "warehouse_stock": 2,
+    "item_locations": 4,
+    # BEGIN, the version lock, the bin, the item with its stock in other bins, the write
+    "set_location_stock": 5,
+    # Snapshots copy through sqlite3's backup API, outside the engines
+    "create_backup": 0,
+    "backups": 0,
+}
+
+async def count_statements(app, workload: Workload, repeat: int) -> dict:
+    """{scenario: (most statements in one request, statuses seen, expected status)}"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    # Every pool a route can run on: async (the default) and threaded (ASYNC_SESSIONS=off)
+    engines = (
+        database.engine, database.read_engine,
+        database.async_engine.sync_engine, database.async_read_engine.sync_engine,
+    )
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", record)
+    counts = {}
+    try:
+        for name, (method, _, make_request, expected, _) in HTTP_SCENARIOS.items():
+            # The first request warms per-engine caches (the search index check)
+            url, body = make_request(workload)
+            await request(app, method, url, body)
+            most, statuses = 0, set()
+            for _ in range(repeat):
+                url, body = make_request(workload)
+                executed.clear()
+                status, _, _ = await request(app, method, url, body)
+                statuses.add(status)
+                most = max(most, len(executed))
+            counts[name] = (most, statuses, expected)
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", record)
+    return counts
+
+async def main(args) -> int:
+    from main import app
+
+    logging.disable(logging.WARNING)
+    try:
+        source = cached_database(Path(args.data_dir), args.rows, args.rebuild)
+        await reset_database(source)
+        database.create_tables()
+        counts = await count_statements(app, Workload(args.rows), args.repeat)
+    finally:
+        await database.async_engine.dispose()
+        await database.async_read_engine.dispose()
+        database.engine.dispose()
+        database.read_engine.dispose()
+        shutil.rmtree(harness.WORK_DIR, ignore_errors=True)
+
+    failures = 0
+    for name, (most, statuses, expected) in counts.items():
+        budget = STATEMENT_BUDGETS.get(name)
+        problem = ""
+        if budget is None:
+            problem = "no budget"
+        elif most > budget:
+            problem = f"over budget of {budget}"
+        elif not statuses <= set(expected_statuses(expected)):
+            problem = f"status {sorted(statuses)}, expected {expected}"
+        failures += bool(problem)
+        print(f"{name:<28} {most:>4} statements  {'FAIL ' + problem if problem else 'ok'}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the SQL statements each route runs per request")
+    parser.add_argument("--rows", type=int, default=10000, help="Catalog size")
+    parser.add_argument("--repeat", type=int, default=5, help="Requests per scenario")
+    add_backend_arguments(parser)
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate the cached database")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,287 @@
+import codecs
+import csv
+import io
+import json
+import logging
+import os
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from crud import ItemCRUD
+from models import ItemCreate, ItemUpsert, StockMovementBatchItem
+
+logger = logging.getLogger(__name__)
+
+# Rows validated and written per transaction
+BULK_BATCH_SIZE = 500
+
+# Largest single record (JSON array element, NDJSON line or CSV record) buffered
+# while waiting for its end, in characters
+BULK_MAX_RECORD_SIZE = int(os.getenv("BULK_MAX_RECORD_SIZE", 1 << 20))
+
+class BulkParseError(ValueError):
+    """A body that stopped parsing, carrying the summary of the rows already written"""
+
+    def __init__(self, message: str, summary: dict):
+        super().__init__(message)
+        self.summary = summary
+
+def _check_record_size(size: int):
+    if size > BULK_MAX_RECORD_SIZE:
+        raise ValueError(f"Record exceeds {BULK_MAX_RECORD_SIZE} characters")
+
+class _JSONArrayParser:
+    """Incremental parser for a JSON array of objects arriving in chunks"""
+
+    def __init__(self):
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.state = "start"
+
+    def feed(self, text: str, final: bool = False) -> List[object]:
+        self.buffer += text
+        values = []
+        pos = 0
+        while True:
+            while pos < len(self.buffer) and self.buffer[pos].isspace():
+                pos += 1
+            if pos == len(self.buffer):
+                break
+            char = self.buffer[pos]
+            if self.state == "start":
+                if char != "[":
+                    raise ValueError("Expected a JSON array")
+                self.state = "first"
+                pos += 1
+            elif self.state in ("first", "next") and char == "]":
+                self.state = "done"
+                pos += 1
+            elif self.state == "next":
+                if char != ",":
+                    raise ValueError("Expected ',' or ']' in JSON array")
+                self.state = "value"
+                pos += 1
+            elif self.state in ("first", "value"):
+                try:
+                    value, end = self.decoder.raw_decode(self.buffer, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise ValueError("Malformed JSON array")
+                    _check_record_size(len(self.buffer) - pos)
+                    break
+                # A value ending at the buffer edge may be cut short (e.g. a number)
+                if end == len(self.buffer) and not final:
+                    _check_record_size(end - pos)
+                    break
+                values.append(value)
+                self.state = "next"
+                pos = end
+            else:
+                raise ValueError("Unexpected data after JSON array")
+        self.buffer = self.buffer[pos:]
+        if final and self.state != "done":
+            raise ValueError("Incomplete JSON array")
+        return values
+
+def _split_lines(buffer: str, final: bool) -> Tuple[List[str], str]:
+    """Split off complete lines, returning them and the unfinished remainder"""
+    lines = buffer.splitlines(keepends=True)
+    if lines and not final and not lines[-1].endswith(("\n", "\r")):
+        return lines[:-1], lines[-1]
+    return lines, ""
+
+class _NDJSONParser:
+    """Incremental parser for newline-delimited JSON"""
+
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, text: str, final: bool = False) -> List[object]:
+        lines, self.buffer = _split_lines(self.buffer + text, final)
+        _check_record_size(len(self.buffer))
+        records = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                records.append(ValueError(f"Invalid JSON: {e.msg}"))
+        return records
+
+class _CSVParser:
+    """Incremental parser for CSV with a header row; quoted fields may span lines"""
+
+    def __init__(self):
+        self.buffer = ""
+        self.record = ""
+        self.header: Optional[List[str]] = None
+
+    def feed(self, text: str, final: bool = False) -> List[object]:
+        lines, self.buffer = _split_lines(self.buffer + text, final)
+        records = []
+        for line in lines:
+            self.record += line
+            # A record is complete once its quotes are balanced
+            if self.record.count('"') % 2:
+                continue
+            record, self.record = self.record, ""
+            if not record.strip():
+                continue
+            fields = next(csv.reader(io.StringIO(record)))
+            if self.header is None:
+                self.header = [field.strip() for field in fields]
+                continue
+            if len(fields) != len(self.header):
+                records.append(ValueError(
+                    f"Expected {len(self.header)} columns, got {len(fields)}"
+                ))
+                continue
+            # Empty cells are treated as missing so model defaults apply
+            records.append({
+                name: value for name, value in zip(self.header, fields) if value != ""
+            })
+        if final and self.record:
+            records.append(ValueError("Unterminated quoted field"))
+            self.record = ""
+        _check_record_size(len(self.record) + len(self.buffer))
+        return records
+
+PARSERS = {
+    "application/json": _JSONArrayParser,
+    "application/x-ndjson": _NDJSONParser,
+    "application/jsonl": _NDJSONParser,
+    "text/csv": _CSVParser,
+}
+
+def get_parser(content_type: Optional[str]):
+    """Pick the record parser for a request content type"""
+    media_type = (content_type or "application/json").split(";")[0].strip().lower()
+    if media_type not in PARSERS:
+        raise ValueError(
+            f"Unsupported content type '{media_type}', expected one of: {', '.join(PARSERS)}"
+        )
+    return PARSERS[media_type]()
+
+async def parse_stream(chunks: AsyncIterator[bytes], parser) -> AsyncIterator[object]:
+    """Decode a byte stream and yield records as soon as they are complete"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    async for chunk in chunks:
+        for record in parser.feed(decoder.decode(chunk)):
+            yield record
+    for record in parser.feed(decoder.decode(b"", final=True), final=True):
+        yield record
+
+def _format_validation_error(error: ValidationError) -> str:
+    messages = []
+    for err in error.errors():
+        location = ".".join(str(part) for part in err["loc"])
+        messages.append(f"{location}: {err['msg']}" if location else err["msg"])
+    return "; ".join(messages)
+
+class BulkImporter:
+    """Validate records and write them in fixed-size batches.
+    
+    By default records are validated as ItemCreate and inserted with
+    ItemCRUD.add_many; pass ItemUpsert and ItemCRUD.upsert_many to sync by SKU,
+    or StockMovementBatchItem and ItemCRUD.record_movements to append movements.
+    add() reports when a batch is full; flush() writes it with a sync Session
+    (or, through AsyncSession.run_sync, off the event loop).
+    """
+
+    def __init__(self, batch_size: int = BULK_BATCH_SIZE, model=ItemCreate, write=ItemCRUD.add_many):
+        self.batch_size = batch_size
+        self.model = model
+        self.write = write
+        self.results: List[dict] = []
+        self.pending: List[Tuple[int, object]] = []
+        self.row = 0
+
+    def add(self, record: object) -> bool:
+        """Validate one record, returning True once a batch is ready to flush"""
+        self.row += 1
+        try:
+            if isinstance(record, Exception):
+                raise record
+            if not isinstance(record, dict):
+                raise ValueError("Expected a JSON object")
+            item = self.model(**record)
+        except ValidationError as e:
+            self._result(self.row, record, "error", _format_validation_error(e))
+        except ValueError as e:
+            self._result(self.row, record, "error", str(e))
+        else:
+            self.pending.append((self.row, item))
+        return len(self.pending) >= self.batch_size
+
+    def flush(self, db: Session):
+        if not self.pending:
+            return
+        rows, items = zip(*self.pending)
+        self.pending = []
+        for row, result in zip(rows, self.write(db, list(items))):
+            self.results.append({"row": row, **result})
+
+    def summary(self) -> dict:
+        self.results.sort(key=lambda result: result["row"])
+        created = sum(1 for result in self.results if result["status"] == "created")
+        updated = sum(1 for result in self.results if result["status"] == "updated")
+        recorded = sum(1 for result in self.results if result["status"] == "recorded")
+        return {
+            "total": len(self.results),
+            "created": created,
+            "updated": updated,
+            "recorded": recorded,
+            "failed": len(self.results) - created - updated - recorded,
+            "results": self.results
+        }
+
+    def _result(self, row: int, record: object, status: str, error: str):
+        sku = record.get("sku") if isinstance(record, dict) else None
+        if sku is not None:
+            sku = str(sku)
+        self.results.append({"row": row, "sku": sku, "status": status, "error": error})
+
+def import_items(db: Session, records, batch_size: int = BULK_BATCH_SIZE) -> dict:
+    """Import an iterable of item dicts, returning the per-row summary"""
+    importer = BulkImporter(batch_size)
+    for record in records:
+        if importer.add(record):
+            importer.flush(db)
+    importer.flush(db)
+    return importer.summary()
+
+async def _run_stream(db: AsyncSession, chunks: AsyncIterator[bytes], content_type: Optional[str],
+                      importer: BulkImporter) -> dict:
+    parser = get_parser(content_type)
+    try:
+        async for record in parse_stream(chunks, parser):
+            if importer.add(record):
+                await db.run_sync(importer.flush)
+    except ValueError as e:
+        # Earlier batches are already committed; rows still pending are dropped
+        importer.pending = []
+        message = f"{e} after row {importer.row}" if importer.row else str(e)
+        raise BulkParseError(message, importer.summary())
+    await db.run_sync(importer.flush)
+    return importer.summary()
+
+async def import_stream(db: AsyncSession, chunks: AsyncIterator[bytes], content_type: Optional[str],
+                        batch_size: int = BULK_BATCH_SIZE) -> dict:
+    """Import items from a streamed request body, returning the per-row summary"""
+    return await _run_stream(db, chunks, content_type, BulkImporter(batch_size))
+
+async def upsert_stream(db: AsyncSession, chunks: AsyncIterator[bytes], content_type: Optional[str],
+                        batch_size: int = BULK_BATCH_SIZE) -> dict:
+    """Create or update items by SKU from a streamed request body"""
+    importer = BulkImporter(batch_size, model=ItemUpsert, write=ItemCRUD.upsert_many)
+    return await _run_stream(db, chunks, content_type, importer)
+
+async def movements_stream(db: AsyncSession, chunks: AsyncIterator[bytes], content_type: Optional[str],
+                           batch_size: int = BULK_BATCH_SIZE) -> dict:
+    """Append stock movements keyed by SKU from a streamed request body"""
+    importer = BulkImporter(batch_size, model=StockMovementBatchItem, write=ItemCRUD.record_movements)
+    return await _run_stream(db, chunks, content_type, importer)
@@ -0,0 +1,170 @@
+import hashlib
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from sqlalchemy import select
+
+from database import TableVersion, async_read_engine
+
+logger = logging.getLogger(__name__)
+
+# Bounds for the in-process response cache
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1024))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 300))
+
+# GET endpoints whose responses depend only on the items table, matched in
+# full: an item's stock, movements and bins read other tables (and the clock),
+# and the export streams, so none of them may be buffered under this version
+CACHED_PATHS = re.compile(r"/api/items(/low-stock|/query|/category/[^/]+|/\d+)?|/api/categories")
+
+async def get_table_version(name: str = "items", engine=None) -> Optional[int]:
+    """Read a table's change counter (bumped by triggers on every write)"""
+    async with (engine or async_read_engine).connect() as conn:
+        return (await conn.execute(
+            select(TableVersion.version).where(TableVersion.name == name)
+        )).scalar()
+
+def make_etag(version: int, key: str) -> str:
+    """Strong ETag for one URL at one table version"""
+    digest = hashlib.sha1(f"{version}:{key}".encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str, exists: bool = False) -> bool:
+    """Whether If-None-Match names etag; "*" only matches when a representation is known to exist"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag or (candidate == "*" and exists):
+            return True
+    return False
+
+class ResponseCache:
+    """LRU cache of response bodies, bounded by entry count, total bytes and age"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 max_bytes: int = RESPONSE_CACHE_MAX_BYTES, ttl: float = RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, Tuple[str, float, list, bytes]]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, etag: str) -> Optional[Tuple[list, bytes]]:
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != etag or time.monotonic() - entry[1] > self.ttl:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[2], entry[3]
+
+    def has(self, key: str, etag: str) -> bool:
+        """Whether a fresh 200 is cached for key at etag, without counting a hit or miss"""
+        entry = self.entries.get(key)
+        return entry is not None and entry[0] == etag and time.monotonic() - entry[1] <= self.ttl
+
+    def put(self, key: str, etag: str, headers: list, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        self.discard(key)
+        self.entries[key] = (etag, time.monotonic(), headers, body)
+        self.size += len(body)
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            _, (_, _, _, evicted) = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def discard(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[3])
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+class ResponseCacheMiddleware:
+    """Conditional GET and response caching for the read endpoints.
+
+    Each request costs one lookup of the items version. The ETag is derived
+    from that version and the URL, so a matching If-None-Match gets a 304
+    without running the route, and an unchanged URL is served from memory.
+    Any write bumps the version, which invalidates every entry at once.
+    """
+
+    def __init__(self, app, cache: Optional[ResponseCache] = None, paths: re.Pattern = CACHED_PATHS,
+                 version_source=get_table_version):
+        self.app = app
+        self.cache = cache or ResponseCache()
+        self.paths = paths
+        self.version_source = version_source
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not self.paths.fullmatch(scope["path"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            version = await self.version_source()
+        except Exception as e:
+            logger.warning(f"Response cache bypassed, version lookup failed: {e}")
+            version = None
+        if version is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = scope["path"] + "?" + scope.get("query_string", b"").decode("latin-1")
+        etag = make_etag(version, key)
+        cache_headers = [
+            (b"etag", etag.encode()),
+            (b"cache-control", b"no-cache"),
+        ]
+        request_headers = dict(scope["headers"])
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+
+        # A wildcard can't be answered without knowing the route would find
+        # something, which only a cached 200 tells us
+        if etag_matches(if_none_match, etag, exists=self.cache.has(key, etag)):
+            await send({"type": "http.response.start", "status": 304, "headers": cache_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        cached = self.cache.get(key, etag)
+        if cached is not None:
+            headers, body = cached
+            await send({"type": "http.response.start", "status": 200, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        start_message = {}
+        chunks = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start_message.update(message)
+                if message["status"] == 200:
+                    message = {**message, "headers": [
+                        (name, value) for name, value in message.get("headers", [])
+                        if name.lower() not in (b"etag", b"cache-control")
+                    ] + cache_headers}
+                    start_message.update(message)
+            elif message["type"] == "http.response.body" and start_message.get("status") == 200:
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    self.cache.put(key, etag, start_message["headers"], b"".join(chunks))
+            await send(message)
+
+        await self.app(scope, receive, capture)
@@ -1,28 +1,851 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
-from database import Item
-from models import ItemCreate, ItemUpdate
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import (
+    DateTime, Integer, Numeric, Select, String, func, and_, or_, select, insert, bindparam, literal, literal_column,
+    text, tuple_
+)
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+from database import (
+    Item, CategorySummary, Location, LocationStock, StockMovement, StockSnapshot, TableVersion, WarehouseStock,
+    WarehouseSummary, ALLOCATED_STOCK_ERROR, DATABASE_BACKEND, LOCATION_KINDS, LOW_STOCK_THRESHOLD, MOVEMENT_KINDS, has_search_index,
+    snapshot_stock
+)
+import postgres
+from models import (
+    ItemCreate, ItemQuery, ItemUpdate, ItemUpsert, LocationCreate, StockMovementBatchItem, StockMovementCreate
+)
+from events import change_feed
+from replica import catalog_replica
+from serialization import batch_get_payload, decode_cursor, encode_cursor
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
+# List queries select plain rows of these columns (in ItemResponse field order)
+# instead of ORM objects, skipping identity-map and attribute instrumentation
+ITEM_COLUMNS = (
+    Item.name, Item.category, Item.description, Item.quantity, Item.price,
+    Item.sku, Item.location, Item.id, Item.created_at, Item.updated_at
+)
+
+# The same columns of the items Table, for one-row writes: a Core statement
+# skips the ORM's DML handling, which costs more than the write itself
+ITEM_TABLE_COLUMNS = tuple(Item.__table__.c[column.key] for column in ITEM_COLUMNS)
+
+MOVEMENT_COLUMNS = (
+    StockMovement.id, StockMovement.item_id, StockMovement.kind, StockMovement.delta, StockMovement.created_at
+)
+
+MOVEMENT_KIND_NAMES = {code: name for name, code in MOVEMENT_KINDS.items()}
+
+LOCATION_COLUMNS = (
+    Location.id, Location.kind, Location.name, Location.parent_id, Location.warehouse_id, Location.path
+)
+
+LOCATION_KIND_NAMES = {code: name for name, code in LOCATION_KINDS.items()}
+
+# The kind of location each kind sits in
+LOCATION_PARENT_KINDS = {"zone": "warehouse", "bin": "zone"}
+
+# Keys per IN (...) list in a batch lookup, well under SQLite's bound-parameter limit
+BATCH_GET_CHUNK_SIZE = 500
+
+# Columns GET /api/items/query sorts by (models.ITEM_SORT_KEYS) and counts facets of (models.ITEM_FACETS)
+QUERY_SORT_COLUMNS = {
+    "name": Item.name, "category": Item.category, "price": Item.price, "quantity": Item.quantity,
+    "created_at": Item.created_at, "updated_at": Item.updated_at, "id": Item.id,
+}
+FACET_COLUMNS = {"category": Item.category, "location": Item.location}
+
+# bm25 column weights for (name, sku, description) in the items_fts index
+SEARCH_WEIGHTS = "10.0, 5.0, 1.0"
+
+# Units of an item held in bins, which its quantity may not drop below
+ALLOCATED_QUANTITY = (
+    select(func.coalesce(func.sum(LocationStock.quantity), 0))
+    .where(LocationStock.item_id == Item.id)
+    .correlate(Item)
+    .scalar_subquery()
+)
+
+class StockAllocationError(Exception):
+    """A write would leave an item with less stock than its bins hold"""
+
+def _allocation_error(e: IntegrityError) -> Exception:
+    """The StockAllocationError behind an IntegrityError raised by items_allocated_bu, or e itself"""
+    if ALLOCATED_STOCK_ERROR in str(e.orig):
+        return StockAllocationError("Quantity would drop below the stock held in bins; take it out of bins first")
+    return e
+
+def is_duplicate_sku(e: IntegrityError) -> bool:
+    """Whether an IntegrityError is the unique index on items.sku rejecting a SKU"""
+    message = str(e.orig)
+    # SQLite names the column, PostgreSQL the index
+    return "items.sku" in message or "ix_items_sku" in message
+
+def _paginate(query, order_by: tuple, page: int, per_page: int,
+              cursor: Optional[str] = None, include_total: bool = True) -> dict:
+    """Page through query by OFFSET or, when a cursor is given, by keyset.
+    
+    Keyset pages seek straight to the rows after the cursor's sort key, so a
+    page costs the same at any depth. order_by may mix columns and
+    column.desc(). Pass include_total=False to skip the count() when walking
+    the whole result set.
+    """
+    total = query.order_by(None).count() if include_total else None
+    
+    columns = [_sort_column(term) for term in order_by]
+    query = query.order_by(*order_by)
+    if cursor:
+        last_key = decode_cursor(cursor, len(order_by))
+        last_key = [_cursor_value(column, value) for column, value in zip(columns, last_key)]
+        query = query.filter(_keyset_after(order_by, last_key))
+    else:
+        query = query.offset((page - 1) * per_page)
+    
+    # Fetch one extra row to learn whether another page follows
+    items = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+    
+    return {
+        "items": items,
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "total_pages": (total + per_page - 1) // per_page if total is not None else None,
+        "next_cursor": next_cursor
+    }
+
+def _is_descending(term) -> bool:
+    return isinstance(term, UnaryExpression) and term.modifier is operators.desc_op
+
+def _sort_column(term):
+    """The column an ORDER BY term sorts on"""
+    return term.element if _is_descending(term) else term
+
+def _cursor_value(column, value):
+    """A cursor value decoded from JSON, as the column's Python type.
+    
+    Cursors come from clients, so a value that doesn't fit the column (or a
+    None where the column can't be NULL) raises ValueError rather than
+    reaching the bind, where it would fail or silently compare across types.
+    """
+    if value is None:
+        if column.nullable:
+            return None
+    elif isinstance(value, bool):
+        pass
+    elif isinstance(column.type, DateTime):
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                pass
+    elif isinstance(column.type, Integer):
+        if isinstance(value, int):
+            return value
+    elif isinstance(column.type, Numeric):
+        if isinstance(value, (int, float)):
+            return value
+    elif isinstance(column.type, String):
+        if isinstance(value, str):
+            return value
+    raise ValueError("Invalid cursor")
+
+def _keyset_after(order_by: tuple, last_key: list):
+    """WHERE clause for the rows that sort after last_key in order_by"""
+    descending = [_is_descending(term) for term in order_by]
+    columns = [_sort_column(term) for term in order_by]
+    if len(columns) == 1:
+        return columns[0] < last_key[0] if descending[0] else columns[0] > last_key[0]
+    # One direction throughout: a row-value comparison the index can seek on
+    if not any(descending):
+        return tuple_(*columns) > tuple_(*last_key)
+    if all(descending):
+        return tuple_(*columns) < tuple_(*last_key)
+    # Mixed directions: the first column that differs decides
+    clauses = []
+    for index, (column, desc) in enumerate(zip(columns, descending)):
+        after = column < last_key[index] if desc else column > last_key[index]
+        equal = [columns[i] == last_key[i] for i in range(index)]
+        clauses.append(and_(*equal, after))
+    return or_(*clauses)
+
+def _replica_rows(db: Session, ids) -> List[dict]:
+    """The committed state of rows a bulk write changed, read inside its
+    transaction for the read replica (nothing is read while it is off)"""
+    if not catalog_replica.active or not ids:
+        return []
+    return [row._asdict() for row in db.execute(select(*ITEM_COLUMNS).where(Item.id.in_(ids)))]
+
+def _items_version(db: Session, lock: bool = False) -> Optional[int]:
+    """The items version as seen by the current transaction.
+    
+    Write methods read it first and last in their transaction and publish
+    both, which lets the change feed spot writes made by other processes.
+    The first read locks the row on PostgreSQL (SQLite's BEGIN IMMEDIATE has
+    already locked the database), so writers queue up front instead of
+    deadlocking on the trigger's update of it after locking items rows.
+    """
+    query = select(TableVersion.version).where(TableVersion.name == "items")
+    if lock:
+        query = query.with_for_update()
+    return db.scalar(query)
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+# The items version as it was before the statement: SQLite computes
+# RETURNING values before AFTER triggers bump it
+_VERSION_BEFORE = (
+    select(TableVersion.version).where(TableVersion.name == "items").scalar_subquery().label("items_version")
+)
+
+def _write_item(db: Session, statement) -> Tuple[Optional[dict], Tuple[Optional[int], Optional[int]]]:
+    """Run a one-row INSERT, UPDATE or DELETE as its transaction's only statement, and commit.
+    
+    Returns the row's ItemResponse fields from RETURNING and the items version
+    before and after, or (None, (None, None)) after rolling back if no row
+    matched. A one-row write moves the version by exactly one (a row trigger
+    on SQLite, a statement trigger on PostgreSQL). On PostgreSQL the version
+    is locked first, as _items_version explains, which costs one SELECT.
+    """
+    if _is_postgres(db):
+        before = _items_version(db, lock=True)
+        row = db.execute(statement.returning(*ITEM_TABLE_COLUMNS)).first()
+    else:
+        # BEGIN IMMEDIATE holds the write lock, so nothing moves the version in between
+        row = db.execute(statement.returning(*ITEM_TABLE_COLUMNS, _VERSION_BEFORE)).first()
+        before = row.items_version if row is not None else None
+    if row is None:
+        db.rollback()
+        return None, (None, None)
+    db.commit()
+    item = {column.key: row[index] for index, column in enumerate(ITEM_TABLE_COLUMNS)}
+    return item, (before, before + 1 if before is not None else None)
+
+def _insert_ids(db: Session, model, rows: List[dict]) -> List[int]:
+    """Insert rows with one multi-row INSERT and return their new ids in row order.
+    
+    SQLAlchemy can only match SQLite's RETURNING rows to their parameters by
+    running one INSERT per row. SQLite gives each inserted row the next
+    rowid, in order, under the write lock, so sorting the ids restores it.
+    """
+    if _is_postgres(db):
+        return db.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), rows).all()
+    return sorted(db.scalars(insert(model).returning(model.id), rows).all())
+
+def _movement_dict(row) -> dict:
+    return {
+        "id": row.id,
+        "item_id": row.item_id,
+        "kind": MOVEMENT_KIND_NAMES.get(row.kind, str(row.kind)),
+        "delta": row.delta,
+        "created_at": row.created_at,
+    }
+
+def _location_dict(row) -> dict:
+    return {**row._asdict(), "kind": LOCATION_KIND_NAMES.get(row.kind, str(row.kind))}
+
+def _as_utc(moment: datetime) -> datetime:
+    """Naive UTC datetime, as stored in the database"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+def _low_stock_filter(threshold: int) -> tuple:
+    """Filter for quantity <= threshold that can use idx_items_low_stock.
+    
+    SQLite only picks a partial index when the query provably implies the
+    index's WHERE clause, which a bound parameter never does, so thresholds
+    within the default also repeat the literal condition.
+    """
+    if threshold <= LOW_STOCK_THRESHOLD:
+        return (Item.quantity <= literal_column(str(LOW_STOCK_THRESHOLD)), Item.quantity <= threshold)
+    return (Item.quantity <= threshold,)
+
+def _fts_match_query(search_term: str) -> Optional[str]:
+    """Turn free text into an FTS5 query: every token must match as a prefix"""
+    tokens = re.findall(r"\w+", search_term)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+def _search_filter(search: str, use_search_index: bool = True):
+    """WHERE clause for items matching search, through the FTS5 (PostgreSQL:
+    trigram) index when there is one, else a LIKE on name, SKU and description"""
+    match_query = _fts_match_query(search)
+    if match_query is not None and use_search_index and DATABASE_BACKEND == "postgresql":
+        return postgres.search_filter(re.findall(r"\w+", search))
+    if match_query is not None and use_search_index:
+        return Item.id.in_(
+            select(literal_column("rowid"))
+            .select_from(text("items_fts"))
+            .where(text("items_fts MATCH :q").bindparams(q=match_query))
+        )
+    return or_(
+        Item.name.ilike(f"%{search}%"),
+        Item.sku.ilike(f"%{search}%"),
+        Item.description.ilike(f"%{search}%")
+    )
+
+def _item_query_filters(query: ItemQuery, use_search_index: bool) -> list:
+    """WHERE clauses for an ItemQuery's filters"""
+    filters = []
+    if len(query.category) == 1:
+        filters.append(Item.category == query.category[0])
+    elif query.category:
+        filters.append(Item.category.in_(query.category))
+    if len(query.location) == 1:
+        filters.append(Item.location == query.location[0])
+    elif query.location:
+        filters.append(Item.location.in_(query.location))
+    if query.min_price is not None:
+        filters.append(Item.price >= query.min_price)
+    if query.max_price is not None:
+        filters.append(Item.price <= query.max_price)
+    if query.min_quantity is not None:
+        filters.append(Item.quantity >= query.min_quantity)
+    if query.max_quantity is not None:
+        filters.append(Item.quantity <= query.max_quantity)
+    if query.search:
+        filters.append(_search_filter(query.search, use_search_index))
+    return filters
+
+def _facet_counts(counts: Counter, limit: int) -> List[dict]:
+    """The most common values first (ties by value, no value last), at most limit of them"""
+    ranked = sorted(counts.items(), key=lambda pair: (-pair[1], pair[0] is None, pair[0] or ""))
+    return [{"value": value, "count": count} for value, count in ranked[:limit]]
+
 class ItemCRUD:
     @staticmethod
-    def add(db: Session, item: ItemCreate) -> Item:
-        """Add a new item to inventory"""
+    def add(db: Session, item: ItemCreate) -> dict:
+        """Add a new item to inventory with a single INSERT ... RETURNING.
+        
+        A SKU that already exists fails the unique index and raises IntegrityError.
+        """
         try:
-            db_item = Item(**item.dict())
-            db.add(db_item)
-            db.commit()
-            db.refresh(db_item)
-            logger.info(f"Added item: {db_item.name} with SKU: {db_item.sku}")
-            return db_item
+            created, versions = _write_item(db, Item.__table__.insert().values(**item.dict()))
+            catalog_replica.apply([created], versions=versions)
+            change_feed.item_created(created, versions)
+            logger.info(f"Added item: {created['name']} with SKU: {created['sku']}")
+            return created
         except Exception as e:
             db.rollback()
             logger.error(f"Error adding item: {e}")
             raise
     
+    @staticmethod
+    def add_many(db: Session, items: List[ItemCreate]) -> List[dict]:
+        """Add a batch of items in one transaction, skipping SKUs that already exist.
+        
+        SKU conflicts are found with a single IN query and the remaining rows
+        are written with one executemany. Returns one result per input item.
+        """
+        try:
+            before = _items_version(db, lock=True)
+            skus = [item.sku for item in items]
+            taken = set(db.scalars(select(Item.sku).where(Item.sku.in_(skus))))
+            
+            results = []
+            rows = []
+            for item in items:
+                if item.sku in taken:
+                    results.append({
+                        "sku": item.sku,
+                        "status": "conflict",
+                        "error": f"Item with SKU '{item.sku}' already exists"
+                    })
+                    continue
+                taken.add(item.sku)
+                results.append({"sku": item.sku, "status": "created"})
+                rows.append(item.dict())
+            
+            if rows:
+                if _is_postgres(db):
+                    ids = postgres.copy_rows(db, Item.__table__, rows)
+                else:
+                    ids = _insert_ids(db, Item, rows)
+                created = iter(ids)
+                for result in results:
+                    if result["status"] == "created":
+                        result["id"] = next(created)
+            ids = [result["id"] for result in results if "id" in result]
+            replica_rows = _replica_rows(db, ids)
+            after = _items_version(db)
+            db.commit()
+            catalog_replica.apply(replica_rows, versions=(before, after))
+            change_feed.items_changed(ids, (before, after))
+            logger.info(f"Added {len(rows)} of {len(items)} items in bulk")
+            return results
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error adding items in bulk: {e}")
+            raise
+    
+    @staticmethod
+    def upsert_many(db: Session, items: List[ItemUpsert]) -> List[dict]:
+        """Create or partially update a batch of items keyed by SKU in one transaction.
+        
+        Only the fields set on each ItemUpsert are written. Rows carrying name
+        and category go through INSERT ... ON CONFLICT(sku) DO UPDATE; the rest
+        can only update existing SKUs. quantity_delta is applied in SQL as
+        quantity = quantity + delta so concurrent adjustments never overwrite
+        each other. Like a pick in record_movements, a delta that would take
+        stock below zero, or below what the item's bins hold, is rejected, as
+        is a quantity set below the stock in the item's bins (going by the
+        stock read at the start of the batch). Returns one result per input item.
+        """
+        table = Item.__table__
+        upsert = postgresql_insert if _is_postgres(db) else sqlite_insert
+        try:
+            before = _items_version(db, lock=True)
+            skus = [item.sku for item in items]
+            # SKU -> [quantity, units held in its bins], kept current as rows apply
+            balances = {
+                row.sku: [row.quantity or 0, row.allocated] for row in db.execute(
+                    select(Item.sku, Item.quantity, ALLOCATED_QUANTITY.label("allocated")).where(Item.sku.in_(skus))
+                )
+            }
+            
+            # A SKU repeated in the batch is applied in a later round so its
+            # changes land in request order; within a round SKUs are distinct
+            rounds: List[List[int]] = []
+            occurrences: dict = {}
+            for index, item in enumerate(items):
+                round_number = occurrences.get(item.sku, 0)
+                occurrences[item.sku] = round_number + 1
+                if round_number == len(rounds):
+                    rounds.append([])
+                rounds[round_number].append(index)
+            
+            results: List[dict] = [{} for _ in items]
+            for indexes in rounds:
+                groups: dict = {}
+                for index in indexes:
+                    item = items[index]
+                    fields = item.dict(exclude_unset=True)
+                    creatable = "name" in fields and "category" in fields
+                    balance = balances.get(item.sku)
+                    if balance is None and not creatable:
+                        results[index] = {
+                            "sku": item.sku,
+                            "status": "not_found",
+                            "error": f"Item with SKU '{item.sku}' not found; name and category are required to create it"
+                        }
+                        continue
+                    held, allocated = balance or (0, 0)
+                    quantity = held
+                    if "quantity_delta" in fields:
+                        quantity += fields["quantity_delta"]
+                    elif "quantity" in fields:
+                        quantity = fields["quantity"]
+                    if quantity < allocated:
+                        if "quantity_delta" in fields:
+                            available = f"{held - allocated} available outside bins" if allocated else f"{held} available"
+                            error = f"Insufficient stock for SKU '{item.sku}': {available}"
+                        else:
+                            error = f"Quantity of SKU '{item.sku}' can't go below the {allocated} units held in bins"
+                        results[index] = {"sku": item.sku, "status": "rejected", "error": error}
+                        continue
+                    results[index] = {
+                        "sku": item.sku,
+                        "status": "updated" if balance is not None else "created"
+                    }
+                    balances[item.sku] = [quantity, allocated]
+                    shape = (creatable, tuple(sorted(fields)))
+                    groups.setdefault(shape, []).append(fields)
+                
+                for (creatable, columns), rows in groups.items():
+                    changed = [column for column in columns if column not in ("sku", "quantity_delta")]
+                    delta = "quantity_delta" in columns
+                    if creatable:
+                        stmt = upsert(table)
+                        values = {column: stmt.excluded[column] for column in changed}
+                        values["updated_at"] = datetime.utcnow()
+                        if delta:
+                            values["quantity"] = func.coalesce(table.c.quantity, 0) + bindparam("quantity_delta")
+                            # A new SKU starts from the delta itself
+                            for row in rows:
+                                row["quantity"] = row["quantity_delta"]
+                        stmt = stmt.on_conflict_do_update(index_elements=[table.c.sku], set_=values)
+                    else:
+                        values = {column: bindparam(column) for column in changed}
+                        if delta:
+                            values["quantity"] = func.coalesce(table.c.quantity, 0) + bindparam("quantity_delta")
+                        if not values:
+                            continue
+                        stmt = table.update().where(table.c.sku == bindparam("key_sku")).values(values)
+                        for row in rows:
+                            row["key_sku"] = row.pop("sku")
+                    db.execute(stmt, rows)
+            
+            # Report ids and resulting quantities with one set-based read
+            current = {
+                row.sku: row for row in db.execute(
+                    select(Item.sku, Item.id, Item.quantity).where(Item.sku.in_(skus))
+                )
+            }
+            replica_rows = _replica_rows(db, [row.id for row in current.values()])
+            after = _items_version(db)
+            db.commit()
+            catalog_replica.apply(replica_rows, versions=(before, after))
+            for result in results:
+                if result["status"] in ("created", "updated") and result["sku"] in current:
+                    result["id"] = current[result["sku"]].id
+                    result["quantity"] = current[result["sku"]].quantity
+            change_feed.items_changed(sorted({result["id"] for result in results if "id" in result}), (before, after))
+            logger.info(f"Upserted {len(items)} items in bulk")
+            return results
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error upserting items in bulk: {e}")
+            raise
+    
+    @staticmethod
+    def record_movements(db: Session, movements: List[StockMovementBatchItem]) -> List[dict]:
+        """Append a batch of stock movements keyed by SKU in one transaction.
+        
+        Movements are appended with one executemany and each item's quantity
+        is moved once by the sum of its deltas (quantity = quantity + delta,
+        so concurrent writers never overwrite each other). A pick or
+        adjustment that would take stock below zero, or below what the
+        item's bins hold, going by the stock read at the start of the batch,
+        is rejected. Returns one result per movement.
+        """
+        try:
+            before = _items_version(db, lock=True)
+            skus = {movement.sku for movement in movements}
+            balances = {
+                row.sku: [row.id, row.quantity or 0, row.allocated] for row in db.execute(
+                    select(Item.sku, Item.id, Item.quantity, ALLOCATED_QUANTITY.label("allocated")).where(Item.sku.in_(skus))
+                )
+            }
+            
+            now = datetime.utcnow()
+            results = []
+            rows = []
+            for movement in movements:
+                if movement.sku not in balances:
+                    results.append({
+                        "sku": movement.sku,
+                        "status": "not_found",
+                        "error": f"Item with SKU '{movement.sku}' not found"
+                    })
+                    continue
+                balance = balances[movement.sku]
+                if balance[1] + movement.delta < balance[2]:
+                    available = f"{balance[1] - balance[2]} available outside bins" if balance[2] else f"{balance[1]} available"
+                    results.append({
+                        "sku": movement.sku,
+                        "status": "rejected",
+                        "id": balance[0],
+                        "quantity": balance[1],
+                        "error": f"Insufficient stock for SKU '{movement.sku}': {available}"
+                    })
+                    continue
+                balance[1] += movement.delta
+                results.append({"sku": movement.sku, "status": "recorded", "id": balance[0], "created_at": now})
+                rows.append({
+                    "item_id": balance[0],
+                    "kind": MOVEMENT_KINDS[movement.kind],
+                    "delta": movement.delta,
+                    "created_at": now
+                })
+            
+            if rows:
+                movement_ids = _insert_ids(db, StockMovement, rows)
+                # One quantity update per item, tagged with its last movement
+                # so the ledger trigger doesn't record it a second time
+                changes: dict = {}
+                recorded = iter(zip(rows, movement_ids))
+                for result in results:
+                    if result["status"] == "recorded":
+                        row, movement_id = next(recorded)
+                        result["movement_id"] = movement_id
+                        change = changes.setdefault(row["item_id"], {"key_id": row["item_id"], "delta": 0})
+                        change["delta"] += row["delta"]
+                        change["movement_id"] = movement_id
+                db.execute(
+                    Item.__table__.update()
+                    .where(Item.id == bindparam("key_id"))
+                    .values(
+                        quantity=func.coalesce(Item.quantity, 0) + bindparam("delta"),
+                        last_movement_id=bindparam("movement_id"),
+                        updated_at=now
+                    ),
+                    list(changes.values())
+                )
+                current = dict(db.execute(
+                    select(Item.id, Item.quantity).where(Item.id.in_(changes))
+                ).all())
+                for result in results:
+                    if result["status"] == "recorded":
+                        result["quantity"] = current.get(result["id"])
+                snapshot_stock(db)
+                replica_rows = _replica_rows(db, list(changes))
+                after = _items_version(db)
+            db.commit()
+            if rows:
+                catalog_replica.apply(replica_rows, versions=(before, after))
+                change_feed.items_changed(sorted(changes), (before, after))
+            logger.info(f"Recorded {len(rows)} of {len(movements)} stock movements")
+            return results
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error recording stock movements: {e}")
+            raise
+    
+    @staticmethod
+    def record_movement(db: Session, item_id: int, movement: StockMovementCreate) -> Optional[dict]:
+        """Append one stock movement to an item, raising ValueError if stock would go negative"""
+        sku = db.scalar(select(Item.sku).where(Item.id == item_id))
+        if sku is None:
+            return None
+        result = ItemCRUD.record_movements(
+            db, [StockMovementBatchItem(sku=sku, **movement.model_dump())]
+        )[0]
+        if result["status"] != "recorded":
+            raise ValueError(result["error"])
+        return {
+            "id": result["movement_id"],
+            "item_id": item_id,
+            "kind": movement.kind,
+            "delta": movement.delta,
+            "created_at": result["created_at"],
+            "quantity": result["quantity"]
+        }
+    
+    @staticmethod
+    def get_movements(db: Session, item_id: int, page: int = 1, per_page: int = 50,
+                      cursor: Optional[str] = None, include_total: bool = True) -> Optional[dict]:
+        """Get an item's stock movements, oldest first, with page or cursor pagination, or None if it doesn't exist"""
+        if db.scalar(select(Item.id).where(Item.id == item_id)) is None:
+            return None
+        query = db.query(*MOVEMENT_COLUMNS).filter(StockMovement.item_id == item_id)
+        result = _paginate(query, (StockMovement.id,), page, per_page, cursor, include_total)
+        result["items"] = [_movement_dict(row) for row in result["items"]]
+        return result
+    
+    @staticmethod
+    def get_stock_at(db: Session, item_id: int, at: datetime) -> Optional[int]:
+        """An item's quantity at a point in time, or None if it doesn't exist.
+        
+        Starts from the last snapshot taken at or before the time and adds the
+        movements after it, stopping at the next snapshot, so at most
+        STOCK_SNAPSHOT_INTERVAL movements are summed whatever the ledger's size.
+        """
+        if db.scalar(select(Item.id).where(Item.id == item_id)) is None:
+            return None
+        at = _as_utc(at)
+        before = db.execute(
+            select(StockSnapshot.movement_id, StockSnapshot.quantity)
+            .where(StockSnapshot.item_id == item_id, StockSnapshot.taken_at <= at)
+            .order_by(StockSnapshot.taken_at.desc(), StockSnapshot.movement_id.desc())
+            .limit(1)
+        ).first()
+        after = db.scalar(
+            select(StockSnapshot.movement_id)
+            .where(StockSnapshot.item_id == item_id, StockSnapshot.taken_at > at)
+            .order_by(StockSnapshot.taken_at, StockSnapshot.movement_id)
+            .limit(1)
+        )
+        replay = select(func.coalesce(func.sum(StockMovement.delta), 0)).where(
+            StockMovement.item_id == item_id,
+            StockMovement.id > (before.movement_id if before else 0),
+            StockMovement.created_at <= at
+        )
+        if after is not None:
+            replay = replay.where(StockMovement.id <= after)
+        return (before.quantity if before else 0) + db.scalar(replay)
+    
+    @staticmethod
+    def add_location(db: Session, location: LocationCreate) -> dict:
+        """Add a warehouse, zone or bin, raising ValueError if its parent is missing or of the wrong kind.
+        
+        A path that already exists (the same name under the same parent)
+        fails the unique index and raises IntegrityError.
+        """
+        try:
+            path, warehouse_id = location.name, None
+            if location.parent_id is not None:
+                parent = db.execute(
+                    select(Location.kind, Location.warehouse_id, Location.path).where(Location.id == location.parent_id)
+                ).first()
+                if parent is None:
+                    raise ValueError(f"Parent location {location.parent_id} not found")
+                expected = LOCATION_PARENT_KINDS[location.kind]
+                if parent.kind != LOCATION_KINDS[expected]:
+                    raise ValueError(f"The parent of a {location.kind} must be a {expected}")
+                path, warehouse_id = f"{parent.path}/{location.name}", parent.warehouse_id
+            
+            location_id = db.scalar(
+                insert(Location).values(
+                    kind=LOCATION_KINDS[location.kind], name=location.name, parent_id=location.parent_id,
+                    warehouse_id=warehouse_id, path=path
+                ).returning(Location.id)
+            )
+            if warehouse_id is None:
+                # A warehouse is its own warehouse, which its id is needed for
+                warehouse_id = location_id
+                db.execute(Location.__table__.update().where(Location.id == location_id).values(warehouse_id=location_id))
+            db.commit()
+            logger.info(f"Added {location.kind} {path} (ID: {location_id})")
+            return {
+                "id": location_id,
+                "kind": location.kind,
+                "name": location.name,
+                "parent_id": location.parent_id,
+                "warehouse_id": warehouse_id,
+                "path": path,
+            }
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error adding location {location.name}: {e}")
+            raise
+    
+    @staticmethod
+    def get_locations(db: Session, warehouse_id: Optional[int] = None) -> List[dict]:
+        """Get every location, or one warehouse's, in path order"""
+        query = select(*LOCATION_COLUMNS).order_by(Location.path)
+        if warehouse_id is not None:
+            query = query.where(Location.warehouse_id == warehouse_id)
+        return [_location_dict(row) for row in db.execute(query)]
+    
+    @staticmethod
+    def get_warehouses(db: Session) -> List[dict]:
+        """Get every warehouse with its item count and total stock from the trigger-maintained summary"""
+        rows = db.execute(
+            select(
+                Location.id, Location.name,
+                func.coalesce(WarehouseSummary.item_count, 0).label("item_count"),
+                func.coalesce(WarehouseSummary.total_quantity, 0).label("total_quantity")
+            )
+            .outerjoin(WarehouseSummary, WarehouseSummary.warehouse_id == Location.id)
+            .where(Location.kind == LOCATION_KINDS["warehouse"])
+            .order_by(Location.name)
+        )
+        return [row._asdict() for row in rows]
+    
+    @staticmethod
+    def get_warehouse_stock(db: Session, warehouse_id: int, page: int = 1, per_page: int = 50,
+                            cursor: Optional[str] = None, include_total: bool = True) -> Optional[dict]:
+        """Get the items a warehouse holds and how many of each, in item id order, or None if it doesn't exist.
+        
+        Quantities come from warehouse_stock and the total from warehouse_summary,
+        so neither sums bins.
+        """
+        warehouse = db.execute(
+            select(Location.id, func.coalesce(WarehouseSummary.item_count, 0).label("item_count"))
+            .outerjoin(WarehouseSummary, WarehouseSummary.warehouse_id == Location.id)
+            .where(Location.id == warehouse_id, Location.kind == LOCATION_KINDS["warehouse"])
+        ).first()
+        if warehouse is None:
+            return None
+        query = (
+            db.query(WarehouseStock.item_id, Item.sku, Item.name, WarehouseStock.quantity)
+            .join(Item, Item.id == WarehouseStock.item_id)
+            .filter(WarehouseStock.warehouse_id == warehouse_id)
+        )
+        result = _paginate(query, (WarehouseStock.item_id,), page, per_page, cursor, include_total=False)
+        result["items"] = [row._asdict() for row in result["items"]]
+        if include_total:
+            result["total"] = warehouse.item_count
+            result["total_pages"] = (warehouse.item_count + per_page - 1) // per_page
+        return result
+    
+    @staticmethod
+    def get_item_locations(db: Session, item_id: int) -> Optional[dict]:
+        """Get an item's stock per warehouse and per bin, or None if it doesn't exist"""
+        item = db.execute(select(Item.quantity).where(Item.id == item_id)).first()
+        if item is None:
+            return None
+        warehouses = db.execute(
+            select(WarehouseStock.warehouse_id, Location.name, WarehouseStock.quantity)
+            .join(Location, Location.id == WarehouseStock.warehouse_id)
+            .where(WarehouseStock.item_id == item_id)
+            .order_by(Location.name)
+        ).all()
+        locations = db.execute(
+            select(LocationStock.location_id, Location.path, LocationStock.quantity)
+            .join(Location, Location.id == LocationStock.location_id)
+            .where(LocationStock.item_id == item_id)
+            .order_by(Location.path)
+        ).all()
+        quantity = item.quantity or 0
+        return {
+            "item_id": item_id,
+            "quantity": quantity,
+            "unassigned": quantity - sum(row.quantity for row in warehouses),
+            "warehouses": [row._asdict() for row in warehouses],
+            "locations": [row._asdict() for row in locations],
+        }
+    
+    @staticmethod
+    def set_location_stock(db: Session, item_id: int, location_id: int, quantity: int) -> Optional[dict]:
+        """Set how many units of an item a bin holds, or return None if the item or bin doesn't exist.
+        
+        Bins hold part of the item's quantity, which doesn't change: stock
+        put in a bin comes out of the item's unassigned stock, and stock
+        taken out goes back to it. Raises StockAllocationError if there
+        isn't enough unassigned stock, and ValueError if the location isn't a bin.
+        """
+        try:
+            _items_version(db, lock=True)
+            kind = db.scalar(select(Location.kind).where(Location.id == location_id))
+            if kind is None:
+                db.rollback()
+                return None
+            if kind != LOCATION_KINDS["bin"]:
+                raise ValueError(f"Stock is held in bins; location {location_id} is a {LOCATION_KIND_NAMES[kind]}")
+            
+            table = LocationStock.__table__
+            key = (table.c.location_id == location_id, table.c.item_id == item_id)
+            # Held in the item's other bins
+            elsewhere = (
+                select(func.coalesce(func.sum(table.c.quantity), 0))
+                .where(table.c.item_id == item_id, table.c.location_id != location_id)
+                .scalar_subquery()
+            )
+            item = db.execute(select(Item.quantity, elsewhere).where(Item.id == item_id)).first()
+            if item is None:
+                db.rollback()
+                return None
+            item_quantity, held = item[0] or 0, item[1]
+            if held + quantity > item_quantity:
+                raise StockAllocationError(
+                    f"Item {item_id} has {item_quantity - held} units that aren't in other bins; "
+                    f"can't put {quantity} in location {location_id}"
+                )
+            
+            if quantity:
+                upsert = postgresql_insert if _is_postgres(db) else sqlite_insert
+                stmt = upsert(table).values(location_id=location_id, item_id=item_id, quantity=quantity)
+                db.execute(stmt.on_conflict_do_update(
+                    index_elements=[table.c.location_id, table.c.item_id], set_={"quantity": stmt.excluded.quantity}
+                ))
+            else:
+                db.execute(table.delete().where(*key))
+            db.commit()
+            logger.info(f"Set stock of item {item_id} in location {location_id} to {quantity}")
+            return {"item_id": item_id, "location_id": location_id, "quantity": quantity, "item_quantity": item_quantity}
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error setting stock of item {item_id} in location {location_id}: {e}")
+            raise
+    
     @staticmethod
     def get_one(db: Session, item_id: int) -> Optional[Item]:
         """Get a single item by ID with optimized query"""
@@ -34,21 +857,45 @@ class ItemCRUD:
         return db.query(Item).filter(Item.sku == sku).first()
     
     @staticmethod
-    def update(db: Session, item_id: int, item_update: ItemUpdate) -> Optional[Item]:
-        """Update an existing item"""
+    def get_many(db: Session, ids: List[int], skus: List[str]) -> dict:
+        """Look up items by id and by SKU with chunked IN queries in one session.
+        
+        Returns one result per key, ids first and then SKUs, each in request
+        order; a key with no item is marked not_found. Repeated keys are
+        queried once.
+        """
+        found = {}
+        for keys, column in ((ids, Item.id), (skus, Item.sku)):
+            unique = list(dict.fromkeys(keys))
+            matches = found[column.key] = {}
+            for start in range(0, len(unique), BATCH_GET_CHUNK_SIZE):
+                chunk = unique[start:start + BATCH_GET_CHUNK_SIZE]
+                for row in db.execute(select(*ITEM_COLUMNS).where(column.in_(chunk))):
+                    matches[getattr(row, column.key)] = row._asdict()
+        return batch_get_payload(ids, skus, found["id"].get, found["sku"].get)
+    
+    @staticmethod
+    def update(db: Session, item_id: int, item_update: ItemUpdate) -> Optional[dict]:
+        """Update an existing item with a single UPDATE ... RETURNING, or return None if it doesn't exist"""
         try:
-            db_item = db.query(Item).filter(Item.id == item_id).first()
-            if not db_item:
-                return None
-            
             update_data = item_update.dict(exclude_unset=True)
-            for field, value in update_data.items():
-                setattr(db_item, field, value)
+            if not update_data:
+                # Nothing to write; report the item as it stands
+                row = db.execute(select(*ITEM_COLUMNS).where(Item.id == item_id)).first()
+                db.rollback()
+                return row._asdict() if row else None
             
-            db.commit()
-            db.refresh(db_item)
-            logger.info(f"Updated item: {db_item.name} (ID: {item_id})")
-            return db_item
+            table = Item.__table__
+            try:
+                updated, versions = _write_item(db, table.update().where(table.c.id == item_id).values(**update_data))
+            except IntegrityError as e:
+                raise _allocation_error(e)
+            if updated is None:
+                return None
+            catalog_replica.apply([updated], versions=versions)
+            change_feed.item_updated(updated, versions)
+            logger.info(f"Updated item: {updated['name']} (ID: {item_id})")
+            return updated
         except Exception as e:
             db.rollback()
             logger.error(f"Error updating item {item_id}: {e}")
@@ -56,15 +903,15 @@ class ItemCRUD:
     
     @staticmethod
     def delete(db: Session, item_id: int) -> bool:
-        """Delete an item by ID"""
+        """Delete an item by ID with a single DELETE ... RETURNING"""
         try:
-            db_item = db.query(Item).filter(Item.id == item_id).first()
-            if not db_item:
+            table = Item.__table__
+            deleted, versions = _write_item(db, table.delete().where(table.c.id == item_id))
+            if deleted is None:
                 return False
-            
-            db.delete(db_item)
-            db.commit()
-            logger.info(f"Deleted item: {db_item.name} (ID: {item_id})")
+            catalog_replica.apply(deleted=[item_id], versions=versions)
+            change_feed.item_deleted(item_id, versions)
+            logger.info(f"Deleted item: {deleted['name']} (ID: {item_id})")
             return True
         except Exception as e:
             db.rollback()
@@ -72,37 +919,99 @@ class ItemCRUD:
             raise
     
     @staticmethod
-    def get_category(db: Session, category: str, page: int = 1, per_page: int = 50) -> dict:
-        """Get items by category with pagination and optimized query"""
-        offset = (page - 1) * per_page
-        
-        # Use index on category for efficient filtering
-        query = db.query(Item).filter(Item.category == category)
-        total = query.count()
+    def write_batch(db: Session, writes: List[Tuple[str, Optional[int], object]]) -> List[object]:
+        """Apply queued ("add", None, ItemCreate), ("update", id, ItemUpdate) and
+        ("delete", id, None) writes in one transaction: a group commit.
         
-        items = query.offset(offset).limit(per_page).all()
+        A write that fails the unique SKU index, or would take an item's
+        quantity below the stock in its bins, rolls back alone and its
+        IntegrityError (or StockAllocationError) takes its place in the
+        results; the rest commit together. Other results are what add,
+        update and delete return.
+        Every write that changes a row moves the items version by exactly
+        one, so each is published with its own versions, as if it had
+        committed alone.
+        """
+        table = Item.__table__
+        # SQLite undoes just the failing statement, and a write that matches
+        # no row fires no triggers. On PostgreSQL an error aborts the whole
+        # transaction and the version's statement trigger fires regardless,
+        # so each write gets a SAVEPOINT to roll back to.
+        savepoints = _is_postgres(db)
+        try:
+            version = _items_version(db, lock=True)
+            results, changes = [], []
+            for kind, item_id, payload in writes:
+                if kind == "add":
+                    statement = table.insert().values(**payload.dict())
+                elif kind == "update":
+                    update_data = payload.dict(exclude_unset=True)
+                    if not update_data:
+                        row = db.execute(select(*ITEM_COLUMNS).where(Item.id == item_id)).first()
+                        results.append(row._asdict() if row else None)
+                        continue
+                    statement = table.update().where(table.c.id == item_id).values(**update_data)
+                else:
+                    statement = table.delete().where(table.c.id == item_id)
+                
+                savepoint = db.begin_nested() if savepoints else None
+                try:
+                    row = db.execute(statement.returning(*ITEM_TABLE_COLUMNS)).first()
+                except IntegrityError as e:
+                    if savepoint is not None:
+                        savepoint.rollback()
+                    results.append(_allocation_error(e))
+                    continue
+                if row is None:
+                    if savepoint is not None:
+                        savepoint.rollback()
+                    results.append(False if kind == "delete" else None)
+                    continue
+                if savepoint is not None:
+                    savepoint.commit()
+                item = {column.key: row[index] for index, column in enumerate(ITEM_TABLE_COLUMNS)}
+                after = version + 1 if version is not None else None
+                changes.append((kind, item, (version, after)))
+                version = after
+                results.append(True if kind == "delete" else item)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error committing {len(writes)} queued writes: {e}")
+            raise
         
-        return {
-            "items": items,
-            "total": total,
-            "page": page,
-            "per_page": per_page,
-            "total_pages": (total + per_page - 1) // per_page
-        }
+        for kind, item, versions in changes:
+            if kind == "delete":
+                catalog_replica.apply(deleted=[item["id"]], versions=versions)
+                change_feed.item_deleted(item["id"], versions)
+            else:
+                catalog_replica.apply([item], versions=versions)
+                if kind == "add":
+                    change_feed.item_created(item, versions)
+                else:
+                    change_feed.item_updated(item, versions)
+        logger.info(f"Committed {len(changes)} of {len(writes)} queued writes in one transaction")
+        return results
+    
+    @staticmethod
+    def get_category(db: Session, category: str, page: int = 1, per_page: int = 50,
+                     cursor: Optional[str] = None, include_total: bool = True) -> dict:
+        """Get items by category with pagination and optimized query"""
+        # Use idx_category_name for filtering and ordering; its entries end
+        # in id (SQLite's implicit rowid), so (name, id) is a unique, indexed key
+        query = db.query(*ITEM_COLUMNS).filter(Item.category == category)
+        return _paginate(query, (Item.name, Item.id), page, per_page, cursor, include_total)
     
     @staticmethod
     def get_categories(db: Session) -> List[dict]:
-        """Get all categories with item count and total value - optimized with aggregation"""
-        result = db.query(
-            Item.category,
-            func.count(Item.id).label('item_count'),
-            func.sum(Item.quantity * Item.price).label('total_value')
-        ).group_by(Item.category).all()
+        """Get all categories with item count and totals from the trigger-maintained summary"""
+        result = db.query(CategorySummary).order_by(CategorySummary.category).all()
         
         return [
             {
                 "category": row.category,
                 "item_count": row.item_count,
+                "total_quantity": row.total_quantity,
                 "total_value": float(row.total_value or 0)
             }
             for row in result
@@ -110,7 +1019,73 @@ class ItemCRUD:
     
     @staticmethod
     def search_items(db: Session, search_term: str, page: int = 1, per_page: int = 50) -> dict:
-        """Search items by name, SKU, or description with pagination"""
+        """Search items by name, SKU, or description with pagination, ranked by relevance"""
+        match_query = _fts_match_query(search_term)
+        if match_query is None or not has_search_index(db.connection()):
+            return ItemCRUD._search_items_like(db, search_term, page, per_page)
+        if _is_postgres(db):
+            return ItemCRUD._search_items_trigram(db, search_term, page, per_page)
+        
+        offset = (page - 1) * per_page
+        
+        # Count and rank straight from the FTS5 index instead of scanning items
+        total = db.execute(
+            text("SELECT count(*) FROM items_fts WHERE items_fts MATCH :q"),
+            {"q": match_query}
+        ).scalar()
+        
+        ranked = (
+            select(
+                literal_column("rowid").label("id"),
+                literal_column(f"bm25(items_fts, {SEARCH_WEIGHTS})").label("score")
+            )
+            .select_from(text("items_fts"))
+            .where(text("items_fts MATCH :q"))
+            .subquery()
+        )
+        items = (
+            db.query(*ITEM_COLUMNS)
+            .join(ranked, Item.id == ranked.c.id)
+            .order_by(ranked.c.score, Item.id)
+            .offset(offset)
+            .limit(per_page)
+            .params(q=match_query)
+            .all()
+        )
+        
+        return {
+            "items": items,
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "total_pages": (total + per_page - 1) // per_page
+        }
+    
+    @staticmethod
+    def _search_items_trigram(db: Session, search_term: str, page: int = 1, per_page: int = 50) -> dict:
+        """PostgreSQL search: every word as a substring, found through the pg_trgm index"""
+        tokens = re.findall(r"\w+", search_term)
+        query = db.query(*ITEM_COLUMNS).filter(postgres.search_filter(tokens))
+        total = query.count()
+        
+        items = (
+            query.order_by(postgres.search_rank(tokens).desc(), Item.id)
+            .offset((page - 1) * per_page)
+            .limit(per_page)
+            .all()
+        )
+        
+        return {
+            "items": items,
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "total_pages": (total + per_page - 1) // per_page
+        }
+    
+    @staticmethod
+    def _search_items_like(db: Session, search_term: str, page: int = 1, per_page: int = 50) -> dict:
+        """Substring search fallback for terms the FTS index cannot express"""
         offset = (page - 1) * per_page
         
         # Use OR condition for flexible search across indexed fields
@@ -120,7 +1095,7 @@ class ItemCRUD:
             Item.description.ilike(f"%{search_term}%")
         )
         
-        query = db.query(Item).filter(search_filter)
+        query = db.query(*ITEM_COLUMNS).filter(search_filter)
         total = query.count()
         
         items = query.offset(offset).limit(per_page).all()
@@ -134,22 +1109,189 @@ class ItemCRUD:
         }
     
     @staticmethod
-    def get_low_stock(db: Session, threshold: int = 10) -> List[Item]:
-        """Get items with low stock using quantity index"""
-        return db.query(Item).filter(Item.quantity <= threshold).all()
+    def get_low_stock(db: Session, threshold: int = LOW_STOCK_THRESHOLD, page: int = 1, per_page: int = 50,
+                      cursor: Optional[str] = None, include_total: bool = True) -> dict:
+        """Get low stock items, lowest quantity first, with page or cursor pagination"""
+        query = db.query(*ITEM_COLUMNS).filter(*_low_stock_filter(threshold))
+        return _paginate(query, (Item.quantity, Item.id), page, per_page, cursor, include_total)
     
     @staticmethod
-    def get_all_paginated(db: Session, page: int = 1, per_page: int = 50) -> dict:
-        """Get all items with pagination"""
-        offset = (page - 1) * per_page
+    def count_low_stock(db: Session, threshold: int = LOW_STOCK_THRESHOLD) -> int:
+        """Count low stock items without loading them"""
+        return db.query(func.count()).select_from(Item).filter(*_low_stock_filter(threshold)).scalar()
+    
+    @staticmethod
+    def query_items(db: Session, query: ItemQuery, page: int = 1, per_page: int = 50,
+                    cursor: Optional[str] = None, include_total: bool = True, facet_limit: int = 50) -> dict:
+        """Filter, sort and page items, with facet counts over every matching item.
         
-        total = db.query(Item).count()
-        items = db.query(Item).offset(offset).limit(per_page).all()
+        Filters are plain column conditions the planner matches to
+        idx_category_name (a category by name), idx_category_price (a
+        category by price), idx_items_price (price ranges and order),
+        ix_items_quantity, or idx_items_facets, which holds every filtered
+        column so counts never read the table. The facets come from one GROUP BY over all requested
+        facet columns, which also gives the total: a faceted page is two
+        statements, like a counted one.
+        """
+        filters = _item_query_filters(query, bool(query.search) and has_search_index(db.connection()))
+        order_by = [
+            QUERY_SORT_COLUMNS[key[1:]].desc() if key.startswith("-") else QUERY_SORT_COLUMNS[key]
+            for key in query.sort
+        ]
+        # id breaks ties, so every row has a unique sort key for cursors. It
+        # follows the last key's direction: index entries end in id, so a
+        # backward index walk yields (price DESC, id DESC) without a sort.
+        if "id" not in [key.lstrip("-") for key in query.sort]:
+            order_by.append(Item.id.desc() if query.sort and query.sort[-1].startswith("-") else Item.id)
         
-        return {
-            "items": items,
-            "total": total,
-            "page": page,
-            "per_page": per_page,
-            "total_pages": (total + per_page - 1) // per_page
-        } 
\ No newline at end of file
+        result = _paginate(
+            db.query(*ITEM_COLUMNS).filter(*filters), tuple(order_by), page, per_page, cursor,
+            include_total and not query.facets
+        )
+        result["facets"] = None
+        if query.facets:
+            columns = [FACET_COLUMNS[facet] for facet in query.facets]
+            groups = db.execute(select(*columns, func.count()).where(*filters).group_by(*columns)).all()
+            counts = {facet: Counter() for facet in query.facets}
+            for *values, count in groups:
+                for facet, value in zip(query.facets, values):
+                    counts[facet][value] += count
+            result["facets"] = {facet: _facet_counts(counts[facet], facet_limit) for facet in query.facets}
+            if include_total:
+                total = sum(count for *_, count in groups)
+                result["total"] = total
+                result["total_pages"] = (total + per_page - 1) // per_page
+        return result
+    
+    @staticmethod
+    def export_select(category: Optional[str] = None, search: Optional[str] = None,
+                      use_search_index: bool = True) -> Select:
+        """Build the query for a full or filtered catalog export, in id order"""
+        statement = select(*ITEM_COLUMNS).order_by(Item.id)
+        if category:
+            statement = statement.where(Item.category == category)
+        if search:
+            statement = statement.where(_search_filter(search, use_search_index))
+        return statement
+    
+    @staticmethod
+    def get_all_paginated(db: Session, page: int = 1, per_page: int = 50,
+                          cursor: Optional[str] = None, include_total: bool = True) -> dict:
+        """Get all items with pagination"""
+        return _paginate(db.query(*ITEM_COLUMNS), (Item.id,), page, per_page, cursor, include_total)
+
+
+class AsyncItemCRUD:
+    """ItemCRUD for the route sessions (database.get_async_db).
+    
+    Each method runs the matching ItemCRUD method through the session's
+    run_sync, so the query logic lives in one place while the database I/O
+    happens on aiosqlite's worker thread (or the threadpool, with
+    ASYNC_SESSIONS off) instead of the event loop.
+    """
+    @staticmethod
+    async def add(db: AsyncSession, item: ItemCreate) -> dict:
+        return await db.run_sync(ItemCRUD.add, item)
+    
+    @staticmethod
+    async def add_many(db: AsyncSession, items: List[ItemCreate]) -> List[dict]:
+        return await db.run_sync(ItemCRUD.add_many, items)
+    
+    @staticmethod
+    async def upsert_many(db: AsyncSession, items: List[ItemUpsert]) -> List[dict]:
+        return await db.run_sync(ItemCRUD.upsert_many, items)
+    
+    @staticmethod
+    async def record_movements(db: AsyncSession, movements: List[StockMovementBatchItem]) -> List[dict]:
+        return await db.run_sync(ItemCRUD.record_movements, movements)
+    
+    @staticmethod
+    async def record_movement(db: AsyncSession, item_id: int, movement: StockMovementCreate) -> Optional[dict]:
+        return await db.run_sync(ItemCRUD.record_movement, item_id, movement)
+    
+    @staticmethod
+    async def get_movements(db: AsyncSession, item_id: int, page: int = 1, per_page: int = 50,
+                            cursor: Optional[str] = None, include_total: bool = True) -> Optional[dict]:
+        return await db.run_sync(ItemCRUD.get_movements, item_id, page, per_page, cursor, include_total)
+    
+    @staticmethod
+    async def get_stock_at(db: AsyncSession, item_id: int, at: datetime) -> Optional[int]:
+        return await db.run_sync(ItemCRUD.get_stock_at, item_id, at)
+    
+    @staticmethod
+    async def add_location(db: AsyncSession, location: LocationCreate) -> dict:
+        return await db.run_sync(ItemCRUD.add_location, location)
+    
+    @staticmethod
+    async def get_locations(db: AsyncSession, warehouse_id: Optional[int] = None) -> List[dict]:
+        return await db.run_sync(ItemCRUD.get_locations, warehouse_id)
+    
+    @staticmethod
+    async def get_warehouses(db: AsyncSession) -> List[dict]:
+        return await db.run_sync(ItemCRUD.get_warehouses)
+    
+    @staticmethod
+    async def get_warehouse_stock(db: AsyncSession, warehouse_id: int, page: int = 1, per_page: int = 50,
+                                  cursor: Optional[str] = None, include_total: bool = True) -> Optional[dict]:
+        return await db.run_sync(ItemCRUD.get_warehouse_stock, warehouse_id, page, per_page, cursor, include_total)
+    
+    @staticmethod
+    async def get_item_locations(db: AsyncSession, item_id: int) -> Optional[dict]:
+        return await db.run_sync(ItemCRUD.get_item_locations, item_id)
+    
+    @staticmethod
+    async def set_location_stock(db: AsyncSession, item_id: int, location_id: int, quantity: int) -> Optional[dict]:
+        return await db.run_sync(ItemCRUD.set_location_stock, item_id, location_id, quantity)
+    
+    @staticmethod
+    async def get_one(db: AsyncSession, item_id: int) -> Optional[Item]:
+        return await db.run_sync(ItemCRUD.get_one, item_id)
+    
+    @staticmethod
+    async def get_by_sku(db: AsyncSession, sku: str) -> Optional[Item]:
+        return await db.run_sync(ItemCRUD.get_by_sku, sku)
+    
+    @staticmethod
+    async def get_many(db: AsyncSession, ids: List[int], skus: List[str]) -> dict:
+        return await db.run_sync(ItemCRUD.get_many, ids, skus)
+    
+    @staticmethod
+    async def update(db: AsyncSession, item_id: int, item_update: ItemUpdate) -> Optional[dict]:
+        return await db.run_sync(ItemCRUD.update, item_id, item_update)
+    
+    @staticmethod
+    async def delete(db: AsyncSession, item_id: int) -> bool:
+        return await db.run_sync(ItemCRUD.delete, item_id)
+    
+    @staticmethod
+    async def get_category(db: AsyncSession, category: str, page: int = 1, per_page: int = 50,
+                           cursor: Optional[str] = None, include_total: bool = True) -> dict:
+        return await db.run_sync(ItemCRUD.get_category, category, page, per_page, cursor, include_total)
+    
+    @staticmethod
+    async def get_categories(db: AsyncSession) -> List[dict]:
+        return await db.run_sync(ItemCRUD.get_categories)
+    
+    @staticmethod
+    async def search_items(db: AsyncSession, search_term: str, page: int = 1, per_page: int = 50) -> dict:
+        return await db.run_sync(ItemCRUD.search_items, search_term, page, per_page)
+    
+    @staticmethod
+    async def get_low_stock(db: AsyncSession, threshold: int = LOW_STOCK_THRESHOLD, page: int = 1,
+                            per_page: int = 50, cursor: Optional[str] = None,
+                            include_total: bool = True) -> dict:
+        return await db.run_sync(ItemCRUD.get_low_stock, threshold, page, per_page, cursor, include_total)
+    
+    @staticmethod
+    async def count_low_stock(db: AsyncSession, threshold: int = LOW_STOCK_THRESHOLD) -> int:
+        return await db.run_sync(ItemCRUD.count_low_stock, threshold)
+    
+    @staticmethod
+    async def query_items(db: AsyncSession, query: ItemQuery, page: int = 1, per_page: int = 50,
+                          cursor: Optional[str] = None, include_total: bool = True, facet_limit: int = 50) -> dict:
+        return await db.run_sync(ItemCRUD.query_items, query, page, per_page, cursor, include_total, facet_limit)
+    
+    @staticmethod
+    async def get_all_paginated(db: AsyncSession, page: int = 1, per_page: int = 50,
+                                cursor: Optional[str] = None, include_total: bool = True) -> dict:
+        return await db.run_sync(ItemCRUD.get_all_paginated, page, per_page, cursor, include_total)
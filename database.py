@@ -1,54 +1,1011 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Index, Text
+from sqlalchemy import (
+    create_engine, event, Engine, inspect, make_url, BigInteger, Column, Integer, SmallInteger, String, Float, DateTime,
+    Index, MetaData, Text
+)
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateTable
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.sql import text
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
+from typing import Optional
+import logging
 import os
 
-# Create database directory if it doesn't exist
-os.makedirs("data", exist_ok=True)
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows runs a single process
+    fcntl = None
+
+from metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool, instrument_engine
+
+logger = logging.getLogger(__name__)
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+def _postgres_driver(url: str) -> str:
+    """Use psycopg (3) for PostgreSQL URLs that don't name a driver; it serves sync and async engines"""
+    parsed = make_url(url)
+    if parsed.drivername == "postgresql":
+        return parsed.set(drivername="postgresql+psycopg").render_as_string(hide_password=False)
+    return url
+
+# Database URLs. SQLite (the default) or PostgreSQL, chosen by the URL; the
+# async engines reach the same database through aiosqlite or psycopg.
+DATABASE_URL = _postgres_driver(os.getenv("DATABASE_URL", "sqlite:///./data/inventory.db"))
+DATABASE_BACKEND = make_url(DATABASE_URL).get_backend_name()
+ASYNC_DATABASE_URL = _postgres_driver(os.getenv(
+    "ASYNC_DATABASE_URL", DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+))
+
+# SQLite performance profile, applied to every new connection. WAL lets
+# readers and a writer proceed concurrently; synchronous=NORMAL is durable
+# across application crashes and only fsyncs at checkpoints in WAL mode.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": _env_int("SQLITE_CACHE_SIZE", -64000),  # negative means KiB
+    "mmap_size": _env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    "busy_timeout": _env_int("SQLITE_BUSY_TIMEOUT", 5000),  # milliseconds
+}
 
-# Database URL
-DATABASE_URL = "sqlite:///./data/inventory.db"
+# Rows ANALYZE samples per index at startup (0 reads them all); a sample is
+# enough for the planner's estimates and takes milliseconds at any size
+SQLITE_ANALYSIS_LIMIT = _env_int("SQLITE_ANALYSIS_LIMIT", 1000)
+
+# Connection pools: writes and sync scripts share the main pool; GET routes
+# get their own read-only pool so reads never queue behind writers
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 10)
+DB_READ_POOL_SIZE = _env_int("DB_READ_POOL_SIZE", 10)
+DB_READ_MAX_OVERFLOW = _env_int("DB_READ_MAX_OVERFLOW", 20)
+DB_POOL_TIMEOUT = _env_int("DB_POOL_TIMEOUT", 30)
+
+# PostgreSQL only: every pooled connection is a server process, so with N
+# workers the server needs N * (all four pool sizes) connections. Recycling
+# and pre-ping let connections survive server restarts and idle timeouts.
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)
+
+def _engine_options(read_only: bool = False, sync: bool = False) -> dict:
+    """Backend-specific create_engine arguments"""
+    if DATABASE_BACKEND == "sqlite":
+        return {"connect_args": {"check_same_thread": False}} if sync else {}
+    options = "-c default_transaction_read_only=on" if read_only else ""
+    return {
+        "pool_pre_ping": True,
+        "pool_recycle": DB_POOL_RECYCLE,
+        # Reuse the most recent connection so the ones beyond the working
+        # set sit idle and get recycled instead of all staying warm
+        "pool_use_lifo": True,
+        "connect_args": {"application_name": "tuari-inventory", "options": options},
+    }
+
+def configure_sqlite(engine, read_only: bool = False):
+    """Apply SQLITE_PRAGMAS (and query_only for read pools) on every new connection.
+    
+    Transactions on writable engines start with BEGIN IMMEDIATE, taking
+    SQLite's write lock up front. Writers from every worker process then
+    queue on that lock for up to busy_timeout, and a transaction that reads
+    before it writes can't be invalidated by another process committing in
+    between (which would fail with SQLITE_BUSY instead of waiting).
+    """
+    if engine.dialect.name != "sqlite":
+        return engine
+    
+    for name, value in SQLITE_PRAGMAS.items():
+        if not str(value).lstrip("-").isalnum():
+            raise ValueError(f"Invalid value for SQLite pragma {name}: {value!r}")
+    
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+        if not read_only:
+            # Let SQLAlchemy's begin event issue BEGIN instead of the driver
+            dbapi_connection.isolation_level = None
+    
+    if not read_only:
+        @event.listens_for(engine, "begin")
+        def begin_immediate(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+    
+    return engine
+
+def database_file(url: str = DATABASE_URL) -> Optional[str]:
+    """Absolute path of the SQLite database file, or None for other databases"""
+    path = make_url(url).database
+    if not url.startswith("sqlite") or not path or path == ":memory:" or path.startswith("file:"):
+        return None
+    return os.path.abspath(path)
 
 # Create engine
-engine = create_engine(
+engine = configure_sqlite(create_engine(
     DATABASE_URL, 
-    connect_args={"check_same_thread": False},
-    echo=False  # Set to True for SQL debugging
+    poolclass=TimedQueuePool,
+    pool_logging_name="sync",
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    echo=False,  # Set to True for SQL debugging
+    **_engine_options(sync=True)
+))
+instrument_engine(engine, "sync")
+
+# Route sessions: on (the default) runs each route's queries on the async
+# engines, so nothing a route does touches the database from the event loop;
+# off gives routes a sync Session whose calls run on the threadpool instead
+# (benchmarks/load_test.py compares the two)
+ASYNC_SESSIONS = os.getenv("ASYNC_SESSIONS", "on").lower() in ("1", "true", "on", "yes")
+
+# Async engines for request handlers; aiosqlite runs each connection in its
+# own thread so queries never block the event loop. Pool the connections
+# (aiosqlite defaults to NullPool) so requests don't pay for a new thread each.
+# Streaming exports and version lookups use them with threaded route sessions too.
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=TimedAsyncAdaptedQueuePool,
+    pool_logging_name="write",
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    echo=False,
+    **_engine_options()
+)
+configure_sqlite(async_engine.sync_engine)
+instrument_engine(async_engine.sync_engine, "write")
+
+async_read_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=TimedAsyncAdaptedQueuePool,
+    pool_logging_name="read",
+    pool_size=DB_READ_POOL_SIZE,
+    max_overflow=DB_READ_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    echo=False,
+    **_engine_options(read_only=True)
 )
+configure_sqlite(async_read_engine.sync_engine, read_only=True)
+instrument_engine(async_read_engine.sync_engine, "read")
 
-# Create session factory
+# Read-only sync pool for GET routes when ASYNC_SESSIONS is off
+read_engine = configure_sqlite(create_engine(
+    DATABASE_URL,
+    poolclass=TimedQueuePool,
+    pool_logging_name="sync-read",
+    pool_size=DB_READ_POOL_SIZE,
+    max_overflow=DB_READ_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    echo=False,
+    **_engine_options(sync=True, read_only=True)
+), read_only=True)
+instrument_engine(read_engine, "sync-read")
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autocommit=False, autoflush=False, expire_on_commit=False
+)
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine, autocommit=False, autoflush=False, expire_on_commit=False
+)
 
 # Create base class
 Base = declarative_base()
 
+# Default low-stock threshold; idx_items_low_stock covers quantities up to it
+LOW_STOCK_THRESHOLD = 10
+
+def _keyset_index(name: str, *columns: str, key: str = "id", **kwargs) -> Index:
+    """An index whose entries end with the row's key, for ORDER BY (..., key) and keyset pages.
+    
+    SQLite appends the rowid to every index entry, so there the key is implied;
+    other databases need it spelled out.
+    """
+    if DATABASE_BACKEND != "sqlite":
+        columns += (key,)
+    return Index(name, *columns, **kwargs)
+
 class Item(Base):
     __tablename__ = "items"
     
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), nullable=False, index=True)
-    category = Column(String(100), nullable=False, index=True)
+    # Only the indexes ItemCRUD's queries use (see benchmarks/index_audit.py);
+    # every extra index is one more B-tree each insert and update has to write
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=False)
+    category = Column(String(100), nullable=False)
     description = Column(Text, nullable=True)
     quantity = Column(Integer, default=0, index=True)
-    price = Column(Float, default=0.0, index=True)
+    price = Column(Float, default=0.0)
     sku = Column(String(100), unique=True, index=True)
-    location = Column(String(100), nullable=True, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    location = Column(String(100), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Set when quantity changes through the stock ledger (see STOCK_LEDGER_DDL)
+    last_movement_id = Column(Integer, nullable=True)
+    
+    __table_args__ = (
+        # Category pages: filter, order and count from one index
+        _keyset_index('idx_category_name', 'category', 'name'),
+        # Only rows at or below the default low-stock threshold, so the index
+        # (and every low-stock page or count) is as small as the result
+        _keyset_index(
+            'idx_items_low_stock', 'quantity',
+            sqlite_where=text(f'quantity <= {LOW_STOCK_THRESHOLD}'),
+            postgresql_where=text(f'quantity <= {LOW_STOCK_THRESHOLD}'),
+        ),
+        # Query pages by price: within a category, and across the catalog.
+        # Neither holds quantity, so stock writes never touch them.
+        _keyset_index('idx_category_price', 'category', 'price'),
+        _keyset_index('idx_items_price', 'price'),
+        # Query facets and totals: holds every filtered column, so counts never
+        # read the table, and GROUP BY category, location walks it in order.
+        # With statistics SQLite skip-scans the few categories to seek a location.
+        Index('idx_items_facets', 'category', 'location', 'price', 'quantity'),
+        # Never hand out a deleted item's id again: the ledger and bins key on
+        # it, so a reused id would inherit the old item's history
+        {'sqlite_autoincrement': True},
+    )
+
+# Indexes created by earlier versions of the Item model that no query uses
+# (or that a remaining index already covers); migrate_indexes drops them
+OBSOLETE_INDEXES = [
+    "ix_items_id", "ix_items_name", "ix_items_category", "ix_items_price", "ix_items_location",
+    "ix_items_created_at", "ix_items_updated_at",
+    "idx_sku_category", "idx_quantity_price", "idx_created_updated",
+]
+
+class CategorySummary(Base):
+    """Per-category totals, maintained by triggers on items"""
+    __tablename__ = "category_summary"
+    
+    category = Column(String(100), primary_key=True)
+    item_count = Column(Integer, nullable=False, default=0)
+    total_quantity = Column(Integer, nullable=False, default=0)
+    total_value = Column(Float, nullable=False, default=0.0)
+
+# Triggers apply each insert, update and delete on items to category_summary
+# in the same transaction, so every write path (ORM, bulk executemany, upsert)
+# keeps it current and /api/categories never has to scan items.
+CATEGORY_SUMMARY_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS category_summary_ai AFTER INSERT ON items BEGIN
+        INSERT INTO category_summary(category, item_count, total_quantity, total_value)
+        VALUES (new.category, 1, coalesce(new.quantity, 0), coalesce(new.quantity * new.price, 0))
+        ON CONFLICT(category) DO UPDATE SET
+            item_count = item_count + 1,
+            total_quantity = total_quantity + excluded.total_quantity,
+            total_value = total_value + excluded.total_value;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS category_summary_ad AFTER DELETE ON items BEGIN
+        UPDATE category_summary SET
+            item_count = item_count - 1,
+            total_quantity = total_quantity - coalesce(old.quantity, 0),
+            total_value = total_value - coalesce(old.quantity * old.price, 0)
+        WHERE category = old.category;
+        DELETE FROM category_summary WHERE category = old.category AND item_count <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS category_summary_au AFTER UPDATE OF category, quantity, price ON items BEGIN
+        UPDATE category_summary SET
+            item_count = item_count - 1,
+            total_quantity = total_quantity - coalesce(old.quantity, 0),
+            total_value = total_value - coalesce(old.quantity * old.price, 0)
+        WHERE category = old.category;
+        INSERT INTO category_summary(category, item_count, total_quantity, total_value)
+        VALUES (new.category, 1, coalesce(new.quantity, 0), coalesce(new.quantity * new.price, 0))
+        ON CONFLICT(category) DO UPDATE SET
+            item_count = item_count + 1,
+            total_quantity = total_quantity + excluded.total_quantity,
+            total_value = total_value + excluded.total_value;
+        DELETE FROM category_summary WHERE category = old.category AND item_count <= 0;
+    END
+    """,
+]
+
+CATEGORY_TOTALS_SQL = """
+    SELECT category, count(*) AS item_count,
+           coalesce(sum(quantity), 0) AS total_quantity,
+           coalesce(sum(quantity * price), 0) AS total_value
+    FROM items GROUP BY category
+"""
+
+def _is_postgres(conn) -> bool:
+    """Whether conn (a Connection or Session) talks to PostgreSQL, whose schema objects live in postgres.py"""
+    dialect = conn.dialect if hasattr(conn, "dialect") else conn.get_bind().dialect
+    return dialect.name == "postgresql"
+
+def _schema_object_exists(conn, kind: str, name: str) -> bool:
+    """Whether a trigger, table or index exists"""
+    if _is_postgres(conn):
+        from postgres import schema_object_exists
+        return schema_object_exists(conn, kind, name)
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = :kind AND name = :name"), {"kind": kind, "name": name}
+    ).first() is not None
+
+def create_category_summary(bind=None):
+    """Create the category summary triggers, filling the table if it is new"""
+    bind = bind or engine
+    with bind.begin() as conn:
+        ddl_statements = CATEGORY_SUMMARY_DDL
+        trigger = "category_summary_ai"
+        if _is_postgres(conn):
+            from postgres import CATEGORY_SUMMARY_DDL as ddl_statements
+            trigger = "category_summary_aiud"
+        existed = _schema_object_exists(conn, "trigger", trigger)
+        for ddl in ddl_statements:
+            conn.execute(text(ddl))
+        if not existed:
+            conn.execute(text("DELETE FROM category_summary"))
+            conn.execute(text(f"INSERT INTO category_summary {CATEGORY_TOTALS_SQL}"))
+
+def check_category_summary(bind=None, repair: bool = True) -> list:
+    """Recompute category totals from items and compare them with the summary.
+    
+    Returns the categories whose summary was wrong, with both versions, and
+    rewrites the summary from scratch when repair is set.
+    """
+    bind = bind or engine
+    with bind.begin() as conn:
+        expected = {row.category: row for row in conn.execute(text(CATEGORY_TOTALS_SQL))}
+        actual = {row.category: row for row in conn.execute(text(
+            "SELECT category, item_count, total_quantity, total_value FROM category_summary"
+        ))}
+        mismatches = []
+        for category in sorted(set(expected) | set(actual)):
+            want, have = expected.get(category), actual.get(category)
+            if (
+                want is None or have is None
+                or want.item_count != have.item_count
+                or want.total_quantity != have.total_quantity
+                # Incremental float sums drift by rounding error only
+                or abs(want.total_value - have.total_value) > 1e-6 * max(1.0, abs(want.total_value))
+            ):
+                mismatches.append({
+                    "category": category,
+                    "expected": dict(want._mapping) if want else None,
+                    "actual": dict(have._mapping) if have else None,
+                })
+        if repair:
+            conn.execute(text("DELETE FROM category_summary"))
+            conn.execute(text(f"INSERT INTO category_summary {CATEGORY_TOTALS_SQL}"))
+    return mismatches
+
+class TableVersion(Base):
+    """Change counter per table, bumped by triggers on every write"""
+    __tablename__ = "table_versions"
+    
+    name = Column(String(100), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+# Every insert, update and delete on items bumps its version in the writing
+# transaction. The counter starts at a random value so a recreated database
+# never reuses versions (and so ETags) handed out for different data.
+TABLE_VERSION_DDL = [
+    """
+    INSERT OR IGNORE INTO table_versions(name, version)
+    VALUES ('items', abs(random() % 1000000000000))
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS table_versions_items_ai AFTER INSERT ON items BEGIN
+        UPDATE table_versions SET version = version + 1 WHERE name = 'items';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS table_versions_items_au AFTER UPDATE ON items BEGIN
+        UPDATE table_versions SET version = version + 1 WHERE name = 'items';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS table_versions_items_ad AFTER DELETE ON items BEGIN
+        UPDATE table_versions SET version = version + 1 WHERE name = 'items';
+    END
+    """,
+]
+
+def create_table_versions(bind=None):
+    """Create the items version counter and the triggers that bump it"""
+    bind = bind or engine
+    with bind.begin() as conn:
+        ddl_statements = TABLE_VERSION_DDL
+        if _is_postgres(conn):
+            from postgres import TABLE_VERSION_DDL as ddl_statements
+        for ddl in ddl_statements:
+            conn.execute(text(ddl))
+
+# Stock movement kinds, stored as small integers to keep ledger rows compact.
+# "direct" movements are recorded by triggers when quantity is written through
+# the item endpoints (create, update, bulk upsert, delete) rather than moved.
+MOVEMENT_KINDS = {"direct": 0, "receipt": 1, "pick": 2, "adjustment": 3}
+
+# Snapshot item balances after this many movements, bounding how many
+# movements a point-in-time lookup has to replay
+STOCK_SNAPSHOT_INTERVAL = _env_int("STOCK_SNAPSHOT_INTERVAL", 10000)
+
+class StockMovement(Base):
+    """One change to an item's stock level; rows are only ever appended"""
+    __tablename__ = "stock_movements"
+    
+    id = Column(Integer, primary_key=True)
+    item_id = Column(Integer, nullable=False)
+    kind = Column(SmallInteger, nullable=False)
+    delta = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    # (item_id, id): one item's history in order, and the range after a snapshot
+    __table_args__ = (_keyset_index('idx_stock_movements_item', 'item_id'),)
+
+class StockSnapshot(Base):
+    """An item's balance as of one of its movements"""
+    __tablename__ = "stock_snapshots"
+    
+    movement_id = Column(Integer, primary_key=True, autoincrement=False)
+    item_id = Column(Integer, nullable=False)
+    taken_at = Column(DateTime, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    
+    # Latest snapshot at or before a time: one seek, (item_id, taken_at, movement_id)
+    __table_args__ = (_keyset_index('idx_stock_snapshots_item', 'item_id', 'taken_at', key='movement_id'),)
+
+# Same text format SQLAlchemy stores DateTime in on SQLite
+_SQLITE_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now') || '000'"
+
+# Quantity writes that don't come from a movement are appended to the ledger
+# as "direct" movements in the same transaction. Movements recorded through
+# ItemCRUD.record_movements update quantity together with last_movement_id,
+# which is how the update trigger tells them apart.
+STOCK_LEDGER_DDL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS stock_ledger_ai AFTER INSERT ON items
+    WHEN coalesce(new.quantity, 0) != 0 BEGIN
+        INSERT INTO stock_movements(item_id, kind, delta, created_at)
+        VALUES (new.id, {MOVEMENT_KINDS["direct"]}, new.quantity, {_SQLITE_NOW});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS stock_ledger_au AFTER UPDATE OF quantity ON items
+    WHEN coalesce(new.quantity, 0) != coalesce(old.quantity, 0)
+         AND new.last_movement_id IS old.last_movement_id BEGIN
+        INSERT INTO stock_movements(item_id, kind, delta, created_at)
+        VALUES (new.id, {MOVEMENT_KINDS["direct"]},
+                coalesce(new.quantity, 0) - coalesce(old.quantity, 0), {_SQLITE_NOW});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS stock_ledger_ad AFTER DELETE ON items
+    WHEN coalesce(old.quantity, 0) != 0 BEGIN
+        INSERT INTO stock_movements(item_id, kind, delta, created_at)
+        VALUES (old.id, {MOVEMENT_KINDS["direct"]}, -old.quantity, {_SQLITE_NOW});
+    END
+    """,
+]
+
+# One snapshot per item with movements after :since, carrying its previous
+# snapshot forward by the sum of those movements. Grouping by +item_id keeps
+# SQLite on the rowid range instead of walking the whole item_id index.
+STOCK_SNAPSHOT_SQL = """
+    INSERT INTO stock_snapshots(movement_id, item_id, taken_at, quantity)
+    SELECT max(m.id), m.item_id, max(m.created_at),
+           sum(m.delta) + coalesce((
+               SELECT s.quantity FROM stock_snapshots s
+               WHERE s.item_id = m.item_id
+               ORDER BY s.taken_at DESC, s.movement_id DESC LIMIT 1
+           ), 0)
+    FROM stock_movements m
+    WHERE m.id > :since
+    GROUP BY +m.item_id
+"""
+
+def snapshot_stock(conn, force: bool = False) -> int:
+    """Snapshot balances once STOCK_SNAPSHOT_INTERVAL movements have piled up.
+    
+    Runs in the caller's transaction (conn may be a Connection or Session)
+    and returns the number of snapshots written.
+    """
+    since = conn.execute(text("SELECT coalesce(max(movement_id), 0) FROM stock_snapshots")).scalar()
+    latest = conn.execute(text("SELECT coalesce(max(id), 0) FROM stock_movements")).scalar()
+    if latest - since < (1 if force else STOCK_SNAPSHOT_INTERVAL):
+        return 0
+    snapshot_sql = STOCK_SNAPSHOT_SQL
+    if _is_postgres(conn):
+        from postgres import STOCK_SNAPSHOT_SQL as snapshot_sql
+    return conn.execute(text(snapshot_sql), {"since": since}).rowcount
+
+def create_stock_ledger(bind=None):
+    """Create the ledger triggers, opening a balance for every item if the ledger is new"""
+    bind = bind or engine
+    with bind.begin() as conn:
+        # Databases created before the ledger lack the marker column
+        if "last_movement_id" not in {column["name"] for column in inspect(conn).get_columns("items")}:
+            conn.execute(text("ALTER TABLE items ADD COLUMN last_movement_id INTEGER"))
+        ddl_statements, trigger, now = STOCK_LEDGER_DDL, "stock_ledger_ai", _SQLITE_NOW
+        if _is_postgres(conn):
+            from postgres import STOCK_LEDGER_DDL as ddl_statements, SQL_NOW as now
+            trigger = "stock_ledger_aiud"
+        existed = _schema_object_exists(conn, "trigger", trigger)
+        for ddl in ddl_statements:
+            conn.execute(text(ddl))
+        if not existed:
+            conn.execute(text(f"""
+                INSERT INTO stock_movements(item_id, kind, delta, created_at)
+                SELECT id, {MOVEMENT_KINDS["direct"]}, quantity, {now}
+                FROM items WHERE coalesce(quantity, 0) != 0 ORDER BY id
+            """))
+            snapshot_stock(conn, force=True)
+
+def check_stock_ledger(bind=None, repair: bool = True) -> list:
+    """Compare every item's quantity with the sum of its movements.
+    
+    Returns the items that disagree. With repair, the ledger stays append-only:
+    a "direct" movement is appended for each difference.
+    """
+    bind = bind or engine
+    with bind.begin() as conn:
+        mismatches = [dict(row._mapping) for row in conn.execute(text("""
+            SELECT i.id AS item_id, coalesce(i.quantity, 0) AS quantity,
+                   coalesce(l.balance, 0) AS ledger_balance
+            FROM items i
+            LEFT JOIN (
+                SELECT item_id, sum(delta) AS balance FROM stock_movements GROUP BY item_id
+            ) l ON l.item_id = i.id
+            WHERE coalesce(i.quantity, 0) != coalesce(l.balance, 0)
+        """))]
+        if repair and mismatches:
+            now = _SQLITE_NOW
+            if _is_postgres(conn):
+                from postgres import SQL_NOW as now
+            conn.execute(
+                text(f"""
+                    INSERT INTO stock_movements(item_id, kind, delta, created_at)
+                    VALUES (:item_id, {MOVEMENT_KINDS["direct"]}, :delta, {now})
+                """),
+                [{"item_id": m["item_id"], "delta": m["quantity"] - m["ledger_balance"]} for m in mismatches]
+            )
+    return mismatches
+
+# Location kinds, outermost first. Stock is held in bins; zones group bins
+# within a warehouse, and every location records the warehouse it is in.
+LOCATION_KINDS = {"warehouse": 0, "zone": 1, "bin": 2}
+
+class Location(Base):
+    """A warehouse, a zone within one, or a bin within a zone"""
+    __tablename__ = "locations"
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(SmallInteger, nullable=False)
+    name = Column(String(100), nullable=False)
+    parent_id = Column(Integer, nullable=True)
+    warehouse_id = Column(Integer, nullable=True)
+    # Names from the warehouse down, joined by "/"; unique, so a name is unique within its parent
+    path = Column(String(400), nullable=False, unique=True)
+    
+    # A warehouse's locations in path order
+    __table_args__ = (Index('idx_locations_warehouse', 'warehouse_id', 'path'),)
+
+class LocationStock(Base):
+    """Units of an item held at one location"""
+    __tablename__ = "location_stock"
     
-    # Create composite indexes for common query patterns
+    location_id = Column(Integer, primary_key=True, autoincrement=False)
+    item_id = Column(Integer, primary_key=True, autoincrement=False)
+    quantity = Column(Integer, nullable=False)
+    
+    # (location_id, item_id) is the primary key, so the table is clustered on
+    # it; the item index finds where one item is held
     __table_args__ = (
-        Index('idx_category_name', 'category', 'name'),
-        Index('idx_sku_category', 'sku', 'category'),
-        Index('idx_quantity_price', 'quantity', 'price'),
-        Index('idx_created_updated', 'created_at', 'updated_at'),
+        Index('idx_location_stock_item', 'item_id', 'location_id'),
+        {"sqlite_with_rowid": False},
+    )
+
+class WarehouseStock(Base):
+    """Units of an item per warehouse, summed over its bins by triggers on location_stock"""
+    __tablename__ = "warehouse_stock"
+    
+    warehouse_id = Column(Integer, primary_key=True, autoincrement=False)
+    item_id = Column(Integer, primary_key=True, autoincrement=False)
+    quantity = Column(Integer, nullable=False)
+    
+    __table_args__ = (
+        Index('idx_warehouse_stock_item', 'item_id', 'warehouse_id'),
+        {"sqlite_with_rowid": False},
+    )
+
+class WarehouseSummary(Base):
+    """Per-warehouse totals, maintained by triggers on warehouse_stock"""
+    __tablename__ = "warehouse_summary"
+    
+    warehouse_id = Column(Integer, primary_key=True, autoincrement=False)
+    item_count = Column(Integer, nullable=False, default=0)
+    total_quantity = Column(Integer, nullable=False, default=0)
+
+# Every write to location_stock is applied to warehouse_stock, and through
+# its triggers to warehouse_summary, in the same transaction, so the rollups
+# never scan location_stock. Bins hold part of the item's quantity rather
+# than adding to it: items.quantity is the stock in bins plus whatever isn't
+# assigned to one, and never drops below the bins' total
+# (ItemCRUD.set_location_stock allocates only unassigned stock, and
+# items_allocated_bu rejects any other write that would take quantity below it).
+# location_stock rows only ever change quantity, and hold none at zero
+# (ItemCRUD.set_location_stock deletes the row instead).
+ALLOCATED_STOCK_ERROR = "quantity is below the stock allocated to bins"
+
+LOCATION_STOCK_DDL = [
+    # Replace the triggers of databases from before bins held allocations,
+    # which moved the item's quantity along with the bin
+    "DROP TRIGGER IF EXISTS location_stock_ai",
+    "DROP TRIGGER IF EXISTS location_stock_au",
+    "DROP TRIGGER IF EXISTS location_stock_ad",
+    """
+    CREATE TRIGGER IF NOT EXISTS location_stock_ai AFTER INSERT ON location_stock BEGIN
+        INSERT INTO warehouse_stock(warehouse_id, item_id, quantity)
+        SELECT warehouse_id, new.item_id, new.quantity FROM locations WHERE id = new.location_id
+        ON CONFLICT(warehouse_id, item_id) DO UPDATE SET quantity = quantity + excluded.quantity;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS location_stock_au AFTER UPDATE OF quantity ON location_stock
+    WHEN new.quantity != old.quantity BEGIN
+        UPDATE warehouse_stock SET quantity = quantity + new.quantity - old.quantity
+        WHERE warehouse_id = (SELECT warehouse_id FROM locations WHERE id = new.location_id)
+          AND item_id = new.item_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS location_stock_ad AFTER DELETE ON location_stock BEGIN
+        UPDATE warehouse_stock SET quantity = quantity - old.quantity
+        WHERE warehouse_id = (SELECT warehouse_id FROM locations WHERE id = old.location_id)
+          AND item_id = old.item_id;
+        DELETE FROM warehouse_stock
+        WHERE warehouse_id = (SELECT warehouse_id FROM locations WHERE id = old.location_id)
+          AND item_id = old.item_id AND quantity <= 0;
+    END
+    """,
+    # Only a decrease can cut into allocated stock, so increases skip the lookup
+    f"""
+    CREATE TRIGGER IF NOT EXISTS items_allocated_bu BEFORE UPDATE OF quantity ON items
+    WHEN new.quantity < old.quantity BEGIN
+        SELECT RAISE(ABORT, '{ALLOCATED_STOCK_ERROR}')
+        WHERE new.quantity < (SELECT coalesce(sum(quantity), 0) FROM location_stock WHERE item_id = new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS warehouse_summary_ai AFTER INSERT ON warehouse_stock BEGIN
+        INSERT INTO warehouse_summary(warehouse_id, item_count, total_quantity)
+        VALUES (new.warehouse_id, 1, new.quantity)
+        ON CONFLICT(warehouse_id) DO UPDATE SET
+            item_count = item_count + 1,
+            total_quantity = total_quantity + excluded.total_quantity;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS warehouse_summary_au AFTER UPDATE OF quantity ON warehouse_stock BEGIN
+        UPDATE warehouse_summary SET total_quantity = total_quantity + new.quantity - old.quantity
+        WHERE warehouse_id = new.warehouse_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS warehouse_summary_ad AFTER DELETE ON warehouse_stock BEGIN
+        UPDATE warehouse_summary SET
+            item_count = item_count - 1,
+            total_quantity = total_quantity - old.quantity
+        WHERE warehouse_id = old.warehouse_id;
+    END
+    """,
+    # A deleted item leaves its locations (its quantity went with it)
+    """
+    CREATE TRIGGER IF NOT EXISTS location_stock_items_ad AFTER DELETE ON items BEGIN
+        DELETE FROM location_stock WHERE item_id = old.id;
+    END
+    """,
+]
+
+WAREHOUSE_STOCK_SQL = """
+    SELECT l.warehouse_id, s.item_id, sum(s.quantity) AS quantity
+    FROM location_stock s JOIN locations l ON l.id = s.location_id
+    GROUP BY l.warehouse_id, s.item_id
+    HAVING sum(s.quantity) > 0
+"""
+
+WAREHOUSE_SUMMARY_SQL = """
+    SELECT warehouse_id, count(*) AS item_count, sum(quantity) AS total_quantity
+    FROM warehouse_stock GROUP BY warehouse_id
+"""
+
+def _rebuild_warehouse_stock(conn):
+    """Recompute both rollups from location_stock, whether or not their triggers exist yet"""
+    conn.execute(text("DELETE FROM warehouse_stock"))
+    conn.execute(text(f"INSERT INTO warehouse_stock(warehouse_id, item_id, quantity) {WAREHOUSE_STOCK_SQL}"))
+    # The summary triggers, if any, have just rebuilt it row by row; start over in one pass
+    conn.execute(text("DELETE FROM warehouse_summary"))
+    conn.execute(text(
+        f"INSERT INTO warehouse_summary(warehouse_id, item_count, total_quantity) {WAREHOUSE_SUMMARY_SQL}"
+    ))
+
+def create_location_stock(bind=None):
+    """Create the location stock triggers, filling the warehouse rollups if they are new"""
+    bind = bind or engine
+    with bind.begin() as conn:
+        ddl_statements, trigger = LOCATION_STOCK_DDL, "location_stock_ai"
+        if _is_postgres(conn):
+            from postgres import LOCATION_STOCK_DDL as ddl_statements
+            trigger = "location_stock_aiud"
+        if not _schema_object_exists(conn, "trigger", trigger):
+            _rebuild_warehouse_stock(conn)
+        for ddl in ddl_statements:
+            conn.execute(text(ddl))
+
+def check_location_stock(bind=None, repair: bool = True) -> list:
+    """Recompute the warehouse rollups from location_stock and compare them with the stored ones.
+    
+    Returns each warehouse total (item_id None) and warehouse/item quantity
+    that was wrong, with both versions, and rebuilds the rollups when repair is set.
+    """
+    bind = bind or engine
+    with bind.begin() as conn:
+        expected = {(row.warehouse_id, row.item_id): row.quantity for row in conn.execute(text(WAREHOUSE_STOCK_SQL))}
+        actual = {
+            (row.warehouse_id, row.item_id): row.quantity
+            for row in conn.execute(text("SELECT warehouse_id, item_id, quantity FROM warehouse_stock"))
+        }
+        expected_totals: dict = {}
+        for (warehouse_id, _), quantity in expected.items():
+            item_count, total_quantity = expected_totals.get(warehouse_id, (0, 0))
+            expected_totals[warehouse_id] = (item_count + 1, total_quantity + quantity)
+        actual_totals = {
+            row.warehouse_id: (row.item_count, row.total_quantity)
+            for row in conn.execute(text("SELECT warehouse_id, item_count, total_quantity FROM warehouse_summary"))
+        }
+        
+        mismatches = []
+        for warehouse_id in sorted(set(expected_totals) | set(actual_totals)):
+            # Warehouses emptied of stock keep a row of zeros
+            want, have = expected_totals.get(warehouse_id, (0, 0)), actual_totals.get(warehouse_id, (0, 0))
+            if want != have:
+                mismatches.append({
+                    "warehouse_id": warehouse_id,
+                    "item_id": None,
+                    "expected": {"item_count": want[0], "total_quantity": want[1]},
+                    "actual": {"item_count": have[0], "total_quantity": have[1]},
+                })
+        for key in sorted(set(expected) | set(actual)):
+            if expected.get(key) != actual.get(key):
+                mismatches.append({
+                    "warehouse_id": key[0],
+                    "item_id": key[1],
+                    "expected": expected.get(key),
+                    "actual": actual.get(key),
+                })
+        if repair:
+            _rebuild_warehouse_stock(conn)
+    return mismatches
+
+# Full-text search over name, SKU and description. The FTS5 table uses
+# items as external content so text is not stored twice; triggers keep the
+# index in sync with every insert, update and delete on items.
+SEARCH_INDEX_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+        name, sku, description,
+        content='items', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
     )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN
+        INSERT INTO items_fts(rowid, name, sku, description)
+        VALUES (new.id, new.name, new.sku, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, name, sku, description)
+        VALUES ('delete', old.id, old.name, old.sku, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE OF name, sku, description ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, name, sku, description)
+        VALUES ('delete', old.id, old.name, old.sku, old.description);
+        INSERT INTO items_fts(rowid, name, sku, description)
+        VALUES (new.id, new.name, new.sku, new.description);
+    END
+    """,
+]
+
+_search_index_available = {}
+
+def has_search_index(bind=None):
+    """Check (once per engine) whether the search index (FTS5, or pg_trgm on PostgreSQL) exists.
+    
+    bind may be an Engine or a Connection. Pass the caller's connection when
+    it has a transaction open: a second connection's BEGIN IMMEDIATE would
+    wait on that transaction's own write lock.
+    """
+    bind = bind or engine
+    if bind.engine not in _search_index_available:
+        with bind.connect() if isinstance(bind, Engine) else nullcontext(bind) as conn:
+            if _is_postgres(conn):
+                from postgres import SEARCH_INDEX
+                found = _schema_object_exists(conn, "index", SEARCH_INDEX)
+            else:
+                found = _schema_object_exists(conn, "table", "items_fts")
+        _search_index_available[bind.engine] = found
+    return _search_index_available[bind.engine]
+
+async def has_search_index_async(bind=None):
+    """has_search_index for an AsyncEngine (the read engine by default)"""
+    bind = bind or async_read_engine
+    if bind.sync_engine not in _search_index_available:
+        async with bind.connect() as conn:
+            await conn.run_sync(has_search_index)
+    return _search_index_available[bind.sync_engine]
+
+def create_search_index(bind=None):
+    """Create the FTS5 search index and its sync triggers if missing"""
+    bind = bind or engine
+    _search_index_available.pop(bind, None)
+    try:
+        with bind.begin() as conn:
+            if _is_postgres(conn):
+                # The trigram index is built from the table as it is created
+                from postgres import SEARCH_INDEX_DDL as ddl_statements
+                for ddl in ddl_statements:
+                    conn.execute(text(ddl))
+                return True
+            existed = _schema_object_exists(conn, "table", "items_fts")
+            for ddl in SEARCH_INDEX_DDL:
+                conn.execute(text(ddl))
+            # A freshly created index on a populated table starts out empty
+            if not existed:
+                conn.execute(text("INSERT INTO items_fts(items_fts) VALUES ('rebuild')"))
+    except Exception as e:
+        # SQLite builds without FTS5, and PostgreSQL servers without pg_trgm,
+        # fall back to LIKE search in crud.py
+        logger.warning(f"Full-text search index unavailable: {e}")
+        return False
+    return True
+
+def rebuild_search_index(bind=None):
+    """Rebuild the search index from the items table"""
+    bind = bind or engine
+    create_search_index(bind)
+    with bind.begin() as conn:
+        if _is_postgres(conn):
+            from postgres import SEARCH_INDEX
+            conn.execute(text(f"REINDEX INDEX {SEARCH_INDEX}"))
+            return
+        conn.execute(text("INSERT INTO items_fts(items_fts) VALUES ('rebuild')"))
+        conn.execute(text("INSERT INTO items_fts(items_fts) VALUES ('optimize')"))
+
+def migrate_indexes(bind=None) -> list:
+    """Drop OBSOLETE_INDEXES and add any declared index an existing table lacks"""
+    bind = bind or engine
+    with bind.begin() as conn:
+        existing = {index["name"] for index in inspect(conn).get_indexes(Item.__tablename__)}
+        dropped = [name for name in OBSOLETE_INDEXES if name in existing]
+        for name in dropped:
+            conn.execute(text(f"DROP INDEX {name}"))
+        for index in Item.__table__.indexes:
+            index.create(conn, checkfirst=True)
+    if dropped:
+        logger.info(f"Dropped unused indexes: {', '.join(dropped)}")
+    return dropped
+
+def migrate_item_ids(bind=None) -> bool:
+    """Rebuild an items table created without AUTOINCREMENT.
+    
+    SQLite can't add AUTOINCREMENT to an existing table, so the rows are
+    copied into a new one and its indexes and triggers recreated, all in one
+    transaction. The id sequence starts past every id the ledger has seen, so
+    items deleted before the rebuild don't get their ids reused either.
+    Returns whether the table was rebuilt. PostgreSQL's sequences never reuse ids.
+    """
+    bind = bind or engine
+    with bind.begin() as conn:
+        if _is_postgres(conn):
+            return False
+        table_sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'items'")).scalar()
+        if table_sql is None or "AUTOINCREMENT" in table_sql.upper():
+            return False
+        dependents = conn.execute(text("""
+            SELECT sql FROM sqlite_master
+            WHERE tbl_name = 'items' AND type IN ('index', 'trigger') AND sql IS NOT NULL
+        """)).scalars().all()
+        columns = ", ".join(column["name"] for column in inspect(conn).get_columns("items"))
+        # Triggers elsewhere may name items; don't let the rename rewrite or reject them
+        conn.exec_driver_sql("PRAGMA legacy_alter_table = ON")
+        try:
+            conn.execute(CreateTable(Item.__table__.to_metadata(MetaData(), name="items_rebuild")))
+            conn.execute(text(f"INSERT INTO items_rebuild ({columns}) SELECT {columns} FROM items ORDER BY id"))
+            conn.execute(text("DROP TABLE items"))
+            conn.execute(text("ALTER TABLE items_rebuild RENAME TO items"))
+        finally:
+            conn.exec_driver_sql("PRAGMA legacy_alter_table = OFF")
+        for ddl in dependents:
+            conn.exec_driver_sql(ddl)
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'items'"))
+        conn.execute(text("""
+            INSERT INTO sqlite_sequence(name, seq)
+            SELECT 'items', max((SELECT coalesce(max(id), 0) FROM items),
+                                (SELECT coalesce(max(item_id), 0) FROM stock_movements))
+        """))
+    logger.info("Rebuilt items with AUTOINCREMENT ids")
+    return True
+
+@contextmanager
+def _setup_lock():
+    """Exclusive lock on a file next to the database (an advisory lock on PostgreSQL), held across processes"""
+    if DATABASE_BACKEND == "postgresql":
+        from postgres import SETUP_LOCK_KEY
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SETUP_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SETUP_LOCK_KEY})
+        return
+    path = database_file()
+    if path is None or fcntl is None:
+        yield
+        return
+    with open(path + ".setup-lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def setup_database():
+    """Create the data directory and bring the schema up to date.
+    
+    Run once per process before serving (main.py's lifespan). Workers
+    starting together take turns under a file lock; create_tables is
+    idempotent, so only the first one has anything to do.
+    """
+    path = database_file()
+    if path is not None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _setup_lock():
+        create_tables()
+
+def analyze_tables(bind=None):
+    """Refresh SQLite's planner statistics (sqlite_stat1).
+    
+    Without them the planner takes every index to be equally selective and
+    never skip-scans an index past a low-cardinality leading column.
+    PostgreSQL's autovacuum keeps its own statistics current.
+    """
+    bind = bind or engine
+    with bind.begin() as conn:
+        if _is_postgres(conn):
+            return
+        conn.exec_driver_sql(f"PRAGMA analysis_limit = {SQLITE_ANALYSIS_LIMIT}")
+        conn.exec_driver_sql("ANALYZE")
 
 # Create tables
-def create_tables():
-    Base.metadata.create_all(bind=engine)
+def create_tables(bind=None):
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    migrate_indexes(bind)
+    create_search_index(bind)
+    create_category_summary(bind)
+    create_table_versions(bind)
+    create_stock_ledger(bind)
+    create_location_stock(bind)
+    migrate_item_ids(bind)
+    analyze_tables(bind)
 
 # Database dependency
 def get_db():
@@ -58,7 +1015,97 @@ def get_db():
     finally:
         db.close()
 
+class ThreadedSession:
+    """Stands in for AsyncSession with a sync Session, running each run_sync on the threadpool.
+    
+    The event loop never waits on the database, including for the write lock
+    (up to busy_timeout when another worker, the write pipeline or a backup
+    holds it).
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def close(self):
+        await run_in_threadpool(self.session.close)
+
+# Route dependencies: an AsyncSession with ASYNC_SESSIONS on (the default), a
+# ThreadedSession otherwise; routes only await run_sync on it (through AsyncItemCRUD)
+async def get_async_db():
+    if not ASYNC_SESSIONS:
+        db = ThreadedSession(SessionLocal())
+        try:
+            yield db
+        finally:
+            await db.close()
+        return
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    """Read-only session for GET routes, from the separate read pool"""
+    if not ASYNC_SESSIONS:
+        db = ThreadedSession(ReadSessionLocal())
+        try:
+            yield db
+        finally:
+            await db.close()
+        return
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
 # Initialize database
 if __name__ == "__main__":
-    create_tables()
-    print("Database tables created successfully!") 
\ No newline at end of file
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild-search":
+        setup_database()
+        rebuild_search_index()
+        print("Search index rebuilt successfully!")
+    elif len(sys.argv) > 1 and sys.argv[1] == "check-categories":
+        setup_database()
+        mismatches = check_category_summary(repair="--repair" in sys.argv)
+        for mismatch in mismatches:
+            print(f"Mismatch in {mismatch['category']}: "
+                  f"expected {mismatch['expected']}, found {mismatch['actual']}")
+        if not mismatches:
+            print("Category summary is consistent")
+        elif "--repair" in sys.argv:
+            print("Category summary rebuilt from items")
+        else:
+            print("Run with --repair to rebuild it from items")
+    elif len(sys.argv) > 1 and sys.argv[1] == "check-stock":
+        setup_database()
+        mismatches = check_stock_ledger(repair="--repair" in sys.argv)
+        for mismatch in mismatches:
+            print(f"Item {mismatch['item_id']}: quantity {mismatch['quantity']}, "
+                  f"ledger balance {mismatch['ledger_balance']}")
+        if not mismatches:
+            print("Stock ledger is consistent")
+        elif "--repair" in sys.argv:
+            print("Correcting movements appended to the ledger")
+        else:
+            print("Run with --repair to append correcting movements")
+    elif len(sys.argv) > 1 and sys.argv[1] == "check-locations":
+        setup_database()
+        mismatches = check_location_stock(repair="--repair" in sys.argv)
+        for mismatch in mismatches:
+            item = f", item {mismatch['item_id']}" if mismatch["item_id"] is not None else " total"
+            print(f"Mismatch in warehouse {mismatch['warehouse_id']}{item}: "
+                  f"expected {mismatch['expected']}, found {mismatch['actual']}")
+        if not mismatches:
+            print("Warehouse stock is consistent")
+        elif "--repair" in sys.argv:
+            print("Warehouse stock rebuilt from location stock")
+        else:
+            print("Run with --repair to rebuild it from location stock")
+    elif len(sys.argv) > 1 and sys.argv[1] == "snapshot-stock":
+        setup_database()
+        with engine.begin() as conn:
+            print(f"Wrote {snapshot_stock(conn, force=True)} stock snapshots")
+    else:
+        setup_database()
+        print("Database tables created successfully!") 
\ No newline at end of file
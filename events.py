@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import os
+import secrets
+import threading
+from collections import deque
+from typing import AsyncIterator, List, Optional, Tuple
+
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Events kept for clients resuming after a reconnect
+EVENT_HISTORY = int(os.getenv("EVENT_HISTORY", 10000))
+
+# Events buffered per subscriber before it is considered too slow and reset
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", 1000))
+
+# Bulk writes touching more items than this publish a reset instead of ids
+EVENT_MAX_IDS = int(os.getenv("EVENT_MAX_IDS", 1000))
+
+# Seconds between keep-alive messages on idle event streams
+EVENT_HEARTBEAT = float(os.getenv("EVENT_HEARTBEAT", 15))
+
+# Streams are closed after this many seconds; clients reconnect and resume
+# from their last event, so nothing is lost and shutdown never waits long
+EVENT_STREAM_MAX_AGE = float(os.getenv("EVENT_STREAM_MAX_AGE", 300))
+
+# Seconds between checks for writes made by other processes (0 disables)
+EVENT_POLL_INTERVAL = float(os.getenv("EVENT_POLL_INTERVAL", 1))
+
+HEARTBEAT = {"type": "heartbeat"}
+
+class _Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(EVENT_QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, event: Optional[dict]):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Drop the backlog and tell the client to reload instead
+            self.overflowed = True
+
+class ChangeFeed:
+    """In-process broadcaster of item changes, with a replay buffer for resume.
+
+    Writers call publish() after their transaction commits, from the event
+    loop or any thread. Every event gets the next sequence number; its id is
+    "<epoch>-<seq>", where the epoch changes on every restart so a client
+    resuming against a new process is told to reload instead of missing events.
+    
+    Writes made by other processes (other workers, scripts) are never
+    published here. watch() notices them from the items version and sends
+    subscribers a reset instead.
+    """
+
+    def __init__(self, history: int = EVENT_HISTORY):
+        self.epoch = secrets.token_hex(4)
+        self.seq = 0
+        self.history: deque = deque(maxlen=history)
+        self.subscribers: List[_Subscriber] = []
+        self.lock = threading.Lock()
+        # Highest items version this process has published or accounted for
+        self.version: Optional[int] = None
+
+    def publish(self, type: str, versions: Optional[Tuple[int, int]] = None, **data) -> dict:
+        """Publish an event.
+        
+        versions is the items version at the start and end of the write's
+        transaction. A start past the last version seen means another process
+        wrote in between, so subscribers get a reset as well.
+        """
+        if versions is not None and None not in versions:
+            before, after = versions
+            with self.lock:
+                external = self.version is not None and before > self.version
+                if self.version is None or after > self.version:
+                    self.version = after
+            if external:
+                self.publish("reset")
+        with self.lock:
+            self.seq += 1
+            event = {"id": f"{self.epoch}-{self.seq}", "seq": self.seq, "type": type, **data}
+            self.history.append(event)
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            self._deliver(subscriber, event)
+        return event
+
+    def close(self):
+        """End every open subscription"""
+        with self.lock:
+            subscribers, self.subscribers = self.subscribers, []
+        for subscriber in subscribers:
+            self._deliver(subscriber, None)
+
+    def _deliver(self, subscriber: _Subscriber, event: Optional[dict]):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is subscriber.loop:
+            subscriber.put(event)
+        elif not subscriber.loop.is_closed():
+            subscriber.loop.call_soon_threadsafe(subscriber.put, event)
+
+    def _reset_event(self) -> dict:
+        return {"id": f"{self.epoch}-{self.seq}", "seq": self.seq, "type": "reset"}
+
+    def _backlog(self, last_event_id: Optional[str]) -> Optional[List[dict]]:
+        """Events after last_event_id, or None if they can't all be replayed"""
+        epoch, _, seq = (last_event_id or "").partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq > self.seq:
+            return None
+        if seq < self.seq and (not self.history or self.history[0]["seq"] > seq + 1):
+            return None
+        return [event for event in self.history if event["seq"] > seq]
+
+    async def subscribe(self, last_event_id: Optional[str] = None, heartbeat: Optional[float] = None,
+                        max_age: Optional[float] = None) -> AsyncIterator[dict]:
+        """Yield events as they are published.
+
+        With last_event_id, missed events are replayed first; if they have
+        already left the history (or the server restarted) a "reset" event
+        tells the client to reload its data. A subscriber that falls more than
+        EVENT_QUEUE_SIZE events behind also gets a reset. HEARTBEAT is yielded
+        after heartbeat idle seconds, and the subscription ends after max_age.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_age if max_age else None
+        subscriber = _Subscriber(asyncio.get_running_loop())
+        with self.lock:
+            backlog = self._backlog(last_event_id) if last_event_id else []
+            if backlog is None:
+                backlog = [self._reset_event()]
+            self.subscribers.append(subscriber)
+        try:
+            for event in backlog:
+                yield event
+            while True:
+                timeout = heartbeat
+                if deadline is not None:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        return
+                    timeout = min(timeout or remaining, remaining)
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+                    continue
+                if event is None:
+                    return
+                yield event
+                if subscriber.overflowed:
+                    logger.warning("Change feed subscriber fell behind, sending reset")
+                    while not subscriber.queue.empty():
+                        if subscriber.queue.get_nowait() is None:
+                            return
+                    subscriber.overflowed = False
+                    with self.lock:
+                        reset = self._reset_event()
+                    yield reset
+        finally:
+            with self.lock:
+                if subscriber in self.subscribers:
+                    self.subscribers.remove(subscriber)
+
+    async def watch(self, version_source, interval: float = EVENT_POLL_INTERVAL):
+        """Publish a reset whenever the items version moves past what was published.
+        
+        version_source is an async callable returning the current version.
+        Runs until cancelled.
+        """
+        while True:
+            try:
+                version = await version_source()
+            except Exception as e:
+                logger.warning(f"Change feed version check failed: {e}")
+                version = None
+            if version is not None:
+                with self.lock:
+                    external = self.version is not None and version > self.version
+                    if self.version is None or version > self.version:
+                        self.version = version
+                if external and self.subscribers:
+                    self.publish("reset")
+            await asyncio.sleep(interval)
+
+    async def sse_stream(self, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """The feed as a text/event-stream body"""
+        yield b"retry: 3000\n\n"
+        async for event in self.subscribe(last_event_id, EVENT_HEARTBEAT, EVENT_STREAM_MAX_AGE):
+            if event is HEARTBEAT:
+                yield b": heartbeat\n\n"
+                continue
+            yield b"id: %s\nevent: %s\ndata: %s\n\n" % (
+                event["id"].encode(), event["type"].encode(), dumps(event)
+            )
+
+    # Helpers used by the write paths in crud.py
+
+    def item_created(self, item: dict, versions: Optional[Tuple[int, int]] = None):
+        self.publish("create", versions, item=item)
+
+    def item_updated(self, item: dict, versions: Optional[Tuple[int, int]] = None):
+        self.publish("update", versions, item=item)
+
+    def item_deleted(self, item_id: int, versions: Optional[Tuple[int, int]] = None):
+        self.publish("delete", versions, item_id=item_id)
+
+    def items_changed(self, ids: List[int], versions: Optional[Tuple[int, int]] = None):
+        if len(ids) > EVENT_MAX_IDS:
+            self.publish("reset", versions)
+        elif ids:
+            self.publish("bulk", versions, ids=ids)
+
+change_feed = ChangeFeed()
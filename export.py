@@ -0,0 +1,144 @@
+import csv
+import io
+import zlib
+from typing import AsyncIterator, List
+
+from sqlalchemy import Select
+
+from database import async_read_engine
+from serialization import dumps
+
+# Rows fetched from the server-side cursor per round trip
+EXPORT_BATCH_SIZE = 1000
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+}
+
+class _NDJSONEncoder:
+    def header(self, columns: List[str]) -> bytes:
+        self.columns = columns
+        return b""
+
+    def encode(self, rows) -> bytes:
+        return b"".join(dumps(row._asdict()) + b"\n" for row in rows)
+
+    def footer(self) -> bytes:
+        return b""
+
+class _CSVEncoder:
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def _drain(self) -> bytes:
+        data = self.buffer.getvalue().encode()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+    def header(self, columns: List[str]) -> bytes:
+        self.writer.writerow(columns)
+        return self._drain()
+
+    def encode(self, rows) -> bytes:
+        self.writer.writerows(
+            tuple(value.isoformat() if hasattr(value, "isoformat") else value for value in row)
+            for row in rows
+        )
+        return self._drain()
+
+    def footer(self) -> bytes:
+        return b""
+
+class _Sink:
+    """Write-only file object that hands back what was written since the last drain"""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+class _ArrowEncoder:
+    """Arrow IPC stream: one columnar record batch per fetched partition"""
+
+    def __init__(self):
+        import pyarrow
+
+        self.pa = pyarrow
+        self.sink = _Sink()
+
+    def header(self, columns: List[str]) -> bytes:
+        pa = self.pa
+        types = {
+            "id": pa.int64(), "quantity": pa.int64(), "price": pa.float64(),
+            "created_at": pa.timestamp("us"), "updated_at": pa.timestamp("us"),
+        }
+        self.columns = columns
+        self.schema = pa.schema([(column, types.get(column, pa.string())) for column in columns])
+        self.writer = pa.ipc.new_stream(self.sink, self.schema)
+        return self.sink.drain()
+
+    def encode(self, rows) -> bytes:
+        arrays = [
+            self.pa.array([row[index] for row in rows], type=field.type)
+            for index, field in enumerate(self.schema)
+        ]
+        self.writer.write_batch(self.pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        return self.sink.drain()
+
+    def footer(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+def get_encoder(format: str):
+    """Encoder for an export format, raising ValueError if it can't be produced"""
+    if format == "ndjson":
+        return _NDJSONEncoder()
+    if format == "csv":
+        return _CSVEncoder()
+    if format == "arrow":
+        try:
+            return _ArrowEncoder()
+        except ImportError:
+            raise ValueError("Arrow export requires pyarrow; install it with pip install -r requirements.txt")
+    raise ValueError(f"Unsupported export format '{format}'")
+
+async def export_stream(statement: Select, encoder, compress: bool = False,
+                        engine=None) -> AsyncIterator[bytes]:
+    """Stream a query's rows through an encoder with constant memory.
+
+    Rows come from a server-side cursor EXPORT_BATCH_SIZE at a time, and each
+    encoded batch is (optionally gzip-compressed and) yielded before the next
+    one is fetched.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def emit(data: bytes, final: bool = False) -> bytes:
+        if compressor is None:
+            return data
+        return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+    async with (engine or async_read_engine).connect() as conn:
+        result = await conn.stream(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        yield emit(encoder.header(list(result.keys())))
+        async for rows in result.partitions():
+            yield emit(encoder.encode(rows))
+    yield emit(encoder.footer(), final=True)
@@ -1,26 +1,98 @@
-from fastapi import FastAPI, Depends, HTTPException, Query, status
+from fastapi import (
+    FastAPI, Depends, Header, HTTPException, Query, Request, WebSocket, status
+)
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from contextlib import asynccontextmanager
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import List, Optional, Union
+import asyncio
 import logging
 
-from database import get_db, create_tables
-from models import ItemCreate, ItemUpdate, ItemResponse, CategoryResponse, ItemListResponse
-from crud import ItemCRUD
+from database import (
+    LOW_STOCK_THRESHOLD, get_async_db, get_async_read_db, has_search_index_async, setup_database
+)
+from models import (
+    ItemCreate, ItemUpdate, ItemResponse, CategoryResponse, ItemListResponse, BulkImportResponse,
+    BulkUpsertResponse, LowStockCountResponse, StockMovementCreate, RecordedMovementResponse,
+    StockMovementListResponse, StockMovementBatchResponse, StockLevelResponse, LocationCreate, LocationResponse,
+    WarehouseResponse, WarehouseStockListResponse, LocationStockUpdate, LocationStockResponse, ItemLocationsResponse,
+    ItemBatchGetRequest, ItemBatchGetResponse, ItemQuery, ItemQueryResponse, BackupResponse
+)
+from crud import ItemCRUD, AsyncItemCRUD, StockAllocationError, is_duplicate_sku
+from cache import ResponseCacheMiddleware, get_table_version
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, render_metrics
+from serialization import FastJSONResponse, dumps, item_list_payload
+from export import EXPORT_FORMATS, export_stream, get_encoder
+from bulk import BulkParseError, import_stream, movements_stream, upsert_stream
+from events import EVENT_HEARTBEAT, EVENT_POLL_INTERVAL, EVENT_STREAM_MAX_AGE, change_feed
+from replica import READ_REPLICA, READ_REPLICA_POLL_INTERVAL, catalog_replica
+from writes import WRITE_PIPELINE, WriteQueueFull, write_pipeline
+from backup import BackupError, BackupInProgress, create_snapshot, list_snapshots
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Per-worker startup and shutdown.
+    
+    Schema setup runs here rather than at import, so importing the app has no
+    side effects and workers starting together don't race on migrations.
+    """
+    setup_database()
+    watcher = None
+    if EVENT_POLL_INTERVAL > 0:
+        # Writes handled by other workers reach this worker's subscribers as resets
+        watcher = asyncio.create_task(change_feed.watch(get_table_version, EVENT_POLL_INTERVAL))
+    replica_loader = None
+    if READ_REPLICA:
+        # Loads in the background; reads go to the database until it is ready
+        replica_loader = asyncio.create_task(catalog_replica.watch(READ_REPLICA_POLL_INTERVAL))
+    if WRITE_PIPELINE:
+        write_pipeline.start()
+    yield
+    # Commit queued writes before anything they publish to goes away
+    await write_pipeline.close()
+    if watcher is not None:
+        watcher.cancel()
+    if replica_loader is not None:
+        replica_loader.cancel()
+        catalog_replica.close()
+    # End open event streams so shutdown doesn't wait on them
+    change_feed.close()
+
 # Create FastAPI app
 app = FastAPI(
     title="Tuari Inventory API",
     description="Fast and efficient inventory management system",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+def write_queue_full(e: WriteQueueFull) -> HTTPException:
+    """503 for a write the pipeline had no room for; the client should retry shortly"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"Too many writes in progress: {e}",
+        headers={"Retry-After": "1"}
+    )
+
+async def items_version():
+    """Version the cached responses are keyed on: the replica's while it serves reads"""
+    if catalog_replica.ready:
+        return catalog_replica.version
+    return await get_table_version()
+
+# Serve unchanged read responses from memory and answer conditional GETs with
+# 304 (added first so it sits inside CORS)
+app.add_middleware(ResponseCacheMiddleware, version_source=items_version)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -30,12 +102,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Route latency, SQL time and statement counts (outermost, so it times everything)
+app.add_middleware(MetricsMiddleware)
+
 # Mount static files for frontend
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Initialize database tables
-create_tables()
-
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
     """Serve the main HTML page"""
@@ -43,89 +115,434 @@ async def read_root():
         return HTMLResponse(content=f.read())
 
 @app.post("/api/items", response_model=ItemResponse, status_code=status.HTTP_201_CREATED)
-async def add_item(item: ItemCreate, db: Session = Depends(get_db)):
+async def add_item(item: ItemCreate, db: AsyncSession = Depends(get_async_db)):
     """Add a new item to inventory"""
     try:
-        # Check if SKU already exists
-        existing_item = ItemCRUD.get_by_sku(db, item.sku)
-        if existing_item:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Item with SKU '{item.sku}' already exists"
-            )
-        
-        db_item = ItemCRUD.add(db, item)
-        return db_item
+        # The unique index on sku rejects duplicates, so no lookup is needed first
+        if write_pipeline.running:
+            created = await write_pipeline.add(item)
+        else:
+            created = await AsyncItemCRUD.add(db, item)
+    except WriteQueueFull as e:
+        raise write_queue_full(e)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Item with SKU '{item.sku}' already exists"
+        )
     except Exception as e:
         logger.error(f"Error adding item: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to add item"
         )
+    return FastJSONResponse(created, status_code=status.HTTP_201_CREATED)
 
-@app.get("/api/items/{item_id}", response_model=ItemResponse)
-async def get_one(item_id: int, db: Session = Depends(get_db)):
-    """Get a single item by ID"""
-    db_item = ItemCRUD.get_one(db, item_id)
-    if not db_item:
+@app.post("/api/items/bulk", response_model=BulkImportResponse)
+async def add_items_bulk(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Import many items from a JSON array, NDJSON or CSV body.
+    
+    The body is parsed as it streams in and written in batched transactions;
+    the response reports the outcome of every row.
+    """
+    try:
+        return await import_stream(db, request.stream(), request.headers.get("content-type"))
+    except BulkParseError as e:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Item with ID {item_id} not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": str(e), **e.summary}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error importing items: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to import items"
+        )
+
+@app.put("/api/items/bulk", response_model=BulkUpsertResponse)
+async def upsert_items_bulk(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Create or partially update many items keyed by SKU.
+    
+    Accepts the same formats as POST /api/items/bulk with ItemUpsert rows:
+    only the fields present are written, and quantity_delta adjusts stock
+    relative to its current value.
+    """
+    try:
+        return await upsert_stream(db, request.stream(), request.headers.get("content-type"))
+    except BulkParseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": str(e), **e.summary}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error upserting items: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to upsert items"
+        )
+
+@app.post("/api/items/batch-get", response_model=ItemBatchGetResponse)
+async def batch_get_items(request: ItemBatchGetRequest, db: AsyncSession = Depends(get_async_read_db)):
+    """Get many items by id and/or SKU in one request.
+    
+    Results come in request order, ids first and then SKUs, with each key
+    that matches no item marked not_found.
+    """
+    try:
+        result = catalog_replica.get_many(request.ids, request.skus)
+        if result is None:
+            result = await AsyncItemCRUD.get_many(db, request.ids, request.skus)
+        return FastJSONResponse(result)
+    except Exception as e:
+        logger.error(f"Error getting items in batch: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get items"
+        )
+
+@app.get("/api/items/export")
+async def export_items(
+    request: Request,
+    format: str = Query("ndjson", description="Export format: ndjson, csv or arrow"),
+    category: Optional[str] = Query(None, description="Only export this category"),
+    search: Optional[str] = Query(None, description="Only export items matching this search term"),
+):
+    """Stream the whole catalog, or a category or search subset, in id order.
+    
+    Rows are read from a server-side cursor in batches and streamed as they
+    are encoded, so memory use does not grow with the catalog. Responses are
+    gzip-compressed on the fly when the client accepts it.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported export format '{format}', expected one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    try:
+        encoder = get_encoder(format)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    statement = ItemCRUD.export_select(category, search, await has_search_index_async())
+    compress = "gzip" in request.headers.get("accept-encoding", "")
+    media_type, extension = EXPORT_FORMATS[format]
+    headers = {
+        "Content-Disposition": f'attachment; filename="items.{extension}"',
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export_stream(statement, encoder, compress), media_type=media_type, headers=headers
+    )
+
+@app.get("/api/items/low-stock", response_model=Union[ItemListResponse, LowStockCountResponse])
+async def get_low_stock(
+    threshold: int = Query(LOW_STOCK_THRESHOLD, ge=0, description="Low stock threshold"),
+    count_only: bool = Query(False, description="Only return how many items are low on stock"),
+    page: int = Query(1, ge=1, description="Page number"),
+    per_page: int = Query(50, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    include_total: bool = Query(True, description="Count all matching items"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get items with low stock, lowest quantity first, or just their count"""
+    try:
+        if count_only:
+            count = catalog_replica.count_low_stock(threshold)
+            if count is None:
+                count = await AsyncItemCRUD.count_low_stock(db, threshold)
+            return FastJSONResponse({"threshold": threshold, "count": count})
+        result = catalog_replica.get_low_stock(threshold, page, per_page, cursor, include_total)
+        if result is None:
+            result = await AsyncItemCRUD.get_low_stock(db, threshold, page, per_page, cursor, include_total)
+        return FastJSONResponse(item_list_payload(result))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting low stock items: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get low stock items"
         )
-    return db_item
+
+@app.get("/api/items/query", response_model=ItemQueryResponse)
+async def query_items(
+    category: List[str] = Query([], description="Only items in these categories (repeat for several)"),
+    location: List[str] = Query([], description="Only items at these locations (repeat for several)"),
+    min_price: Optional[float] = Query(None, ge=0, description="Lowest price"),
+    max_price: Optional[float] = Query(None, ge=0, description="Highest price"),
+    min_quantity: Optional[int] = Query(None, ge=0, description="Lowest quantity"),
+    max_quantity: Optional[int] = Query(None, ge=0, description="Highest quantity"),
+    search: Optional[str] = Query(None, description="Search term"),
+    sort: Optional[str] = Query(None, description="Sort keys, '-' first for descending, e.g. -price,name"),
+    facets: Optional[str] = Query(None, description="Columns to count matching items by: category, location"),
+    facet_limit: int = Query(50, ge=1, le=1000, description="Most values returned per facet"),
+    page: int = Query(1, ge=1, description="Page number"),
+    per_page: int = Query(50, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    include_total: bool = Query(True, description="Count all matching items"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get items matching any combination of filters, in any sort order, with facet counts.
+    
+    Filters combine with AND; repeated category or location values with OR.
+    Facet counts cover every matching item, not just the page.
+    """
+    try:
+        query = ItemQuery(
+            category=category, location=location, min_price=min_price, max_price=max_price,
+            min_quantity=min_quantity, max_quantity=max_quantity, search=search,
+            sort=sort or [], facets=facets or []
+        )
+        result = await AsyncItemCRUD.query_items(db, query, page, per_page, cursor, include_total, facet_limit)
+        return FastJSONResponse({**item_list_payload(result), "facets": result["facets"]})
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="; ".join(str(error.get("ctx", {}).get("error", error["msg"])) for error in e.errors())
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error querying items: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to query items"
+        )
+
+@app.get("/api/items/{item_id}", response_model=ItemResponse)
+async def get_one(item_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """Get a single item by ID"""
+    if catalog_replica.ready:
+        row = catalog_replica.get_one(item_id)
+        if row is not None:
+            return FastJSONResponse(row._asdict())
+    else:
+        db_item = await AsyncItemCRUD.get_one(db, item_id)
+        if db_item:
+            return db_item
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Item with ID {item_id} not found"
+    )
 
 @app.put("/api/items/{item_id}", response_model=ItemResponse)
-async def update_item(item_id: int, item_update: ItemUpdate, db: Session = Depends(get_db)):
+async def update_item(item_id: int, item_update: ItemUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update an existing item"""
     try:
-        db_item = ItemCRUD.update(db, item_id, item_update)
-        if not db_item:
+        if write_pipeline.running:
+            updated = await write_pipeline.update(item_id, item_update)
+        else:
+            updated = await AsyncItemCRUD.update(db, item_id, item_update)
+    except WriteQueueFull as e:
+        raise write_queue_full(e)
+    except StockAllocationError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except IntegrityError as e:
+        if not is_duplicate_sku(e):
+            logger.error(f"Error updating item {item_id}: {e}")
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Item with ID {item_id} not found"
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to update item"
             )
-        return db_item
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Item with SKU '{item_update.sku}' already exists"
+        )
     except Exception as e:
         logger.error(f"Error updating item {item_id}: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update item"
         )
+    if updated is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Item with ID {item_id} not found"
+        )
+    return FastJSONResponse(updated)
 
 @app.delete("/api/items/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_item(item_id: int, db: Session = Depends(get_db)):
+async def delete_item(item_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete an item by ID"""
     try:
-        success = ItemCRUD.delete(db, item_id)
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Item with ID {item_id} not found"
-            )
+        if write_pipeline.running:
+            success = await write_pipeline.delete(item_id)
+        else:
+            success = await AsyncItemCRUD.delete(db, item_id)
+    except WriteQueueFull as e:
+        raise write_queue_full(e)
     except Exception as e:
         logger.error(f"Error deleting item {item_id}: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete item"
         )
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Item with ID {item_id} not found"
+        )
+
+@app.post("/api/items/{item_id}/movements", response_model=RecordedMovementResponse,
+          status_code=status.HTTP_201_CREATED)
+async def record_movement(item_id: int, movement: StockMovementCreate, db: AsyncSession = Depends(get_async_db)):
+    """Record a receipt, pick or adjustment, returning it with the new quantity"""
+    try:
+        result = await AsyncItemCRUD.record_movement(db, item_id, movement)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error recording movement for item {item_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to record stock movement"
+        )
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Item with ID {item_id} not found"
+        )
+    return FastJSONResponse(result, status_code=status.HTTP_201_CREATED)
+
+@app.get("/api/items/{item_id}/movements", response_model=StockMovementListResponse)
+async def get_movements(
+    item_id: int,
+    page: int = Query(1, ge=1, description="Page number"),
+    per_page: int = Query(50, ge=1, le=100, description="Movements per page"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    include_total: bool = Query(True, description="Count all of the item's movements"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get an item's stock movement history, oldest first"""
+    try:
+        result = await AsyncItemCRUD.get_movements(db, item_id, page, per_page, cursor, include_total)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting movements for item {item_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get stock movements"
+        )
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Item with ID {item_id} not found"
+        )
+    return FastJSONResponse(result)
+
+@app.get("/api/items/{item_id}/stock", response_model=StockLevelResponse)
+async def get_stock_at(
+    item_id: int,
+    at: Optional[datetime] = Query(None, description="Point in time (ISO 8601, UTC if no offset); defaults to now"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get an item's quantity as of a point in time, from the stock ledger"""
+    at = at or datetime.utcnow()
+    try:
+        quantity = await AsyncItemCRUD.get_stock_at(db, item_id, at)
+    except Exception as e:
+        logger.error(f"Error getting stock for item {item_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get stock level"
+        )
+    if quantity is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Item with ID {item_id} not found"
+        )
+    return FastJSONResponse({"item_id": item_id, "at": at, "quantity": quantity})
+
+@app.get("/api/items/{item_id}/locations", response_model=ItemLocationsResponse)
+async def get_item_locations(item_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """Get an item's stock per warehouse and per bin"""
+    try:
+        result = await AsyncItemCRUD.get_item_locations(db, item_id)
+    except Exception as e:
+        logger.error(f"Error getting locations for item {item_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get item locations"
+        )
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Item with ID {item_id} not found"
+        )
+    return FastJSONResponse(result)
+
+@app.put("/api/items/{item_id}/locations/{location_id}", response_model=LocationStockResponse)
+async def set_location_stock(
+    item_id: int, location_id: int, stock: LocationStockUpdate, db: AsyncSession = Depends(get_async_db)
+):
+    """Set how many units of an item a bin holds, out of the item's stock that isn't in a bin"""
+    try:
+        result = await AsyncItemCRUD.set_location_stock(db, item_id, location_id, stock.quantity)
+    except StockAllocationError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error setting stock of item {item_id} in location {location_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to set location stock"
+        )
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Item with ID {item_id} or location with ID {location_id} not found"
+        )
+    return FastJSONResponse(result)
+
+@app.post("/api/movements", response_model=StockMovementBatchResponse)
+async def record_movements(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Append many stock movements keyed by SKU.
+    
+    Accepts the same formats as POST /api/items/bulk with rows of
+    {sku, kind, quantity}; movements are appended in batched transactions
+    and the response reports the outcome of every row.
+    """
+    try:
+        return await movements_stream(db, request.stream(), request.headers.get("content-type"))
+    except BulkParseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": str(e), **e.summary}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error recording stock movements: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to record stock movements"
+        )
 
 @app.get("/api/items/category/{category}", response_model=ItemListResponse)
 async def get_category(
     category: str,
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(50, ge=1, le=100, description="Items per page"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    include_total: bool = Query(True, description="Count all matching items"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get items by category with pagination"""
+    """Get items by category with page or cursor pagination"""
     try:
-        result = ItemCRUD.get_category(db, category, page, per_page)
-        return ItemListResponse(
-            items=result["items"],
-            total=result["total"],
-            page=result["page"],
-            per_page=result["per_page"],
-            total_pages=result["total_pages"]
-        )
+        result = catalog_replica.get_category(category, page, per_page, cursor, include_total)
+        if result is None:
+            result = await AsyncItemCRUD.get_category(db, category, page, per_page, cursor, include_total)
+        return FastJSONResponse(item_list_payload(result))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting category {category}: {e}")
         raise HTTPException(
@@ -134,11 +551,11 @@ async def get_category(
         )
 
 @app.get("/api/categories", response_model=List[CategoryResponse])
-async def get_categories(db: Session = Depends(get_db)):
+async def get_categories(db: AsyncSession = Depends(get_async_read_db)):
     """Get all categories with item count and total value"""
     try:
-        categories = ItemCRUD.get_categories(db)
-        return categories
+        categories = await AsyncItemCRUD.get_categories(db)
+        return FastJSONResponse(categories)
     except Exception as e:
         logger.error(f"Error getting categories: {e}")
         raise HTTPException(
@@ -151,22 +568,26 @@ async def get_all_items(
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(50, ge=1, le=100, description="Items per page"),
     search: Optional[str] = Query(None, description="Search term"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    include_total: bool = Query(True, description="Count all matching items"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get all items with pagination and optional search"""
+    """Get all items with page or cursor pagination and optional search"""
     try:
         if search:
-            result = ItemCRUD.search_items(db, search, page, per_page)
+            if cursor:
+                raise ValueError("Cursor pagination is not supported with search")
+            result = catalog_replica.search_items(search, page, per_page)
+            if result is None:
+                result = await AsyncItemCRUD.search_items(db, search, page, per_page)
         else:
-            result = ItemCRUD.get_all_paginated(db, page, per_page)
+            result = catalog_replica.get_all_paginated(page, per_page, cursor, include_total)
+            if result is None:
+                result = await AsyncItemCRUD.get_all_paginated(db, page, per_page, cursor, include_total)
         
-        return ItemListResponse(
-            items=result["items"],
-            total=result["total"],
-            page=result["page"],
-            per_page=result["per_page"],
-            total_pages=result["total_pages"]
-        )
+        return FastJSONResponse(item_list_payload(result))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting items: {e}")
         raise HTTPException(
@@ -174,20 +595,152 @@ async def get_all_items(
             detail="Failed to get items"
         )
 
-@app.get("/api/items/low-stock", response_model=List[ItemResponse])
-async def get_low_stock(
-    threshold: int = Query(10, ge=0, description="Low stock threshold"),
-    db: Session = Depends(get_db)
+@app.post("/api/locations", response_model=LocationResponse, status_code=status.HTTP_201_CREATED)
+async def add_location(location: LocationCreate, db: AsyncSession = Depends(get_async_db)):
+    """Add a warehouse, a zone within a warehouse, or a bin within a zone"""
+    try:
+        created = await AsyncItemCRUD.add_location(db, location)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Location '{location.name}' already exists in its parent"
+        )
+    except Exception as e:
+        logger.error(f"Error adding location: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to add location"
+        )
+    return FastJSONResponse(created, status_code=status.HTTP_201_CREATED)
+
+@app.get("/api/locations", response_model=List[LocationResponse])
+async def get_locations(
+    warehouse_id: Optional[int] = Query(None, description="Only this warehouse and its zones and bins"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get items with low stock"""
+    """Get locations in path order"""
     try:
-        items = ItemCRUD.get_low_stock(db, threshold)
-        return items
+        return FastJSONResponse(await AsyncItemCRUD.get_locations(db, warehouse_id))
     except Exception as e:
-        logger.error(f"Error getting low stock items: {e}")
+        logger.error(f"Error getting locations: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to get low stock items"
+            detail="Failed to get locations"
+        )
+
+@app.get("/api/warehouses", response_model=List[WarehouseResponse])
+async def get_warehouses(db: AsyncSession = Depends(get_async_read_db)):
+    """Get every warehouse with the number of items it holds and their total quantity"""
+    try:
+        return FastJSONResponse(await AsyncItemCRUD.get_warehouses(db))
+    except Exception as e:
+        logger.error(f"Error getting warehouses: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get warehouses"
+        )
+
+@app.get("/api/warehouses/{warehouse_id}/stock", response_model=WarehouseStockListResponse)
+async def get_warehouse_stock(
+    warehouse_id: int,
+    page: int = Query(1, ge=1, description="Page number"),
+    per_page: int = Query(50, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    include_total: bool = Query(True, description="Count all of the warehouse's items"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get the items a warehouse holds with their quantity there, in item id order"""
+    try:
+        result = await AsyncItemCRUD.get_warehouse_stock(db, warehouse_id, page, per_page, cursor, include_total)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting stock for warehouse {warehouse_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get warehouse stock"
+        )
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Warehouse with ID {warehouse_id} not found"
+        )
+    return FastJSONResponse(result)
+
+@app.get("/api/events")
+async def stream_events(
+    last_event_id: Optional[str] = Query(None, description="Resume after this event id"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """Server-Sent Events feed of item changes.
+    
+    Events are "create" and "update" (with the full item), "delete",
+    "bulk" (ids touched by a bulk write) and "reset" (reload everything).
+    Reconnecting with Last-Event-ID replays whatever was missed.
+    """
+    return StreamingResponse(
+        change_feed.sse_stream(last_event_id or last_event_id_header),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/api/events/ws")
+async def events_websocket(websocket: WebSocket, last_event_id: Optional[str] = None):
+    """The /api/events feed as JSON WebSocket messages"""
+    await websocket.accept()
+    
+    async def forward_events():
+        async for event in change_feed.subscribe(last_event_id, EVENT_HEARTBEAT, EVENT_STREAM_MAX_AGE):
+            await websocket.send_text(dumps(event).decode())
+    
+    async def wait_for_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    
+    # Sends alone wouldn't notice a client that left while the feed is idle
+    sender = asyncio.create_task(forward_events())
+    receiver = asyncio.create_task(wait_for_disconnect())
+    done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    if sender in done and sender.exception() is None:
+        await websocket.close()
+
+@app.post("/api/admin/backups", response_model=BackupResponse, status_code=status.HTTP_201_CREATED)
+async def create_backup(check: bool = Query(False, description="Run PRAGMA quick_check on the copy")):
+    """Snapshot the database while it keeps serving.
+
+    Restoring needs the server stopped, so it is only offered by the CLI
+    (python backup.py restore).
+    """
+    try:
+        manifest = await asyncio.to_thread(create_snapshot, check=check)
+    except BackupInProgress as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except BackupError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error creating backup: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to create backup"
+        )
+    return FastJSONResponse(manifest, status_code=status.HTTP_201_CREATED)
+
+@app.get("/api/admin/backups", response_model=List[BackupResponse])
+async def get_backups():
+    """List snapshots, newest first"""
+    try:
+        return FastJSONResponse(await asyncio.to_thread(list_snapshots))
+    except BackupError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error listing backups: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to list backups"
         )
 
 @app.get("/api/health")
@@ -195,6 +748,11 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "message": "Tuari Inventory API is running"}
 
+@app.get("/api/metrics", include_in_schema=False)
+async def get_metrics():
+    """Request, SQL and connection pool metrics in Prometheus text format"""
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
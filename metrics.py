@@ -0,0 +1,338 @@
+import asyncio
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this are logged with their SQL
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))
+
+# Requests issuing more statements than this are logged (likely N+1)
+QUERY_COUNT_WARNING = int(os.getenv("QUERY_COUNT_WARNING", 25))
+
+# Opt-in sampling profiler: requests slower than PROFILE_SLOW_REQUEST_MS get
+# their event loop stacks written to PROFILE_DIR in folded (flame graph) format
+PROFILE_SLOW_REQUEST_MS = float(os.getenv("PROFILE_SLOW_REQUEST_MS", 0))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./data/profiles")
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Histogram:
+    """Prometheus histogram with a fixed label set"""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.buckets = buckets
+        self.series: Dict[Tuple, list] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                # per-bucket counts, then sum and count
+                series = self.series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = sorted((labels, list(values)) for labels, values in self.series.items())
+        for labels, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = _labels(self.label_names, labels, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _labels(self.label_names, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {values[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {values[-2]!r}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {values[-1]}")
+        return lines
+
+class Gauge:
+    """Gauge whose samples are read from a callback at scrape time"""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], collect):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, value in self.collect():
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}")
+        return lines
+
+REQUEST_LATENCY = Histogram(
+    "inventory_http_request_duration_seconds", "Time to send the full response, by route",
+    ("method", "route", "status")
+)
+REQUEST_DB_TIME = Histogram(
+    "inventory_http_request_db_seconds", "Time spent executing SQL per request",
+    ("method", "route")
+)
+REQUEST_QUERIES = Histogram(
+    "inventory_http_request_queries", "SQL statements executed per request",
+    ("method", "route"), COUNT_BUCKETS
+)
+STATEMENT_LATENCY = Histogram(
+    "inventory_db_statement_duration_seconds", "SQL statement execution time",
+    ("operation", "table")
+)
+POOL_WAIT = Histogram(
+    "inventory_db_pool_wait_seconds", "Time to check a connection out of the pool",
+    ("pool",)
+)
+EVENT_LOOP_LAG = Histogram(
+    "inventory_event_loop_lag_seconds", "How late a periodic timer fires on the event loop"
+)
+
+_pools: Dict[str, object] = {}
+
+def _pool_status():
+    for name, engine in sorted(_pools.items()):
+        pool = engine.pool
+        if isinstance(pool, QueuePool):
+            yield (name, "checked_out"), pool.checkedout()
+            yield (name, "idle"), pool.checkedin()
+            yield (name, "overflow"), max(pool.overflow(), 0)
+
+POOL_CONNECTIONS = Gauge(
+    "inventory_db_pool_connections", "Connections per pool and state", ("pool", "state"), _pool_status
+)
+
+METRICS = [
+    REQUEST_LATENCY, REQUEST_DB_TIME, REQUEST_QUERIES, STATEMENT_LATENCY,
+    POOL_WAIT, POOL_CONNECTIONS, EVENT_LOOP_LAG,
+]
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+class RequestStats:
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+# Statement counters for the request being handled (inherited by the
+# greenlets and threadpool workers that run its queries)
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+_TABLE_PATTERN = re.compile(r'\b(?:FROM|INTO|UPDATE|JOIN)\s+["`]?(\w+)', re.IGNORECASE)
+
+@lru_cache(maxsize=2048)
+def statement_labels(statement: str) -> Tuple[str, str]:
+    """(operation, table) for a SQL statement, e.g. ("SELECT", "items")"""
+    words = statement.lstrip().split(None, 1)
+    operation = words[0].upper() if words else ""
+    if operation == "WITH":
+        operation = "SELECT"
+    if operation in ("CREATE", "DROP", "ALTER", "PRAGMA"):
+        return operation, ""
+    match = _TABLE_PATTERN.search(statement)
+    return operation, match.group(1) if match else ""
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_start
+    STATEMENT_LATENCY.observe(elapsed, *statement_labels(statement))
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning(f"Slow query ({elapsed * 1000:.1f} ms): {statement[:500]}")
+
+class _TimedPoolMixin:
+    """Records how long each checkout waits for a free (or new) connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - start, self.logging_name or "default")
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def instrument_engine(engine, name: str):
+    """Time every statement on a (sync) engine and report its pool"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    _pools[name] = engine
+    return engine
+
+class StackSampler:
+    """Samples one thread's stack on a timer and keeps recent samples.
+
+    Stacks are kept folded ("outer;inner") so a window of them can be written
+    straight into flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, thread_id: int, interval: float, history: float = 60.0):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = deque(maxlen=max(1, int(history / interval)))
+        self.thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.samples.append((time.perf_counter(), ";".join(reversed(stack))))
+
+    def folded(self, start: float, end: float) -> Counter:
+        return Counter(stack for at, stack in list(self.samples) if start <= at <= end)
+
+    def dump(self, path: str, start: float, end: float) -> int:
+        stacks = self.folded(start, end)
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return sum(stacks.values())
+
+class MetricsMiddleware:
+    """Per-route latency, SQL time and statement counts for every request.
+
+    Statement counts come from the cursor hooks installed by
+    instrument_engine; a request that runs more than QUERY_COUNT_WARNING
+    statements is logged, since that usually means a query in a loop.
+    """
+
+    def __init__(self, app, slow_request_ms: float = PROFILE_SLOW_REQUEST_MS,
+                 profile_interval_ms: float = PROFILE_INTERVAL_MS, profile_dir: str = PROFILE_DIR):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+        self.profile_interval = profile_interval_ms / 1000
+        self.profile_dir = profile_dir
+        self.sampler: Optional[StackSampler] = None
+        self.lag_probe: Optional[asyncio.Task] = None
+        self.route_paths: Dict[int, str] = {}
+
+    def _route_path(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self.route_paths.get(id(endpoint))
+        if path is None:
+            for route in getattr(scope.get("app"), "routes", ()):
+                if getattr(route, "endpoint", None) is endpoint or getattr(route, "app", None) is endpoint:
+                    path = route.path
+                    break
+            path = self.route_paths[id(endpoint)] = path or "unmatched"
+        return path
+
+    async def _probe_event_loop(self, interval: float = 0.1):
+        while True:
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - expected))
+
+    def _start_background(self):
+        loop = asyncio.get_running_loop()
+        if self.lag_probe is None or self.lag_probe.get_loop() is not loop or self.lag_probe.done():
+            self.lag_probe = loop.create_task(self._probe_event_loop())
+        if self.slow_request_ms > 0 and (
+            self.sampler is None or self.sampler.thread_id != threading.get_ident()
+            or not self.sampler.thread.is_alive()
+        ):
+            os.makedirs(self.profile_dir, exist_ok=True)
+            self.sampler = StackSampler(threading.get_ident(), self.profile_interval)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        self._start_background()
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def record_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, record_status)
+        finally:
+            end = time.perf_counter()
+            _request_stats.reset(token)
+            method, route = scope["method"], self._route_path(scope)
+            REQUEST_LATENCY.observe(end - start, method, route, str(status_code))
+            REQUEST_DB_TIME.observe(stats.db_time, method, route)
+            REQUEST_QUERIES.observe(stats.queries, method, route)
+            if stats.queries > QUERY_COUNT_WARNING:
+                logger.warning(f"{method} {scope['path']} ran {stats.queries} SQL statements")
+            if self.sampler is not None and (end - start) * 1000 >= self.slow_request_ms:
+                self._dump_profile(method, route, start, end)
+
+    def _dump_profile(self, method: str, route: str, start: float, end: float):
+        name = re.sub(r"[^\w.-]+", "_", f"{method}{route}").strip("_")
+        path = os.path.join(self.profile_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{int((end - start) * 1000)}ms.folded")
+        try:
+            samples = self.sampler.dump(path, start, end)
+            logger.warning(f"Slow request {method} {route} took {(end - start) * 1000:.0f} ms, "
+                           f"{samples} stack samples written to {path}")
+        except OSError as e:
+            logger.error(f"Failed to write profile for {method} {route}: {e}")
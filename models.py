@@ -1,7 +1,14 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Literal, Optional
 from datetime import datetime
 
+# Most ids and SKUs one batch-get request may ask for
+BATCH_GET_MAX_KEYS = 1000
+
+# Sort keys and facets GET /api/items/query accepts
+ITEM_SORT_KEYS = ("name", "category", "price", "quantity", "created_at", "updated_at", "id")
+ITEM_FACETS = ("category", "location")
+
 class ItemBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=255, description="Item name")
     category: str = Field(..., min_length=1, max_length=100, description="Item category")
@@ -22,6 +29,26 @@ class ItemUpdate(BaseModel):
     price: Optional[float] = Field(None, ge=0.0)
     sku: Optional[str] = Field(None, min_length=1, max_length=100)
     location: Optional[str] = Field(None, max_length=100)
+    
+    @model_validator(mode="after")
+    def check_nulls(self):
+        # Omitted fields are left alone, but these can't be set to null
+        for field in ("name", "category", "quantity", "price", "sku"):
+            if field in self.model_fields_set and getattr(self, field) is None:
+                raise ValueError(f"{field} cannot be null")
+        return self
+
+class ItemUpsert(ItemUpdate):
+    sku: str = Field(..., min_length=1, max_length=100, description="Stock Keeping Unit to create or update")
+    quantity_delta: Optional[int] = Field(None, description="Relative quantity change, applied atomically")
+    
+    @model_validator(mode="after")
+    def check_fields(self):
+        if self.quantity is not None and self.quantity_delta is not None:
+            raise ValueError("Set either quantity or quantity_delta, not both")
+        if "quantity_delta" in self.model_fields_set and self.quantity_delta is None:
+            raise ValueError("quantity_delta cannot be null")
+        return self
 
 class ItemResponse(ItemBase):
     id: int
@@ -34,11 +61,241 @@ class ItemResponse(ItemBase):
 class CategoryResponse(BaseModel):
     category: str
     item_count: int
+    total_quantity: int = 0
     total_value: float
 
 class ItemListResponse(BaseModel):
     items: list[ItemResponse]
+    total: Optional[int] = None
+    page: int
+    per_page: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None 
+
+class ItemBatchGetRequest(BaseModel):
+    ids: list[int] = Field(default_factory=list, description="Item ids to look up")
+    skus: list[str] = Field(default_factory=list, description="SKUs to look up")
+    
+    @model_validator(mode="after")
+    def check_keys(self):
+        if not self.ids and not self.skus:
+            raise ValueError("Give at least one id or SKU")
+        if len(self.ids) + len(self.skus) > BATCH_GET_MAX_KEYS:
+            raise ValueError(f"At most {BATCH_GET_MAX_KEYS} ids and SKUs per request")
+        return self
+
+class ItemBatchResult(BaseModel):
+    id: Optional[int] = None
+    sku: Optional[str] = None
+    status: Literal["found", "not_found"]
+    item: Optional[ItemResponse] = None
+
+class ItemBatchGetResponse(BaseModel):
+    total: int
+    found: int
+    not_found: int
+    results: list[ItemBatchResult]
+
+class ItemQuery(BaseModel):
+    """Filters, sort order and facets for GET /api/items/query"""
+    category: list[str] = Field(default_factory=list, description="Only items in one of these categories")
+    location: list[str] = Field(default_factory=list, description="Only items at one of these locations")
+    min_price: Optional[float] = Field(None, ge=0.0, description="Lowest price")
+    max_price: Optional[float] = Field(None, ge=0.0, description="Highest price")
+    min_quantity: Optional[int] = Field(None, ge=0, description="Lowest quantity")
+    max_quantity: Optional[int] = Field(None, ge=0, description="Highest quantity")
+    search: Optional[str] = Field(None, description="Only items matching this search term")
+    sort: list[str] = Field(default_factory=list, description="Sort keys, '-' first for descending")
+    facets: list[str] = Field(default_factory=list, description="Columns to count matching items by")
+    
+    @field_validator("sort", "facets", mode="before")
+    @classmethod
+    def split_commas(cls, value):
+        if isinstance(value, str):
+            return [part.strip() for part in value.split(",") if part.strip()]
+        return value
+    
+    @model_validator(mode="after")
+    def check_query(self):
+        keys = [key.lstrip("-") for key in self.sort]
+        for key in keys:
+            if key not in ITEM_SORT_KEYS:
+                raise ValueError(f"Unknown sort key '{key}', expected one of: {', '.join(ITEM_SORT_KEYS)}")
+        if len(set(keys)) != len(keys):
+            raise ValueError("Each sort key may only appear once")
+        for facet in self.facets:
+            if facet not in ITEM_FACETS:
+                raise ValueError(f"Unknown facet '{facet}', expected one of: {', '.join(ITEM_FACETS)}")
+        if len(set(self.facets)) != len(self.facets):
+            raise ValueError("Each facet may only appear once")
+        if self.min_price is not None and self.max_price is not None and self.min_price > self.max_price:
+            raise ValueError("min_price is above max_price")
+        if self.min_quantity is not None and self.max_quantity is not None and self.min_quantity > self.max_quantity:
+            raise ValueError("min_quantity is above max_quantity")
+        return self
+
+class FacetCount(BaseModel):
+    value: Optional[str] = None
+    count: int
+
+class ItemQueryResponse(ItemListResponse):
+    facets: Optional[dict[str, list[FacetCount]]] = None
+
+class LowStockCountResponse(BaseModel):
+    threshold: int
+    count: int
+
+class BulkItemResult(BaseModel):
+    row: int
+    sku: Optional[str] = None
+    status: str
+    id: Optional[int] = None
+    movement_id: Optional[int] = None
+    quantity: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkImportResponse(BaseModel):
+    total: int
+    created: int
+    failed: int
+    results: list[BulkItemResult]
+
+class BulkUpsertResponse(BaseModel):
+    total: int
+    created: int
+    updated: int
+    failed: int
+    results: list[BulkItemResult]
+
+class StockMovementCreate(BaseModel):
+    kind: Literal["receipt", "pick", "adjustment"] = Field(..., description="Type of stock movement")
+    quantity: int = Field(..., description="Units received or picked, or the signed change for an adjustment")
+    
+    @model_validator(mode="after")
+    def check_quantity(self):
+        if self.kind == "adjustment":
+            if self.quantity == 0:
+                raise ValueError("An adjustment must change the quantity")
+        elif self.quantity <= 0:
+            raise ValueError(f"A {self.kind} quantity must be positive")
+        return self
+    
+    @property
+    def delta(self) -> int:
+        return -self.quantity if self.kind == "pick" else self.quantity
+
+class StockMovementBatchItem(StockMovementCreate):
+    sku: str = Field(..., min_length=1, max_length=100, description="Stock Keeping Unit the movement applies to")
+
+class StockMovementResponse(BaseModel):
+    id: int
+    item_id: int
+    kind: str
+    delta: int
+    created_at: datetime
+
+class RecordedMovementResponse(StockMovementResponse):
+    quantity: int
+
+class StockMovementListResponse(BaseModel):
+    items: list[StockMovementResponse]
+    total: Optional[int] = None
+    page: int
+    per_page: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+class StockMovementBatchResponse(BaseModel):
     total: int
+    recorded: int
+    failed: int
+    results: list[BulkItemResult]
+
+class StockLevelResponse(BaseModel):
+    item_id: int
+    at: datetime
+    quantity: int
+
+class LocationCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100, pattern=r"^[^/]+$",
+                      description="Location name, unique within its parent")
+    kind: Literal["warehouse", "zone", "bin"] = Field(..., description="Level in the warehouse > zone > bin hierarchy")
+    parent_id: Optional[int] = Field(None, description="The zone's warehouse or the bin's zone")
+    
+    @model_validator(mode="after")
+    def check_parent(self):
+        if self.kind == "warehouse" and self.parent_id is not None:
+            raise ValueError("A warehouse has no parent")
+        if self.kind != "warehouse" and self.parent_id is None:
+            raise ValueError(f"A {self.kind} needs a parent_id")
+        return self
+
+class LocationResponse(BaseModel):
+    id: int
+    kind: str
+    name: str
+    parent_id: Optional[int] = None
+    warehouse_id: int
+    path: str
+
+class WarehouseResponse(BaseModel):
+    id: int
+    name: str
+    item_count: int
+    total_quantity: int
+
+class WarehouseItemStock(BaseModel):
+    item_id: int
+    sku: str
+    name: str
+    quantity: int
+
+class WarehouseStockListResponse(BaseModel):
+    items: list[WarehouseItemStock]
+    total: Optional[int] = None
     page: int
     per_page: int
-    total_pages: int 
\ No newline at end of file
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+class LocationStockUpdate(BaseModel):
+    quantity: int = Field(..., ge=0, description="Units held at the location; 0 removes the item from it")
+
+class LocationStockResponse(BaseModel):
+    item_id: int
+    location_id: int
+    quantity: int
+    item_quantity: int
+
+class ItemWarehouseStock(BaseModel):
+    warehouse_id: int
+    name: str
+    quantity: int
+
+class ItemLocationStock(BaseModel):
+    location_id: int
+    path: str
+    quantity: int
+
+class ItemLocationsResponse(BaseModel):
+    item_id: int
+    quantity: int
+    unassigned: int
+    warehouses: list[ItemWarehouseStock]
+    locations: list[ItemLocationStock]
+
+class BackupResponse(BaseModel):
+    name: str
+    file: str
+    created_at: datetime
+    compression: Literal["gzip", "none"]
+    size: int
+    stored_size: int
+    sha256: str
+    page_size: int
+    pages: int
+    items_version: Optional[int] = None
+    steps: int
+    restarts: int
+    copy_seconds: float
+    compress_seconds: float
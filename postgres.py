@@ -0,0 +1,320 @@
+"""
+PostgreSQL versions of the schema objects database.py creates for SQLite,
+plus COPY-based bulk loading and trigram search.
+
+database.py and crud.py switch to these when the engine's dialect is
+postgresql. The triggers become PL/pgSQL functions, FTS5 becomes a pg_trgm
+GIN index, and executemany inserts become COPY. Requires PostgreSQL 14+
+(CREATE OR REPLACE TRIGGER) and the psycopg 3 driver.
+"""
+
+from typing import List, Optional
+
+from sqlalchemy import and_, case, literal_column, text
+from sqlalchemy.util import await_only
+
+from database import ALLOCATED_STOCK_ERROR, MOVEMENT_KINDS
+
+# Current time in the naive-UTC form DateTime columns hold. clock_timestamp()
+# rather than now(), which is fixed at the start of the transaction.
+SQL_NOW = "timezone('utc', clock_timestamp())"
+
+# Session-level advisory lock key held while one process runs create_tables
+SETUP_LOCK_KEY = 0x7475617269  # "tuari"
+
+CATEGORY_SUMMARY_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION category_summary_apply() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE category_summary SET
+                item_count = item_count - 1,
+                total_quantity = total_quantity - coalesce(old.quantity, 0),
+                total_value = total_value - coalesce(old.quantity * old.price, 0)
+            WHERE category = old.category;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO category_summary AS s (category, item_count, total_quantity, total_value)
+            VALUES (new.category, 1, coalesce(new.quantity, 0), coalesce(new.quantity * new.price, 0))
+            ON CONFLICT (category) DO UPDATE SET
+                item_count = s.item_count + 1,
+                total_quantity = s.total_quantity + excluded.total_quantity,
+                total_value = s.total_value + excluded.total_value;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            DELETE FROM category_summary WHERE category = old.category AND item_count <= 0;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER category_summary_aiud
+    AFTER INSERT OR DELETE OR UPDATE OF category, quantity, price ON items
+    FOR EACH ROW EXECUTE FUNCTION category_summary_apply()
+    """,
+]
+
+# One bump per statement rather than per row: a bulk insert moves the
+# version once, which is all the ETags and the change feed need
+TABLE_VERSION_DDL = [
+    """
+    INSERT INTO table_versions(name, version)
+    VALUES ('items', floor(random() * 1000000000000)::bigint)
+    ON CONFLICT (name) DO NOTHING
+    """,
+    """
+    CREATE OR REPLACE FUNCTION table_versions_bump() RETURNS trigger AS $$
+    BEGIN
+        UPDATE table_versions SET version = version + 1 WHERE name = TG_TABLE_NAME;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER table_versions_items
+    AFTER INSERT OR UPDATE OR DELETE ON items
+    FOR EACH STATEMENT EXECUTE FUNCTION table_versions_bump()
+    """,
+]
+
+STOCK_LEDGER_DDL = [
+    f"""
+    CREATE OR REPLACE FUNCTION stock_ledger_apply() RETURNS trigger AS $$
+    DECLARE
+        moved_item integer;
+        moved integer;
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            moved_item := new.id;
+            moved := coalesce(new.quantity, 0);
+        ELSIF TG_OP = 'DELETE' THEN
+            moved_item := old.id;
+            moved := -coalesce(old.quantity, 0);
+        ELSIF new.last_movement_id IS DISTINCT FROM old.last_movement_id THEN
+            -- Recorded by ItemCRUD.record_movements already
+            RETURN NULL;
+        ELSE
+            moved_item := new.id;
+            moved := coalesce(new.quantity, 0) - coalesce(old.quantity, 0);
+        END IF;
+        IF moved != 0 THEN
+            INSERT INTO stock_movements(item_id, kind, delta, created_at)
+            VALUES (moved_item, {MOVEMENT_KINDS["direct"]}, moved, {SQL_NOW});
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER stock_ledger_aiud
+    AFTER INSERT OR DELETE OR UPDATE OF quantity ON items
+    FOR EACH ROW EXECUTE FUNCTION stock_ledger_apply()
+    """,
+]
+
+LOCATION_STOCK_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION location_stock_apply() RETURNS trigger AS $$
+    DECLARE
+        moved_location integer;
+        moved_item integer;
+        moved integer;
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            moved_location := new.location_id;
+            moved_item := new.item_id;
+            moved := new.quantity;
+        ELSIF TG_OP = 'DELETE' THEN
+            moved_location := old.location_id;
+            moved_item := old.item_id;
+            moved := -old.quantity;
+        ELSE
+            moved_location := new.location_id;
+            moved_item := new.item_id;
+            moved := new.quantity - old.quantity;
+        END IF;
+        IF moved = 0 THEN
+            RETURN NULL;
+        END IF;
+        INSERT INTO warehouse_stock AS s (warehouse_id, item_id, quantity)
+        SELECT warehouse_id, moved_item, moved FROM locations WHERE id = moved_location
+        ON CONFLICT (warehouse_id, item_id) DO UPDATE SET quantity = s.quantity + excluded.quantity;
+        DELETE FROM warehouse_stock
+        WHERE warehouse_id = (SELECT warehouse_id FROM locations WHERE id = moved_location)
+          AND item_id = moved_item AND quantity <= 0;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER location_stock_aiud
+    AFTER INSERT OR DELETE OR UPDATE OF quantity ON location_stock
+    FOR EACH ROW EXECUTE FUNCTION location_stock_apply()
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION items_check_allocated() RETURNS trigger AS $$
+    BEGIN
+        IF new.quantity < (SELECT coalesce(sum(quantity), 0) FROM location_stock WHERE item_id = new.id) THEN
+            RAISE EXCEPTION '{ALLOCATED_STOCK_ERROR}' USING ERRCODE = 'check_violation';
+        END IF;
+        RETURN new;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER items_allocated_bu
+    BEFORE UPDATE OF quantity ON items
+    FOR EACH ROW WHEN (new.quantity < old.quantity) EXECUTE FUNCTION items_check_allocated()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION warehouse_summary_apply() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO warehouse_summary AS s (warehouse_id, item_count, total_quantity)
+            VALUES (new.warehouse_id, 1, new.quantity)
+            ON CONFLICT (warehouse_id) DO UPDATE SET
+                item_count = s.item_count + 1,
+                total_quantity = s.total_quantity + excluded.total_quantity;
+        ELSIF TG_OP = 'DELETE' THEN
+            UPDATE warehouse_summary SET
+                item_count = item_count - 1,
+                total_quantity = total_quantity - old.quantity
+            WHERE warehouse_id = old.warehouse_id;
+        ELSE
+            UPDATE warehouse_summary SET total_quantity = total_quantity + new.quantity - old.quantity
+            WHERE warehouse_id = new.warehouse_id;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER warehouse_summary_aiud
+    AFTER INSERT OR DELETE OR UPDATE OF quantity ON warehouse_stock
+    FOR EACH ROW EXECUTE FUNCTION warehouse_summary_apply()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION location_stock_remove_item() RETURNS trigger AS $$
+    BEGIN
+        DELETE FROM location_stock WHERE item_id = old.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER location_stock_items_ad
+    AFTER DELETE ON items
+    FOR EACH ROW EXECUTE FUNCTION location_stock_remove_item()
+    """,
+]
+
+# database.STOCK_SNAPSHOT_SQL without SQLite's +item_id planner hint, which
+# PostgreSQL would treat as a different grouping expression
+STOCK_SNAPSHOT_SQL = """
+    INSERT INTO stock_snapshots(movement_id, item_id, taken_at, quantity)
+    SELECT max(m.id), m.item_id, max(m.created_at),
+           sum(m.delta) + coalesce((
+               SELECT s.quantity FROM stock_snapshots s
+               WHERE s.item_id = m.item_id
+               ORDER BY s.taken_at DESC, s.movement_id DESC LIMIT 1
+           ), 0)
+    FROM stock_movements m
+    WHERE m.id > :since
+    GROUP BY m.item_id
+"""
+
+# The text search_items matches against. Queries must repeat this exact
+# expression for the planner to use the index built on it.
+SEARCH_DOCUMENT = "(name || ' ' || coalesce(sku, '') || ' ' || coalesce(description, ''))"
+
+SEARCH_INDEX = "idx_items_search"
+
+# A trigram index answers ILIKE '%word%' for every word at once, and is kept
+# current by PostgreSQL itself, so unlike FTS5 it needs no triggers
+SEARCH_INDEX_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS {SEARCH_INDEX} ON items USING gin ({SEARCH_DOCUMENT} gin_trgm_ops)",
+]
+
+# Rank weights for a word found in (name, sku, description), as in crud.SEARCH_WEIGHTS
+SEARCH_WEIGHTS = (10, 5, 1)
+
+def schema_object_exists(conn, kind: str, name: str) -> bool:
+    """Whether a trigger, or a table or index (any other kind), exists"""
+    if kind == "trigger":
+        query = "SELECT 1 FROM pg_trigger WHERE tgname = :name AND NOT tgisinternal"
+    else:
+        query = "SELECT 1 WHERE to_regclass(:name) IS NOT NULL"
+    return conn.execute(text(query), {"name": name}).first() is not None
+
+def _contains_pattern(token: str) -> str:
+    return "%" + token.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def search_filter(tokens: List[str]):
+    """Every token must appear somewhere in the search document, case-insensitively"""
+    document = literal_column(SEARCH_DOCUMENT)
+    return and_(*(document.ilike(_contains_pattern(token), escape="\\") for token in tokens))
+
+def search_rank(tokens: List[str]):
+    """Relevance of a row to the search, higher first.
+
+    Each token scores by the columns it was found in. Rows reaching this
+    already matched search_filter, so the per-column LIKEs only run on the
+    matches, which is far cheaper than pg_trgm's similarity functions.
+    """
+    return sum(
+        case((literal_column(column).ilike(_contains_pattern(token), escape="\\"), weight), else_=0)
+        for token in tokens
+        for weight, column in zip(SEARCH_WEIGHTS, ("name", "sku", "description"))
+    )
+
+def _column_defaults(table) -> dict:
+    """Values for columns whose Python-side default COPY would otherwise skip"""
+    defaults = {}
+    for column in table.columns:
+        default = column.default
+        if default is None or column.primary_key or not (default.is_scalar or default.is_callable):
+            continue
+        defaults[column.key] = default.arg(None) if default.is_callable else default.arg
+    return defaults
+
+async def _copy_async(connection, statement: str, records: list):
+    async with connection.cursor() as cursor:
+        async with cursor.copy(statement) as copy:
+            for record in records:
+                await copy.write_row(record)
+
+def copy_rows(db, table, rows: List[dict], returning_ids: bool = True) -> Optional[List[int]]:
+    """Insert rows with COPY in the Session's transaction, returning their new ids in order.
+
+    COPY can't return generated keys, so the ids are drawn from the table's
+    sequence up front and written with the rows. Insert triggers fire as
+    they would for INSERT. Works on a sync Session and under AsyncSession.run_sync.
+    """
+    if not rows:
+        return [] if returning_ids else None
+    defaults = _column_defaults(table)
+    columns = sorted(set(defaults) | {key for row in rows for key in row})
+    records = [[row.get(column, defaults.get(column)) for column in columns] for row in rows]
+    ids = None
+    if returning_ids:
+        ids = db.execute(
+            text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+            {"table": table.name, "count": len(rows)}
+        ).scalars().all()
+        columns.insert(0, "id")
+        for record, new_id in zip(records, ids):
+            record.insert(0, new_id)
+
+    statement = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN"
+    driver = db.connection().connection.driver_connection
+    if hasattr(driver, "__aenter__"):
+        # psycopg's AsyncConnection, reached through run_sync's greenlet
+        await_only(_copy_async(driver, statement, records))
+    else:
+        with driver.cursor() as cursor:
+            with cursor.copy(statement) as copy:
+                for record in records:
+                    copy.write_row(record)
+    return ids
@@ -0,0 +1,485 @@
+"""
+In-memory read replica of the items table.
+
+With READ_REPLICA on, each worker loads the catalog into memory at startup
+and answers the item GET routes from it: lookups by id and SKU are dict
+hits, category and low-stock pages are bisections of sorted key lists, and
+search scores the same prefix matches with the same bm25 as the FTS5 index.
+The database stays the source of truth and serves everything else.
+
+ItemCRUD's write paths apply each committed change here as well, tagged
+with the items versions their transaction saw, so the replica knows the
+exact version it reflects. Writes from other processes (other workers,
+scripts) show up as the database version running ahead; the replica then
+stops serving and reloads. SQLite only: PostgreSQL search ranks differently.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from database import DATABASE_BACKEND, LOW_STOCK_THRESHOLD, Item, TableVersion, async_read_engine, has_search_index_async
+from metrics import METRICS, Gauge
+from serialization import batch_get_payload, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+# Serve item reads from memory (each worker holds a full copy of the catalog)
+READ_REPLICA = os.getenv("READ_REPLICA", "off").lower() in ("1", "true", "on", "yes")
+
+# Seconds between checks for writes made by other processes
+READ_REPLICA_POLL_INTERVAL = float(os.getenv("READ_REPLICA_POLL_INTERVAL", 1))
+
+# Rows read per batch while loading; the event loop runs between batches
+LOAD_BATCH_SIZE = 1000
+
+# A version still behind after this many seconds was written elsewhere
+# (this process applies its own writes right after they commit)
+CATCH_UP_GRACE = 0.1
+
+# One row per item, with ItemResponse's fields in crud.ITEM_COLUMNS order
+ItemRow = namedtuple("ItemRow", [
+    "name", "category", "description", "quantity", "price",
+    "sku", "location", "id", "created_at", "updated_at"
+])
+
+LOAD_COLUMNS = tuple(getattr(Item, field) for field in ItemRow._fields)
+
+# items_fts's columns (database.SEARCH_INDEX_DDL) and the bm25 weights
+# crud.SEARCH_WEIGHTS gives them. Whole numbers, so weighted counts stay
+# small cached ints and sum exactly as FTS5's doubles do.
+SEARCH_COLUMNS = ("name", "sku", "description")
+SEARCH_WEIGHTS = (10, 5, 1)
+
+# FTS5's bm25 constants
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+def fts_tokens(text: Optional[str]) -> List[str]:
+    """Tokens as FTS5's unicode61 tokenizer with remove_diacritics 2 produces them"""
+    if not text:
+        return []
+    text = text.lower()
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFD", text) if not unicodedata.combining(c))
+    return _TOKEN.findall(text)
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _page(keys, stop: int, size: int, rows, page: int, per_page: int, cursor: Optional[str],
+          include_total: bool, key_types: tuple) -> Optional[dict]:
+    """crud._paginate over keys[:stop], sorted; None if the cursor needs SQL to compare"""
+    if cursor:
+        last_key = decode_cursor(cursor, size)
+        if not all(check(value) for check, value in zip(key_types, last_key)):
+            return None
+        start = bisect_right(keys, last_key[0] if size == 1 else tuple(last_key), 0, stop)
+    else:
+        start = min((page - 1) * per_page, stop)
+    chunk = keys[start:min(start + per_page + 1, stop)]
+    next_cursor = None
+    if len(chunk) > per_page:
+        chunk = chunk[:per_page]
+        next_cursor = encode_cursor([chunk[-1]] if size == 1 else list(chunk[-1]))
+    total = stop if include_total else None
+    return {
+        "items": rows(chunk),
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "total_pages": (total + per_page - 1) // per_page if total is not None else None,
+        "next_cursor": next_cursor
+    }
+
+class _Catalog:
+    """The rows and their indexes. Built whole on load, then kept current row by row."""
+
+    def __init__(self, searchable: bool):
+        self.searchable = searchable
+        self.items: Dict[int, ItemRow] = {}
+        self.skus: Dict[str, int] = {}
+        self.ids = array("q")
+        # (name, id) per category and (quantity, id) at or below LOW_STOCK_THRESHOLD
+        self.categories: Dict[str, list] = {}
+        self.low_stock: list = []
+        # Token -> {id: bm25-weighted count of it in the row}, and the tokens
+        # in sorted order, where the tokens sharing a prefix form a range
+        self.words: Dict[str, Dict[int, int]] = {}
+        self.vocabulary: List[str] = []
+        self.token_counts: Dict[int, int] = {}
+        self.total_tokens = 0
+
+    def load(self, rows: Iterable[ItemRow]):
+        """Add rows in id order without keeping the key lists sorted (see finish())"""
+        for row in rows:
+            self.items[row.id] = row
+            self.ids.append(row.id)
+            self._index(row, sort=False)
+
+    def finish(self):
+        self.vocabulary = sorted(self.words)
+        for keys in self.categories.values():
+            keys.sort()
+        self.low_stock.sort()
+
+    def add(self, row: ItemRow):
+        self.items[row.id] = row
+        if not self.ids or row.id > self.ids[-1]:
+            self.ids.append(row.id)
+        else:
+            self.ids.insert(bisect_left(self.ids, row.id), row.id)
+        self._index(row, sort=True)
+
+    def remove(self, item_id: int):
+        row = self.items.pop(item_id, None)
+        if row is None:
+            return
+        del self.ids[bisect_left(self.ids, item_id)]
+        if self.skus.get(row.sku) == item_id:
+            del self.skus[row.sku]
+        keys = self.categories[row.category]
+        del keys[bisect_left(keys, (row.name, item_id))]
+        if not keys:
+            del self.categories[row.category]
+        if row.quantity is not None and row.quantity <= LOW_STOCK_THRESHOLD:
+            del self.low_stock[bisect_left(self.low_stock, (row.quantity, item_id))]
+        if self.searchable:
+            for token in {token for _, token in self._tokens(row)}:
+                postings = self.words[token]
+                del postings[item_id]
+                if not postings:
+                    del self.words[token]
+                    del self.vocabulary[bisect_left(self.vocabulary, token)]
+            self.total_tokens -= self.token_counts.pop(item_id)
+
+    def _index(self, row: ItemRow, sort: bool):
+        add = insort if sort else list.append
+        if row.sku is not None:
+            self.skus[row.sku] = row.id
+        keys = self.categories.get(row.category)
+        if keys is None:
+            keys = self.categories[row.category] = []
+        add(keys, (row.name, row.id))
+        if row.quantity is not None and row.quantity <= LOW_STOCK_THRESHOLD:
+            add(self.low_stock, (row.quantity, row.id))
+        if self.searchable:
+            count = 0
+            for weight, token in self._tokens(row):
+                count += 1
+                postings = self.words.get(token)
+                if postings is None:
+                    postings = self.words[token] = {}
+                    if sort:
+                        insort(self.vocabulary, token)
+                postings[row.id] = postings.get(row.id, 0) + weight
+            self.token_counts[row.id] = count
+            self.total_tokens += count
+
+    @staticmethod
+    def _tokens(row: ItemRow):
+        for weight, column in zip(SEARCH_WEIGHTS, SEARCH_COLUMNS):
+            for token in fts_tokens(getattr(row, column)):
+                yield weight, token
+
+    def _matches(self, token: str) -> Dict[int, int]:
+        """{id: weighted count} of rows with a token starting with token"""
+        vocabulary = self.vocabulary
+        start = bisect_left(vocabulary, token)
+        stop = bisect_left(vocabulary, token[:-1] + chr(ord(token[-1]) + 1), start)
+        if stop - start == 1:
+            return self.words[vocabulary[start]]
+        matches: Dict[int, int] = {}
+        for word in vocabulary[start:stop]:
+            for item_id, count in self.words[word].items():
+                matches[item_id] = matches.get(item_id, 0) + count
+        return matches
+
+    def search(self, tokens: List[str], page: int, per_page: int) -> dict:
+        """Rows with every token as a prefix, ordered like bm25(items_fts, SEARCH_WEIGHTS)"""
+        matches = sorted((self._matches(token) for token in tokens), key=len)
+        found = set(matches[0]).intersection(*matches[1:])
+        total = len(found)
+        rows = len(self.items)
+        ranked = []
+        if found:
+            # FTS5's bm25(), operation for operation so scores (and ties) agree
+            average = self.total_tokens / rows
+            idfs = []
+            for match in matches:
+                idf = math.log((rows - len(match) + 0.5) / (len(match) + 0.5))
+                idfs.append(idf if idf > 0 else 1e-6)
+            for item_id in found:
+                length = self.token_counts[item_id]
+                score = 0.0
+                for idf, match in zip(idfs, matches):
+                    count = match[item_id]
+                    score += idf * ((count * (BM25_K1 + 1.0)) /
+                                    (count + BM25_K1 * (1 - BM25_B + BM25_B * length / average)))
+                ranked.append((-1.0 * score, item_id))
+            ranked.sort()
+        offset = (page - 1) * per_page
+        return {
+            "items": [self.items[item_id] for _, item_id in ranked[offset:offset + per_page]],
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "total_pages": (total + per_page - 1) // per_page
+        }
+
+class CatalogReplica:
+    """The catalog replica, shared by every request in the process.
+
+    Query methods mirror ItemCRUD's and return None whenever the replica
+    can't answer exactly as SQL would (not loaded yet, stale, or a query it
+    doesn't cover); callers then fall back to the database.
+    """
+
+    def __init__(self):
+        self.catalog: Optional[_Catalog] = None
+        self.active = False
+        self.ready = False
+        self.loading = False
+        self.lock = threading.Lock()
+        # Items version the replica reflects; writes that committed out of
+        # order wait in pending (before -> after) until the gap closes
+        self.version: Optional[int] = None
+        self.pending: Dict[int, int] = {}
+        # Versions of rows changed since the load, so an older write applied
+        # late can't overwrite a newer one (deleted rows stay as tombstones)
+        self.row_versions: Dict[int, int] = {}
+        self.backlog: list = []
+        self.loads = 0
+
+    # Keeping current
+
+    def apply(self, rows: Iterable[dict] = (), deleted: Iterable[int] = (),
+              versions: Optional[Tuple[int, int]] = None):
+        """Apply a committed write: rows are the new state of changed items (dicts of ItemRow fields).
+
+        versions is the items version at the start and end of the write's
+        transaction, as published on the change feed.
+        """
+        if not self.active:
+            return
+        with self.lock:
+            if not self.ready and not self.loading:
+                # A reload is due, and will read this write from the database
+                return
+            if self.loading:
+                self.backlog.append((rows, deleted, versions))
+                return
+            try:
+                self._apply(rows, deleted, versions)
+            except Exception as e:
+                logger.error(f"Read replica update failed, reloading: {e}")
+                self.ready = False
+
+    def _apply(self, rows, deleted, versions):
+        if versions is None or None in versions:
+            self.ready = False
+            return
+        before, after = versions
+        if after <= self.version:
+            return
+        catalog = self.catalog
+        for row in rows:
+            row = ItemRow(**row)
+            if self.row_versions.get(row.id, self.version) < after:
+                catalog.remove(row.id)
+                catalog.add(row)
+                self.row_versions[row.id] = after
+        for item_id in deleted:
+            if self.row_versions.get(item_id, self.version) < after:
+                catalog.remove(item_id)
+                self.row_versions[item_id] = after
+        self.pending[before] = after
+        while self.version in self.pending:
+            self.version = self.pending.pop(self.version)
+        if len(self.row_versions) > len(self.pending) + 10000:
+            self.row_versions = {key: value for key, value in self.row_versions.items() if value > self.version}
+
+    async def load(self):
+        """Read the whole catalog from the database and start serving from it"""
+        with self.lock:
+            self.active = True
+            self.loading = True
+            self.backlog = []
+        start = time.perf_counter()
+        try:
+            catalog = _Catalog(DATABASE_BACKEND == "sqlite" and await has_search_index_async())
+            async with async_read_engine.connect() as conn:
+                # Read first: rows read afterwards are at least this current,
+                # and writes committed since are replayed from the backlog
+                version = (await conn.execute(
+                    select(TableVersion.version).where(TableVersion.name == "items")
+                )).scalar()
+                result = await conn.stream(select(*LOAD_COLUMNS).order_by(Item.id))
+                async for partition in result.partitions(LOAD_BATCH_SIZE):
+                    catalog.load(ItemRow(*row) for row in partition)
+                    await asyncio.sleep(0)
+            catalog.finish()
+        except BaseException:
+            with self.lock:
+                self.loading = False
+                self.backlog = []
+            raise
+        if version is None:
+            logger.warning("Items table has no version counter; serving reads from the database")
+            self.close()
+            return
+        with self.lock:
+            self.catalog = catalog
+            self.version = version
+            self.pending = {}
+            self.row_versions = {}
+            self.loading = False
+            self.ready = True
+            for write in self.backlog:
+                self._apply(*write)
+            self.backlog = []
+            self.loads += 1
+        logger.info(f"Read replica loaded {len(catalog.items)} items at version {version} "
+                    f"in {time.perf_counter() - start:.2f}s")
+
+    async def watch(self, interval: float = READ_REPLICA_POLL_INTERVAL):
+        """Load the replica, then reload whenever another process writes. Runs until cancelled."""
+        if DATABASE_BACKEND != "sqlite":
+            logger.warning("READ_REPLICA is only supported on SQLite; serving reads from the database")
+            return
+        while True:
+            try:
+                if not self.ready:
+                    await self.load()
+                    if not self.active:
+                        return
+                elif await self._behind():
+                    await asyncio.sleep(CATCH_UP_GRACE)
+                    if await self._behind():
+                        logger.info("Items changed outside this process, reloading the read replica")
+                        self.ready = False
+                        continue
+            except Exception as e:
+                logger.warning(f"Read replica refresh failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def _behind(self) -> bool:
+        async with async_read_engine.connect() as conn:
+            version = (await conn.execute(
+                select(TableVersion.version).where(TableVersion.name == "items")
+            )).scalar()
+        return version is not None and version > self.version
+
+    def close(self):
+        """Stop serving and free the catalog"""
+        with self.lock:
+            self.active = False
+            self.ready = False
+            self.catalog = None
+
+    # Queries (all return None when the database has to answer)
+
+    def _rows(self, ids) -> List[ItemRow]:
+        items = self.catalog.items
+        return [items[item_id] for item_id in ids]
+
+    def _key_rows(self, keys) -> List[ItemRow]:
+        items = self.catalog.items
+        return [items[key[-1]] for key in keys]
+
+    # Lookups return None for a missing item; check ready before calling them
+
+    def get_one(self, item_id: int) -> Optional[ItemRow]:
+        return self.catalog.items.get(item_id)
+
+    def get_by_sku(self, sku: str) -> Optional[ItemRow]:
+        item_id = self.catalog.skus.get(sku)
+        return self.catalog.items.get(item_id) if item_id is not None else None
+
+    def get_many(self, ids: List[int], skus: List[str]) -> Optional[dict]:
+        if not self.ready:
+            return None
+        with self.lock:
+            items, by_sku = self.catalog.items, self.catalog.skus
+            
+            def find_id(item_id):
+                row = items.get(item_id)
+                return row._asdict() if row is not None else None
+            
+            return batch_get_payload(ids, skus, find_id, lambda sku: find_id(by_sku.get(sku)))
+    
+    def get_all_paginated(self, page: int = 1, per_page: int = 50,
+                          cursor: Optional[str] = None, include_total: bool = True) -> Optional[dict]:
+        if not self.ready:
+            return None
+        with self.lock:
+            ids = self.catalog.ids
+            return _page(ids, len(ids), 1, self._rows, page, per_page, cursor, include_total, (_is_int,))
+
+    def get_category(self, category: str, page: int = 1, per_page: int = 50,
+                     cursor: Optional[str] = None, include_total: bool = True) -> Optional[dict]:
+        if not self.ready:
+            return None
+        with self.lock:
+            keys = self.catalog.categories.get(category, [])
+            return _page(keys, len(keys), 2, self._key_rows, page, per_page, cursor, include_total,
+                         (lambda value: isinstance(value, str), _is_int))
+
+    def get_low_stock(self, threshold: int = LOW_STOCK_THRESHOLD, page: int = 1, per_page: int = 50,
+                      cursor: Optional[str] = None, include_total: bool = True) -> Optional[dict]:
+        if not self.ready or threshold > LOW_STOCK_THRESHOLD:
+            return None
+        with self.lock:
+            low_stock = self.catalog.low_stock
+            stop = bisect_right(low_stock, (threshold, math.inf))
+            return _page(low_stock, stop, 2, self._key_rows, page, per_page, cursor, include_total,
+                         (_is_int, _is_int))
+
+    def count_low_stock(self, threshold: int = LOW_STOCK_THRESHOLD) -> Optional[int]:
+        if not self.ready or threshold > LOW_STOCK_THRESHOLD:
+            return None
+        with self.lock:
+            return bisect_right(self.catalog.low_stock, (threshold, math.inf))
+
+    def search_items(self, search_term: str, page: int = 1, per_page: int = 50) -> Optional[dict]:
+        """crud.ItemCRUD.search_items for terms the FTS5 path would handle"""
+        if not self.ready or not self.catalog.searchable:
+            return None
+        tokens = []
+        for word in re.findall(r"\w+", search_term):
+            folded = fts_tokens(word)
+            # Words FTS5 would split into a phrase are left to SQL
+            if len(folded) != 1:
+                return None
+            tokens.append(folded[0])
+        if not tokens:
+            return None
+        with self.lock:
+            return self.catalog.search(tokens, page, per_page)
+
+def _replica_status():
+    replica = catalog_replica
+    yield ("ready",), int(replica.ready)
+    yield ("loads",), replica.loads
+    if replica.catalog is not None:
+        yield ("items",), len(replica.catalog.items)
+
+catalog_replica = CatalogReplica()
+
+METRICS.append(Gauge(
+    "inventory_read_replica", "Read replica state: ready (0/1), loads so far, items held", ("stat",),
+    _replica_status
+))
@@ -9,9 +9,10 @@ from pathlib import Path
 # Add current directory to path for imports
 sys.path.append(str(Path(__file__).parent))
 
-from database import SessionLocal, Item
-from models import ItemCreate
-from datetime import datetime
+from sqlalchemy import func
+
+from bulk import import_items
+from database import SessionLocal, Item, setup_database
 
 def create_sample_data():
     """Create sample inventory data"""
@@ -167,33 +168,25 @@ def create_sample_data():
         
         print("📦 Adding sample inventory data...")
         
-        for item_data in sample_items:
-            # Check if SKU already exists
-            existing_item = db.query(Item).filter(Item.sku == item_data["sku"]).first()
-            if existing_item:
-                print(f"⚠️  SKU {item_data['sku']} already exists, skipping...")
-                continue
-            
-            # Create item
-            item = Item(**item_data)
-            db.add(item)
-            print(f"✅ Added: {item_data['name']} ({item_data['sku']})")
+        # Same validated, batched path as POST /api/items/bulk
+        summary = import_items(db, sample_items)
+        for result in summary["results"]:
+            if result["status"] == "created":
+                print(f"✅ Added: {result['sku']}")
+            else:
+                print(f"⚠️  {result['error']}, skipping...")
         
-        db.commit()
-        print(f"🎉 Successfully added {len(sample_items)} sample items to inventory!")
+        print(f"🎉 Successfully added {summary['created']} sample items to inventory!")
         
         # Show summary
         total_items = db.query(Item).count()
-        total_value = db.query(Item).with_entities(
-            db.func.sum(Item.quantity * Item.price)
-        ).scalar() or 0
+        total_value = db.query(func.sum(Item.quantity * Item.price)).scalar() or 0
         
         print("\n📊 Inventory Summary:")
         print(f"   Total Items: {total_items}")
         print(f"   Total Value: ${total_value:,.2f}")
         
         # Show categories
-        from sqlalchemy import func
         categories = db.query(
             Item.category,
             func.count(Item.id).label('count'),
@@ -218,6 +211,7 @@ def main():
     print("=" * 50)
     
     try:
+        setup_database()
         create_sample_data()
     except Exception as e:
         print(f"❌ Failed to create sample data: {e}")
@@ -0,0 +1,84 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Callable, Iterable, List, Optional
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content) -> bytes:
+    """Encode plain Python data (dicts, lists, datetimes) straight to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode()
+
+class FastJSONResponse(Response):
+    """JSON response encoded without Pydantic.
+    
+    Routes return this for already-shaped data. FastAPI skips response_model
+    validation for Response instances, so each row is serialized once while
+    the OpenAPI schema still comes from the route's response_model.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+def rows_to_dicts(rows: Iterable) -> list:
+    """Turn column-projected result rows into dicts keyed by column name"""
+    return [row._asdict() for row in rows]
+
+def batch_get_payload(ids: List[int], skus: List[str],
+                      find_id: Callable[[int], Optional[dict]], find_sku: Callable[[str], Optional[dict]]) -> dict:
+    """Shape a batch lookup like ItemBatchGetResponse: one result per key, ids then SKUs, in request order"""
+    results = []
+    for key, find, field in [(key, find_id, "id") for key in ids] + [(key, find_sku, "sku") for key in skus]:
+        item = find(key)
+        if item is None:
+            results.append({"id": None, "sku": None, field: key, "status": "not_found", "item": None})
+        else:
+            results.append({"id": item["id"], "sku": item["sku"], "status": "found", "item": item})
+    found = sum(result["item"] is not None for result in results)
+    return {"total": len(results), "found": found, "not_found": len(results) - found, "results": results}
+
+def item_list_payload(result: dict) -> dict:
+    """Shape a paginated crud result like ItemListResponse"""
+    return {
+        "items": rows_to_dicts(result["items"]),
+        "total": result["total"],
+        "page": result["page"],
+        "per_page": result["per_page"],
+        "total_pages": result["total_pages"],
+        "next_cursor": result.get("next_cursor"),
+    }
+
+def encode_cursor(values: list) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    raw = json.dumps(values, default=_default, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decode a cursor from encode_cursor, raising ValueError if it is malformed.
+    
+    Only the shape is checked here (a list of size scalars); callers check
+    each value against the column it seeks on.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    if any(isinstance(value, (list, dict)) for value in values):
+        raise ValueError("Invalid cursor")
+    return values
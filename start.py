@@ -3,12 +3,23 @@
 Tuari Inventory Management System - Startup Script
 """
 
+import argparse
+import multiprocessing
 import os
+import signal
 import sys
 import subprocess
 import time
 from pathlib import Path
 
+# Restart delay after a worker's first crash, doubled for each crash in a row
+WORKER_RESTART_DELAY = 0.5
+WORKER_MAX_RESTART_DELAY = 30
+# A worker that ran this long before exiting starts a fresh run of crashes
+WORKER_STABLE_SECONDS = 60
+# Crashes in a row after which the server gives up instead of restarting
+WORKER_MAX_FAST_FAILURES = 8
+
 def check_python_version():
     """Check if Python version is compatible"""
     if sys.version_info < (3, 8):
@@ -31,8 +42,10 @@ def initialize_database():
     """Initialize the database"""
     print("🗄️  Initializing database...")
     try:
-        from database import create_tables
-        create_tables()
+        from database import engine, setup_database
+        setup_database()
+        # Workers open their own connections
+        engine.dispose()
         print("✅ Database initialized successfully")
     except Exception as e:
         print(f"❌ Error initializing database: {e}")
@@ -40,19 +53,23 @@ def initialize_database():
 
 def check_database():
     """Check if database exists and is accessible"""
-    db_path = Path("data/inventory.db")
-    if db_path.exists():
+    from database import database_file
+    db_path = database_file()
+    if db_path is None:
+        print("✅ Using a non-SQLite database")
+        return True
+    if Path(db_path).exists():
         print(f"✅ Database found: {db_path}")
         return True
     else:
         print("⚠️  Database not found, will be created on startup")
         return False
 
-def start_server():
-    """Start the FastAPI server"""
+def start_server(host: str = "0.0.0.0", port: int = 8000):
+    """Start the FastAPI server with auto-reload for development"""
     print("🚀 Starting Tuari Inventory Server...")
-    print("📍 Server will be available at: http://localhost:8000")
-    print("📚 API documentation at: http://localhost:8000/docs")
+    print(f"📍 Server will be available at: http://localhost:{port}")
+    print(f"📚 API documentation at: http://localhost:{port}/docs")
     print("🔄 Press Ctrl+C to stop the server")
     print("-" * 50)
     
@@ -60,8 +77,8 @@ def start_server():
         import uvicorn
         uvicorn.run(
             "main:app",
-            host="0.0.0.0",
-            port=8000,
+            host=host,
+            port=port,
             reload=True,
             log_level="info"
         )
@@ -71,8 +88,120 @@ def start_server():
         print(f"❌ Error starting server: {e}")
         sys.exit(1)
 
+def available_cpus() -> list:
+    """CPUs this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def serve_worker(config, sockets, cpu=None):
+    """Entry point of one worker process: pin it to a CPU and serve on the shared socket"""
+    import uvicorn
+
+    if cpu is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {cpu})
+    config.configure_logging()
+    uvicorn.Server(config).run(sockets=sockets)
+
+def start_production_server(host: str = "0.0.0.0", port: int = 8000, workers: int = 1, pin: bool = True):
+    """Run several uvicorn workers on one listening socket and restart any that exit.
+    
+    The socket is bound here and inherited by every worker, so the kernel
+    spreads connections across them. Each worker runs main.py's lifespan,
+    and SQLite writes from all of them are serialized by the database lock.
+    A worker that keeps crashing is restarted with exponential backoff, and
+    the server stops after WORKER_MAX_FAST_FAILURES crashes in a row.
+    """
+    import uvicorn
+
+    cpus = available_cpus()
+    config = uvicorn.Config("main:app", host=host, port=port, log_level="info", access_log=False)
+    context = multiprocessing.get_context("spawn")
+    processes = [None] * workers
+    started = [0.0] * workers
+    failures = [0] * workers
+    restart_at = [None] * workers
+    stopping = False
+    gave_up = False
+
+    def spawn(index):
+        cpu = cpus[index % len(cpus)] if pin else None
+        process = context.Process(
+            target=serve_worker, args=(config, [sock], cpu), name=f"worker-{index}", daemon=True
+        )
+        process.start()
+        processes[index] = process
+        started[index] = time.monotonic()
+        pinned = f" on CPU {cpu}" if cpu is not None else ""
+        print(f"👷 Worker {index} started (PID {process.pid}){pinned}")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    print(f"🚀 Starting Tuari Inventory Server with {workers} worker(s)...")
+    print(f"📍 Server will be available at: http://localhost:{port}")
+    print("🔄 Press Ctrl+C to stop the server")
+    print("-" * 50)
+    sock = config.bind_socket()
+    for index in range(workers):
+        spawn(index)
+
+    try:
+        while not stopping:
+            time.sleep(0.5)
+            now = time.monotonic()
+            for index, process in enumerate(processes):
+                if stopping or process.is_alive():
+                    continue
+                if restart_at[index] is None:
+                    if now - started[index] >= WORKER_STABLE_SECONDS:
+                        failures[index] = 0
+                    failures[index] += 1
+                    if failures[index] > WORKER_MAX_FAST_FAILURES:
+                        print(f"❌ Worker {index} exited {failures[index]} times in a row, giving up")
+                        stopping = gave_up = True
+                        break
+                    delay = min(WORKER_RESTART_DELAY * 2 ** (failures[index] - 1), WORKER_MAX_RESTART_DELAY)
+                    print(f"⚠️  Worker {index} exited with code {process.exitcode}, restarting in {delay:g}s")
+                    restart_at[index] = now + delay
+                elif now >= restart_at[index]:
+                    restart_at[index] = None
+                    spawn(index)
+    finally:
+        print("\n🛑 Stopping workers...")
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join(10)
+            if process.is_alive():
+                process.kill()
+        sock.close()
+        print("🛑 Server stopped")
+    if gave_up:
+        sys.exit(1)
+
 def main():
     """Main startup function"""
+    parser = argparse.ArgumentParser(description="Start the Tuari Inventory server")
+    parser.add_argument("--production", action="store_true",
+                        help="Run several workers without auto-reload")
+    parser.add_argument("--workers", type=int,
+                        help="Worker processes in production mode (default: one per CPU)")
+    parser.add_argument("--host", default="0.0.0.0", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--skip-install", action="store_true", help="Don't install requirements.txt")
+    parser.add_argument("--no-pin", action="store_true", help="Don't pin workers to CPUs")
+    args = parser.parse_args()
+    if args.workers is not None and not args.production:
+        parser.error("--workers requires --production")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+
     print("=" * 50)
     print("🎯 Tuari Inventory Management System")
     print("=" * 50)
@@ -80,22 +209,28 @@ def main():
     # Check Python version
     check_python_version()
     
-    # Check if requirements.txt exists
-    if not Path("requirements.txt").exists():
-        print("❌ Error: requirements.txt not found")
-        sys.exit(1)
+    if not args.skip_install:
+        # Check if requirements.txt exists
+        if not Path("requirements.txt").exists():
+            print("❌ Error: requirements.txt not found")
+            sys.exit(1)
+        
+        # Install dependencies
+        install_dependencies()
     
-    # Install dependencies
-    install_dependencies()
+    # Check database status before setup creates it
+    check_database()
     
-    # Initialize database
+    # Initialize database once, before any worker starts
     initialize_database()
     
-    # Check database status
-    check_database()
-    
     # Start server
-    start_server()
+    if args.production:
+        start_production_server(
+            args.host, args.port, args.workers or len(available_cpus()), pin=not args.no_pin
+        )
+    else:
+        start_server(args.host, args.port)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
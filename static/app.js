@@ -2,6 +2,7 @@
 let currentPage = 1;
 let currentSearch = '';
 let currentCategory = '';
+let currentSort = '';
 let itemsPerPage = 50;
 let itemsToDelete = null;
 
@@ -30,23 +31,44 @@ function showNotification(message, type = 'success') {
     }, 3000);
 }
 
+// Last response and ETag per GET endpoint, for conditional requests
+const responseCache = new Map();
+
 // API functions
 async function apiCall(endpoint, options = {}) {
     try {
+        const method = (options.method || 'GET').toUpperCase();
+        const cached = method === 'GET' ? responseCache.get(endpoint) : null;
         const response = await fetch(`${API_BASE}${endpoint}`, {
+            ...options,
+            // Revalidate ourselves instead of relying on the browser cache
+            cache: 'no-store',
             headers: {
                 'Content-Type': 'application/json',
+                ...(cached ? { 'If-None-Match': cached.etag } : {}),
                 ...options.headers
-            },
-            ...options
+            }
         });
         
+        if (response.status === 304 && cached) {
+            return cached.data;
+        }
+        
         if (!response.ok) {
             const error = await response.json();
             throw new Error(error.detail || 'API request failed');
         }
         
-        return await response.json();
+        if (response.status === 204) {
+            return null;
+        }
+        
+        const data = await response.json();
+        const etag = response.headers.get('ETag');
+        if (method === 'GET' && etag) {
+            responseCache.set(endpoint, { etag, data });
+        }
+        return data;
     } catch (error) {
         console.error('API Error:', error);
         showNotification(error.message, 'error');
@@ -84,8 +106,8 @@ async function loadCategories() {
 
 async function loadLowStockCount() {
     try {
-        const lowStockItems = await apiCall('/items/low-stock?threshold=10');
-        document.getElementById('lowStockCount').textContent = lowStockItems.length;
+        const lowStock = await apiCall('/items/low-stock?threshold=10&count_only=true');
+        document.getElementById('lowStockCount').textContent = lowStock.count;
     } catch (error) {
         console.error('Error loading low stock count:', error);
     }
@@ -108,52 +130,57 @@ function displayItems(items) {
     }
     
     items.forEach(item => {
-        const row = document.createElement('tr');
-        row.className = 'hover:bg-gray-50 fade-in';
-        
-        const stockClass = item.quantity <= 10 ? 'text-red-600 font-semibold' : 'text-gray-900';
-        const stockIcon = item.quantity <= 10 ? '<i class="fas fa-exclamation-triangle text-red-500 mr-1"></i>' : '';
-        
-        row.innerHTML = `
-            <td class="px-6 py-4 whitespace-nowrap">
-                <div class="flex items-center">
-                    <div>
-                        <div class="text-sm font-medium text-gray-900">${item.name}</div>
-                        <div class="text-sm text-gray-500">${item.description || 'No description'}</div>
-                    </div>
-                </div>
-            </td>
-            <td class="px-6 py-4 whitespace-nowrap">
-                <span class="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium bg-blue-100 text-blue-800">
-                    ${item.category}
-                </span>
-            </td>
-            <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900 font-mono">
-                ${item.sku}
-            </td>
-            <td class="px-6 py-4 whitespace-nowrap">
-                <span class="${stockClass}">${stockIcon}${item.quantity}</span>
-            </td>
-            <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900">
-                $${parseFloat(item.price).toFixed(2)}
-            </td>
-            <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
-                ${item.location || 'N/A'}
-            </td>
-            <td class="px-6 py-4 whitespace-nowrap text-sm font-medium">
-                <button onclick="editItem(${item.id})" class="text-blue-600 hover:text-blue-900 mr-3">
-                    <i class="fas fa-edit"></i>
-                </button>
-                <button onclick="showDeleteModal(${item.id})" class="text-red-600 hover:text-red-900">
-                    <i class="fas fa-trash"></i>
-                </button>
-            </td>
-        `;
-        
-        tbody.appendChild(row);
+        tbody.appendChild(renderItemRow(item));
     });
 }
 
+function renderItemRow(item) {
+    const row = document.createElement('tr');
+    row.className = 'hover:bg-gray-50 fade-in';
+    row.dataset.itemId = item.id;
+    
+    const stockClass = item.quantity <= 10 ? 'text-red-600 font-semibold' : 'text-gray-900';
+    const stockIcon = item.quantity <= 10 ? '<i class="fas fa-exclamation-triangle text-red-500 mr-1"></i>' : '';
+    
+    row.innerHTML = `
+        <td class="px-6 py-4 whitespace-nowrap">
+            <div class="flex items-center">
+                <div>
+                    <div class="text-sm font-medium text-gray-900">${item.name}</div>
+                    <div class="text-sm text-gray-500">${item.description || 'No description'}</div>
+                </div>
+            </div>
+        </td>
+        <td class="px-6 py-4 whitespace-nowrap">
+            <span class="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium bg-blue-100 text-blue-800">
+                ${item.category}
+            </span>
+        </td>
+        <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900 font-mono">
+            ${item.sku}
+        </td>
+        <td class="px-6 py-4 whitespace-nowrap">
+            <span class="${stockClass}">${stockIcon}${item.quantity}</span>
+        </td>
+        <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900">
+            $${parseFloat(item.price).toFixed(2)}
+        </td>
+        <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
+            ${item.location || 'N/A'}
+        </td>
+        <td class="px-6 py-4 whitespace-nowrap text-sm font-medium">
+            <button onclick="editItem(${item.id})" class="text-blue-600 hover:text-blue-900 mr-3">
+                <i class="fas fa-edit"></i>
+            </button>
+            <button onclick="showDeleteModal(${item.id})" class="text-red-600 hover:text-red-900">
+                <i class="fas fa-trash"></i>
+            </button>
+        </td>
+    `;
+    
+    return row;
+}
+
 function updatePagination(data) {
     const startItem = (data.page - 1) * data.per_page + 1;
     const endItem = Math.min(startItem + data.items.length - 1, data.total);
@@ -271,8 +298,10 @@ async function confirmDelete() {
         await apiCall(`/items/${itemsToDelete}`, { method: 'DELETE' });
         showNotification('Item deleted successfully');
         closeDeleteModal();
-        loadItems();
-        loadCategories();
+        if (!liveUpdates) {
+            loadItems();
+            loadCategories();
+        }
     } catch (error) {
         console.error('Error deleting item:', error);
     }
@@ -311,8 +340,10 @@ document.getElementById('itemForm').addEventListener('submit', async function(e)
         }
         
         closeModal();
-        loadItems();
-        loadCategories();
+        if (!liveUpdates) {
+            loadItems();
+            loadCategories();
+        }
     } catch (error) {
         console.error('Error saving item:', error);
     }
@@ -325,19 +356,50 @@ document.getElementById('searchInput').addEventListener('input', function(e) {
     searchTimeout = setTimeout(() => {
         currentSearch = e.target.value;
         currentPage = 1;
-        loadItems();
+        loadCurrentView();
     }, 300);
 });
 
 document.getElementById('categoryFilter').addEventListener('change', function(e) {
     currentCategory = e.target.value;
     currentPage = 1;
-    if (currentCategory) {
+    loadCurrentView();
+});
+
+document.getElementById('sortBy').addEventListener('change', function(e) {
+    currentSort = e.target.value;
+    currentPage = 1;
+    loadCurrentView();
+});
+
+// A sort order, or a category and a search together, needs the query
+// endpoint; the plain list and category routes cover everything else
+function loadCurrentView() {
+    if (currentSort || (currentCategory && currentSearch)) {
+        loadQueryItems();
+    } else if (currentCategory) {
         loadCategoryItems();
     } else {
         loadItems();
     }
-});
+}
+
+async function loadQueryItems() {
+    showLoading();
+    try {
+        const params = new URLSearchParams({page: currentPage, per_page: itemsPerPage});
+        if (currentCategory) params.append('category', currentCategory);
+        if (currentSearch) params.append('search', currentSearch);
+        if (currentSort) params.append('sort', currentSort);
+        const data = await apiCall(`/items/query?${params}`);
+        displayItems(data.items);
+        updatePagination(data);
+    } catch (error) {
+        console.error('Error querying items:', error);
+    } finally {
+        hideLoading();
+    }
+}
 
 async function loadCategoryItems() {
     showLoading();
@@ -356,21 +418,13 @@ async function loadCategoryItems() {
 function previousPage() {
     if (currentPage > 1) {
         currentPage--;
-        if (currentCategory) {
-            loadCategoryItems();
-        } else {
-            loadItems();
-        }
+        loadCurrentView();
     }
 }
 
 function nextPage() {
     currentPage++;
-    if (currentCategory) {
-        loadCategoryItems();
-    } else {
-        loadItems();
-    }
+    loadCurrentView();
 }
 
 // Refresh function
@@ -378,8 +432,10 @@ async function refreshData() {
     currentPage = 1;
     currentSearch = '';
     currentCategory = '';
+    currentSort = '';
     document.getElementById('searchInput').value = '';
     document.getElementById('categoryFilter').value = '';
+    document.getElementById('sortBy').value = '';
     
     await Promise.all([
         loadItems(),
@@ -390,6 +446,67 @@ async function refreshData() {
     showNotification('Data refreshed successfully');
 }
 
+// Live updates from the server's change feed
+let liveUpdates = false;
+let viewReloadTimeout;
+let statsReloadTimeout;
+
+function reloadCurrentView() {
+    clearTimeout(viewReloadTimeout);
+    viewReloadTimeout = setTimeout(loadCurrentView, 500);
+}
+
+function reloadStatistics() {
+    clearTimeout(statsReloadTimeout);
+    statsReloadTimeout = setTimeout(() => {
+        loadCategories();
+        loadLowStockCount();
+    }, 1000);
+}
+
+function findItemRow(itemId) {
+    return document.querySelector(`#itemsTableBody tr[data-item-id="${itemId}"]`);
+}
+
+function applyItemUpdate(item) {
+    const row = findItemRow(item.id);
+    if (!row) {
+        // Not on screen; it only matters if it now matches the search
+        if (currentSearch) reloadCurrentView();
+        return;
+    }
+    // Leaving the category, or a new sort key value, can move it off this page
+    if ((currentCategory && item.category !== currentCategory) || currentSort) {
+        reloadCurrentView();
+        return;
+    }
+    row.replaceWith(renderItemRow(item));
+}
+
+function connectLiveUpdates() {
+    if (!window.EventSource) return;
+    // EventSource reconnects by itself and resumes from the last event id
+    const source = new EventSource(`${API_BASE}/events`);
+    source.onopen = () => { liveUpdates = true; };
+    source.onerror = () => { liveUpdates = false; };
+    
+    source.addEventListener('update', e => {
+        applyItemUpdate(JSON.parse(e.data).item);
+        reloadStatistics();
+    });
+    source.addEventListener('delete', e => {
+        const row = findItemRow(JSON.parse(e.data).item_id);
+        if (row) reloadCurrentView();
+        reloadStatistics();
+    });
+    for (const type of ['create', 'bulk', 'reset']) {
+        source.addEventListener(type, () => {
+            reloadCurrentView();
+            reloadStatistics();
+        });
+    }
+}
+
 // Initialize app
 async function initApp() {
     showLoading();
@@ -405,6 +522,7 @@ async function initApp() {
     } finally {
         hideLoading();
     }
+    connectLiveUpdates();
 }
 
 // Start the app when DOM is loaded
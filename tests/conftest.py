@@ -0,0 +1,37 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Point the app at a scratch database before anything imports database.py
+DATA_DIR = tempfile.mkdtemp(prefix="inventory-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{DATA_DIR}/inventory.db"
+os.environ.setdefault("EVENT_POLL_INTERVAL", "0")
+os.chdir(Path(__file__).resolve().parent.parent)
+
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope="session")
+def client():
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+@pytest.fixture
+def make_item(client):
+    """Create an item with a unique SKU and return it"""
+    created = []
+
+    def make(**fields):
+        body = {"name": "Widget", "category": "Tools", "price": 1.5, "quantity": 0, **fields}
+        body.setdefault("sku", f"T-{len(created)}-{os.urandom(4).hex()}")
+        response = client.post("/api/items", json=body)
+        assert response.status_code == 201, response.text
+        created.append(response.json())
+        return created[-1]
+
+    return make
@@ -0,0 +1,73 @@
+import gzip
+import hashlib
+import sqlite3
+
+import pytest
+
+from backup import BackupError, create_snapshot, list_snapshots, restore_snapshot, verify_snapshot
+from database import database_file
+
+def item_count(path) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT count(*) FROM items").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_api_snapshot_is_listed_with_its_manifest(client, make_item):
+    make_item()
+    response = client.post("/api/admin/backups", params={"check": True})
+    assert response.status_code == 201
+    manifest = response.json()
+    assert manifest["compression"] == "gzip"
+    assert manifest["name"] in [backup["name"] for backup in client.get("/api/admin/backups").json()]
+
+def test_manifest_describes_the_stored_file(client, make_item, tmp_path):
+    make_item()
+    manifest = create_snapshot(directory=tmp_path, step_sleep=0)
+    stored = (tmp_path / manifest["file"]).read_bytes()
+    assert hashlib.sha256(stored).hexdigest() == manifest["sha256"]
+    assert len(gzip.decompress(stored)) == manifest["size"] == manifest["pages"] * manifest["page_size"]
+    conn = sqlite3.connect(database_file())
+    try:
+        version = conn.execute("SELECT version FROM table_versions WHERE name = 'items'").fetchone()[0]
+    finally:
+        conn.close()
+    assert manifest["items_version"] == version
+
+def test_restore_round_trips_the_catalog(client, make_item, tmp_path):
+    make_item()
+    manifest = create_snapshot(directory=tmp_path, step_sleep=0, level=0)
+    restored = tmp_path / "restored.db"
+    restore_snapshot(manifest["name"], database=str(restored), directory=tmp_path, check=True)
+    assert item_count(restored) == item_count(database_file())
+
+def test_damaged_snapshot_is_refused_and_leaves_the_database_alone(client, tmp_path):
+    manifest = create_snapshot(directory=tmp_path, step_sleep=0)
+    stored = tmp_path / manifest["file"]
+    data = bytearray(stored.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    stored.write_bytes(bytes(data))
+    target = tmp_path / "target.db"
+    target.write_bytes(b"untouched")
+    with pytest.raises(BackupError):
+        verify_snapshot(manifest["name"], tmp_path)
+    with pytest.raises(BackupError):
+        restore_snapshot(manifest["name"], database=str(target), directory=tmp_path)
+    assert target.read_bytes() == b"untouched"
+
+def test_restore_refuses_a_database_in_use(client, tmp_path):
+    manifest = create_snapshot(directory=tmp_path, step_sleep=0)
+    target = tmp_path / "busy.db"
+    conn = sqlite3.connect(target)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("CREATE TABLE t (x)")
+        with pytest.raises(BackupError, match="in use"):
+            restore_snapshot(manifest["name"], database=str(target), directory=tmp_path)
+    finally:
+        conn.close()
+
+def test_old_snapshots_are_pruned(client, tmp_path):
+    names = [create_snapshot(directory=tmp_path, step_sleep=0, keep=2)["name"] for _ in range(3)]
+    assert [manifest["name"] for manifest in list_snapshots(tmp_path)] == names[:0:-1]
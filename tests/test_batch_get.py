@@ -0,0 +1,25 @@
+from models import BATCH_GET_MAX_KEYS
+
+def batch_get(client, **keys):
+    return client.post("/api/items/batch-get", json=keys)
+
+def test_results_follow_request_order_ids_then_skus(client, make_item):
+    first, second = make_item(), make_item()
+    response = batch_get(client, ids=[second["id"], 10**9, first["id"], second["id"]], skus=["NOPE-SKU", first["sku"]])
+    assert response.status_code == 200
+    body = response.json()
+    assert [(result["status"], result["id"], result["sku"]) for result in body["results"]] == [
+        ("found", second["id"], second["sku"]),
+        ("not_found", 10**9, None),
+        ("found", first["id"], first["sku"]),
+        ("found", second["id"], second["sku"]),
+        ("not_found", None, "NOPE-SKU"),
+        ("found", first["id"], first["sku"]),
+    ]
+    assert (body["total"], body["found"], body["not_found"]) == (6, 4, 2)
+    assert body["results"][0]["item"] == client.get(f"/api/items/{second['id']}").json()
+    assert body["results"][1]["item"] is None
+
+def test_key_count_is_validated(client):
+    assert batch_get(client).status_code == 422
+    assert batch_get(client, ids=list(range(1, BATCH_GET_MAX_KEYS + 2))).status_code == 422
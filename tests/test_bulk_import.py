@@ -0,0 +1,33 @@
+import os
+
+import bulk
+
+def unique_sku(prefix: str) -> str:
+    return f"{prefix}-{os.urandom(4).hex()}"
+
+def test_malformed_array_reports_the_batches_already_written(client):
+    rows = [
+        f'{{"sku": "{unique_sku("IMP")}", "name": "Widget", "category": "Tools", "price": 1.5}}'
+        for _ in range(bulk.BULK_BATCH_SIZE + 3)
+    ]
+    body = "[" + ",".join(rows) + ", {oops}]"
+    response = client.post("/api/items/bulk", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+    detail = response.json()["detail"]
+    assert detail["error"] == f"Malformed JSON array after row {bulk.BULK_BATCH_SIZE + 3}"
+    assert (detail["total"], detail["created"]) == (bulk.BULK_BATCH_SIZE, bulk.BULK_BATCH_SIZE)
+    assert detail["results"][-1]["row"] == bulk.BULK_BATCH_SIZE
+    assert client.get(f"/api/items/{detail['results'][-1]['id']}").status_code == 200
+
+def test_oversized_record_is_rejected_before_it_is_buffered(client, monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_MAX_RECORD_SIZE", 100)
+    body = '[{"sku": "' + "x" * 200
+    response = client.post("/api/items/bulk", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+    assert response.json()["detail"]["error"] == "Record exceeds 100 characters"
+
+def test_oversized_ndjson_line_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_MAX_RECORD_SIZE", 100)
+    response = client.post("/api/items/bulk", content="x" * 200, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 400
+    assert response.json()["detail"]["total"] == 0
@@ -0,0 +1,52 @@
+import os
+
+def unique_sku(prefix: str) -> str:
+    return f"{prefix}-{os.urandom(4).hex()}"
+
+def test_unknown_sku_repeated_is_not_found_every_time(client):
+    sku = unique_sku("MISSING")
+    response = client.put("/api/items/bulk", json=[
+        {"sku": sku, "quantity_delta": 3},
+        {"sku": sku, "quantity_delta": 4},
+    ])
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["status"] for result in body["results"]] == ["not_found", "not_found"]
+    assert all(result["id"] is None for result in body["results"])
+    assert (body["created"], body["updated"], body["failed"]) == (0, 0, 2)
+
+def test_repeated_sku_applies_in_order(client, make_item):
+    item = make_item(quantity=10)
+    created = unique_sku("NEW")
+    response = client.put("/api/items/bulk", json=[
+        {"sku": item["sku"], "quantity_delta": 5},
+        {"sku": created, "name": "Gadget", "category": "Tools", "quantity_delta": 2},
+        {"sku": item["sku"], "quantity_delta": -3},
+        {"sku": created, "quantity_delta": 4},
+    ])
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["status"] for result in body["results"]] == ["updated", "created", "updated", "updated"]
+    assert (body["created"], body["updated"], body["failed"]) == (1, 3, 0)
+    assert client.get(f"/api/items/{item['id']}").json()["quantity"] == 12
+    assert body["results"][3]["quantity"] == 6
+
+def test_delta_below_zero_is_rejected_like_a_pick(client, make_item):
+    item = make_item(quantity=4)
+    response = client.put("/api/items/bulk", json=[
+        {"sku": item["sku"], "quantity_delta": -3},
+        {"sku": item["sku"], "quantity_delta": -3},
+    ])
+    body = response.json()
+    assert [result["status"] for result in body["results"]] == ["updated", "rejected"]
+    assert body["results"][1]["error"] == f"Insufficient stock for SKU '{item['sku']}': 1 available"
+    assert client.get(f"/api/items/{item['id']}").json()["quantity"] == 1
+
+def test_new_sku_with_a_negative_delta_is_rejected(client):
+    sku = unique_sku("NEW")
+    body = client.put("/api/items/bulk", json=[
+        {"sku": sku, "name": "Gadget", "category": "Tools", "quantity_delta": -2},
+    ]).json()
+    assert body["results"][0]["status"] == "rejected"
+    lookup = client.post("/api/items/batch-get", json={"skus": [sku]}).json()
+    assert lookup["results"][0]["status"] == "not_found"
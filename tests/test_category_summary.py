@@ -0,0 +1,43 @@
+import os
+
+from database import check_category_summary
+
+def unique_category() -> str:
+    return f"Cat-{os.urandom(4).hex()}"
+
+def summary(client, category):
+    response = client.get("/api/categories")
+    assert response.status_code == 200
+    rows = [row for row in response.json() if row["category"] == category]
+    return rows[0] if rows else None
+
+def test_summary_follows_item_writes(client, make_item):
+    category, other = unique_category(), unique_category()
+    first = make_item(category=category, quantity=3, price=2.0)
+    second = make_item(category=category, quantity=5, price=1.0)
+    assert summary(client, category) == {
+        "category": category, "item_count": 2, "total_quantity": 8, "total_value": 11.0,
+    }
+    client.put(f"/api/items/{first['id']}", json={"quantity": 4, "price": 2.5})
+    assert summary(client, category)["total_value"] == 15.0
+    client.put(f"/api/items/{second['id']}", json={"category": other})
+    assert summary(client, category)["item_count"] == 1
+    assert summary(client, other)["total_quantity"] == 5
+    assert client.delete(f"/api/items/{first['id']}").status_code == 204
+    assert summary(client, category) is None
+
+def test_summary_follows_bulk_writes(client):
+    category = unique_category()
+    rows = [
+        {"sku": f"{category}-{index}", "name": "Widget", "category": category, "price": 2.0, "quantity": 1}
+        for index in range(3)
+    ]
+    assert client.post("/api/items/bulk", json=rows).json()["created"] == 3
+    assert client.put("/api/items/bulk", json=[{"sku": f"{category}-0", "quantity_delta": 4}]).status_code == 200
+    assert summary(client, category) == {
+        "category": category, "item_count": 3, "total_quantity": 7, "total_value": 14.0,
+    }
+
+def test_summary_matches_a_full_recount(client, make_item):
+    make_item(category=unique_category(), quantity=2)
+    assert check_category_summary(repair=False) == []
@@ -0,0 +1,60 @@
+import asyncio
+
+import events
+from events import ChangeFeed, change_feed
+
+def replay(client, last_event_id, count):
+    with client.websocket_connect(f"/api/events/ws?last_event_id={last_event_id}") as websocket:
+        return [websocket.receive_json() for _ in range(count)]
+
+def test_reconnect_replays_missed_writes_in_order(client, make_item):
+    marker = f"{change_feed.epoch}-{change_feed.seq}"
+    item = make_item(quantity=1)
+    client.put(f"/api/items/{item['id']}", json={"name": "Renamed"})
+    client.delete(f"/api/items/{item['id']}")
+    events = replay(client, marker, 3)
+    assert [event["type"] for event in events] == ["create", "update", "delete"]
+    assert events[1]["item"]["name"] == "Renamed"
+    assert events[2]["item_id"] == item["id"]
+    assert [event["seq"] for event in events] == sorted(event["seq"] for event in events)
+
+def test_bulk_writes_publish_the_ids_they_touched(client, make_item):
+    item = make_item()
+    marker = f"{change_feed.epoch}-{change_feed.seq}"
+    client.put("/api/items/bulk", json=[{"sku": item["sku"], "quantity_delta": 2}])
+    event = replay(client, marker, 1)[0]
+    assert (event["type"], event["ids"]) == ("bulk", [item["id"]])
+
+def test_unknown_event_id_gets_a_reset(client):
+    assert replay(client, "stale-1", 1)[0]["type"] == "reset"
+
+def test_sse_frames_carry_id_and_type():
+    async def frames():
+        feed = ChangeFeed()
+        feed.item_deleted(7)
+        stream = feed.sse_stream(f"{feed.epoch}-0")
+        chunks = [await stream.__anext__(), await stream.__anext__()]
+        await stream.aclose()
+        return feed, chunks
+
+    feed, (retry, frame) = asyncio.run(frames())
+    assert retry == b"retry: 3000\n\n"
+    assert frame.startswith(f"id: {feed.epoch}-1\nevent: delete\ndata: ".encode())
+
+def test_slow_subscriber_is_reset_instead_of_growing(monkeypatch):
+    monkeypatch.setattr(events, "EVENT_QUEUE_SIZE", 2)
+
+    async def receive():
+        feed = ChangeFeed()
+        subscription = feed.subscribe()
+        first = asyncio.ensure_future(subscription.__anext__())
+        await asyncio.sleep(0)
+        for item_id in range(5):
+            feed.item_deleted(item_id)
+        received = [await first, await subscription.__anext__()]
+        await subscription.aclose()
+        return received
+
+    first, second = asyncio.run(receive())
+    assert first["type"] == "delete"
+    assert second["type"] == "reset"
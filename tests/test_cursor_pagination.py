@@ -0,0 +1,35 @@
+import pytest
+
+from serialization import encode_cursor
+
+
+@pytest.mark.parametrize("url, values", [
+    ("/api/items", [{"a": 1}]),
+    ("/api/items", ["x"]),
+    ("/api/items", [True]),
+    ("/api/items", [None]),
+    ("/api/items/category/Tools", ["x", "y"]),
+    ("/api/items/category/Tools", [1, 2]),
+    ("/api/items/query?sort=created_at", ["yesterday", 1]),
+    ("/api/items/query?sort=price", ["1.5", 1]),
+])
+def test_cursor_of_the_wrong_types_is_rejected(client, make_item, url, values):
+    make_item()
+    separator = "&" if "?" in url else "?"
+    response = client.get(f"{url}{separator}cursor={encode_cursor(values)}")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_cursor_walks_a_category(client, make_item):
+    category = "Cursor walk"
+    ids = {make_item(category=category, name=f"Widget {n}")["id"] for n in range(3)}
+    seen, cursor = set(), None
+    while True:
+        url = f"/api/items/category/{category}?per_page=2" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url).json()
+        seen.update(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ids
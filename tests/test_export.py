@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+import os
+
+import pyarrow
+
+def export(client, format, category, **headers):
+    response = client.get("/api/items/export", params={"format": format, "category": category}, headers=headers)
+    assert response.status_code == 200
+    return response
+
+def make_category(make_item, count=3):
+    category = f"Cat-{os.urandom(4).hex()}"
+    items = [make_item(category=category, name=f"Item, \"{index}\"", quantity=index, price=index + 0.5)
+             for index in range(count)]
+    return category, items
+
+def test_ndjson_exports_the_category_in_id_order(client, make_item):
+    category, items = make_category(make_item)
+    response = export(client, "ndjson", category)
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == [item["id"] for item in items]
+    assert rows[1]["name"] == 'Item, "1"'
+
+def test_csv_and_arrow_carry_the_same_rows(client, make_item):
+    category, _ = make_category(make_item)
+    expected = [json.loads(line) for line in export(client, "ndjson", category).text.splitlines()]
+
+    rows = list(csv.DictReader(io.StringIO(export(client, "csv", category).text)))
+    assert [(int(row["id"]), row["name"], float(row["price"])) for row in rows] == [
+        (row["id"], row["name"], row["price"]) for row in expected
+    ]
+
+    table = pyarrow.ipc.open_stream(export(client, "arrow", category).content).read_all()
+    assert table.column("id").to_pylist() == [row["id"] for row in expected]
+    assert table.column("quantity").type == pyarrow.int64()
+    assert table.column("name").to_pylist() == [row["name"] for row in expected]
+
+def test_gzip_is_applied_when_accepted(client, make_item):
+    category, items = make_category(make_item)
+    response = export(client, "ndjson", category, **{"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.text.splitlines()) == len(items)
+
+def test_unknown_format_is_rejected(client):
+    response = client.get("/api/items/export", params={"format": "xml"})
+    assert response.status_code == 400
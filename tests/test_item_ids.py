@@ -0,0 +1,8 @@
+def test_deleted_item_id_is_not_reused(client, make_item):
+    deleted = make_item(quantity=5)
+    assert client.delete(f"/api/items/{deleted['id']}").status_code == 204
+
+    item = make_item(quantity=2)
+    assert item["id"] > deleted["id"]
+    movements = client.get(f"/api/items/{item['id']}/movements").json()
+    assert [movement["delta"] for movement in movements["items"]] == [2]
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+@pytest.fixture
+def catalog(make_item):
+    tag = os.urandom(4).hex()
+    first, second = f"Cat-{tag}-a", f"Cat-{tag}-b"
+    rows = [
+        (first, "Bolt", 5.0, 10, "Shelf 1"),
+        (first, "Anchor", 5.0, 3, "Shelf 2"),
+        (first, "Clamp", 20.0, 0, "Shelf 1"),
+        (second, "Bolt", 5.0, 7, "Shelf 1"),
+        (second, "Drill", 80.0, 2, None),
+        (second, "Anchor", 5.0, 3, "Shelf 2"),
+    ]
+    items = [make_item(category=category, name=name, price=price, quantity=quantity, location=location)
+             for category, name, price, quantity, location in rows]
+    return first, second, items
+
+def query(client, **params):
+    response = client.get("/api/items/query", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_filters_combine_with_and_and_repeats_with_or(client, catalog):
+    first, second, items = catalog
+    body = query(client, category=[first, second], min_price=5, max_price=20, max_quantity=7)
+    expected = [item["id"] for item in items if 5 <= item["price"] <= 20 and item["quantity"] <= 7]
+    assert [item["id"] for item in body["items"]] == expected
+    assert body["total"] == len(expected)
+
+def test_cursor_walks_any_sort_order(client, catalog):
+    first, second, items = catalog
+    params = {"category": [first, second], "sort": "-price,name", "per_page": 2}
+    body, seen = query(client, **params), []
+    while True:
+        seen += [item["id"] for item in body["items"]]
+        if not body["next_cursor"]:
+            break
+        body = query(client, **params, cursor=body["next_cursor"])
+    expected = sorted(items, key=lambda item: (-item["price"], item["name"], item["id"]))
+    assert seen == [item["id"] for item in expected]
+
+def test_facets_count_every_match_not_just_the_page(client, catalog):
+    first, second, _ = catalog
+    body = query(client, category=[first, second], min_price=5, max_price=5, facets="category,location", per_page=1)
+    assert len(body["items"]) == 1
+    assert sorted((facet["value"], facet["count"]) for facet in body["facets"]["category"]) == [(first, 2), (second, 2)]
+    assert sorted((facet["value"], facet["count"]) for facet in body["facets"]["location"]) == [("Shelf 1", 2), ("Shelf 2", 2)]
+
+@pytest.mark.parametrize("params", [
+    {"sort": "colour"},
+    {"sort": "price,-price"},
+    {"facets": "price"},
+    {"min_price": 10, "max_price": 1},
+])
+def test_bad_queries_are_rejected(client, params):
+    assert client.get("/api/items/query", params=params).status_code == 400
@@ -0,0 +1,23 @@
+import pytest
+
+
+@pytest.mark.parametrize("field", ["name", "category", "quantity", "price", "sku"])
+def test_null_for_a_required_field_is_rejected(client, make_item, field):
+    item = make_item()
+    response = client.put(f"/api/items/{item['id']}", json={field: None})
+    assert response.status_code == 422
+    assert client.get(f"/api/items/{item['id']}").json()[field] == item[field]
+
+
+def test_null_for_an_optional_field_clears_it(client, make_item):
+    item = make_item(location="A-01")
+    response = client.put(f"/api/items/{item['id']}", json={"location": None})
+    assert response.status_code == 200
+    assert response.json()["location"] is None
+
+
+def test_taken_sku_is_a_conflict(client, make_item):
+    first, second = make_item(), make_item()
+    response = client.put(f"/api/items/{second['id']}", json={"sku": first["sku"]})
+    assert response.status_code == 409
+    assert first["sku"] in response.json()["detail"]
@@ -0,0 +1,24 @@
+import json
+import os
+from datetime import datetime
+
+import serialization
+from models import ItemListResponse
+
+def test_list_routes_match_the_validated_item(client, make_item):
+    category = f"Cat-{os.urandom(4).hex()}"
+    item = make_item(name=f"Gauge {category}", category=category, description="Brass – 1/4\"", quantity=1, price=12.25)
+    expected = client.get(f"/api/items/{item['id']}").json()
+    for path, params in [("/api/items", {"search": category}), (f"/api/items/category/{category}", {})]:
+        response = client.get(path, params=params)
+        assert response.status_code == 200
+        body = response.json()
+        ItemListResponse(**body)
+        assert expected in body["items"], path
+
+def test_stdlib_fallback_encodes_like_orjson(monkeypatch):
+    content = {"name": "Brass – 1/4\"", "price": 12.25, "created_at": datetime(2026, 1, 2, 3, 4, 5, 6)}
+    encoded = serialization.dumps(content)
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert json.loads(serialization.dumps(content)) == json.loads(encoded)
+    assert json.loads(encoded)["created_at"] == "2026-01-02T03:04:05.000006"
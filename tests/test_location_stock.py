@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+@pytest.fixture
+def bin_ids(client):
+    """Two bins in a new warehouse"""
+    suffix = os.urandom(4).hex()
+    warehouse = client.post("/api/locations", json={"name": f"Warehouse {suffix}", "kind": "warehouse"}).json()
+    zone = client.post("/api/locations", json={"name": "Aisle 1", "kind": "zone", "parent_id": warehouse["id"]}).json()
+    return [
+        client.post("/api/locations", json={"name": f"Shelf {n}", "kind": "bin", "parent_id": zone["id"]}).json()["id"]
+        for n in (1, 2)
+    ]
+
+def locations(client, item_id):
+    response = client.get(f"/api/items/{item_id}/locations")
+    assert response.status_code == 200
+    return response.json()
+
+def test_bins_allocate_the_items_own_stock(client, make_item, bin_ids):
+    item = make_item(quantity=100)
+    response = client.put(f"/api/items/{item['id']}/locations/{bin_ids[0]}", json={"quantity": 100})
+    assert response.status_code == 200
+    assert response.json()["item_quantity"] == 100
+    stock = locations(client, item["id"])
+    assert (stock["quantity"], stock["unassigned"]) == (100, 0)
+    assert stock["warehouses"][0]["quantity"] == 100
+
+    # Taking stock out of a bin returns it to the unassigned stock
+    response = client.put(f"/api/items/{item['id']}/locations/{bin_ids[0]}", json={"quantity": 60})
+    assert response.status_code == 200
+    stock = locations(client, item["id"])
+    assert (stock["quantity"], stock["unassigned"]) == (100, 40)
+
+def test_bin_beyond_unassigned_stock_is_rejected(client, make_item, bin_ids):
+    item = make_item(quantity=10)
+    assert client.put(f"/api/items/{item['id']}/locations/{bin_ids[0]}", json={"quantity": 6}).status_code == 200
+    response = client.put(f"/api/items/{item['id']}/locations/{bin_ids[1]}", json={"quantity": 5})
+    assert response.status_code == 409
+    stock = locations(client, item["id"])
+    assert (stock["quantity"], stock["unassigned"]) == (10, 4)
+    assert [location["quantity"] for location in stock["locations"]] == [6]
+
+def test_quantity_edit_below_binned_stock_is_rejected(client, make_item, bin_ids):
+    item = make_item(quantity=100)
+    client.put(f"/api/items/{item['id']}/locations/{bin_ids[0]}", json={"quantity": 70})
+
+    response = client.put(f"/api/items/{item['id']}", json={"quantity": 0})
+    assert response.status_code == 409
+    stock = locations(client, item["id"])
+    assert (stock["quantity"], stock["unassigned"]) == (100, 30)
+    assert client.get("/api/warehouses").status_code == 200
+
+    # Down to the binned total is fine
+    response = client.put(f"/api/items/{item['id']}", json={"quantity": 70})
+    assert response.status_code == 200
+    assert locations(client, item["id"])["unassigned"] == 0
+
+def test_picks_and_upserts_keep_binned_stock(client, make_item, bin_ids):
+    item = make_item(quantity=20)
+    client.put(f"/api/items/{item['id']}/locations/{bin_ids[0]}", json={"quantity": 15})
+
+    response = client.post(f"/api/items/{item['id']}/movements", json={"kind": "pick", "quantity": 6})
+    assert response.status_code == 400
+    assert client.post(f"/api/items/{item['id']}/movements", json={"kind": "pick", "quantity": 5}).status_code == 201
+
+    body = client.put("/api/items/bulk", json=[{"sku": item["sku"], "quantity": 3}]).json()
+    assert body["results"][0]["status"] == "rejected"
+    body = client.put("/api/items/bulk", json=[{"sku": item["sku"], "quantity_delta": -1}]).json()
+    assert body["results"][0]["status"] == "rejected"
+    assert "0 available outside bins" in body["results"][0]["error"]
+    assert client.get(f"/api/items/{item['id']}").json()["quantity"] == 15
+    assert locations(client, item["id"])["unassigned"] == 0
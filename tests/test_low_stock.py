@@ -0,0 +1,28 @@
+import pytest
+
+def low_stock_count(client, threshold):
+    response = client.get("/api/items/low-stock", params={"threshold": threshold, "count_only": True})
+    assert response.status_code == 200
+    return response.json()["count"]
+
+@pytest.mark.parametrize("threshold", [3, 50])
+def test_count_tracks_items_at_or_below_the_threshold(client, make_item, threshold):
+    before = low_stock_count(client, threshold)
+    make_item(quantity=threshold)
+    make_item(quantity=threshold + 1)
+    assert low_stock_count(client, threshold) == before + 1
+
+def test_cursor_pages_lowest_quantity_first(client, make_item):
+    for quantity in (2, 0, 1, 2):
+        make_item(quantity=quantity)
+    params = {"threshold": 2, "per_page": 3}
+    first = client.get("/api/items/low-stock", params=params).json()
+    seen, body = [], first
+    while True:
+        seen += [(item["quantity"], item["id"]) for item in body["items"]]
+        if not body["next_cursor"]:
+            break
+        body = client.get("/api/items/low-stock", params={**params, "cursor": body["next_cursor"]}).json()
+    assert seen == sorted(seen)
+    assert all(quantity <= 2 for quantity, _ in seen)
+    assert len(seen) == first["total"] == low_stock_count(client, 2)
@@ -0,0 +1,58 @@
+import json
+import os
+
+import pytest
+from sqlalchemy import text
+
+from database import engine
+from replica import catalog_replica
+from serialization import dumps, item_list_payload
+
+@pytest.fixture
+def replica(client):
+    client.portal.call(catalog_replica.load)
+    yield catalog_replica
+    catalog_replica.close()
+
+def as_json(payload):
+    return json.loads(dumps(payload))
+
+def test_replica_answers_like_the_database(client, make_item):
+    category = f"Cat-{os.urandom(4).hex()}"
+    word = f"qz{os.urandom(4).hex()}"
+    for quantity in (0, 4, 12):
+        make_item(category=category, name=f"Valve {word}", quantity=quantity)
+    make_item(category=category, name="Hose", description=f"fits the {word} valve", quantity=2)
+    from_database = {
+        "category": client.get(f"/api/items/category/{category}", params={"per_page": 3}).json(),
+        "search": client.get("/api/items", params={"search": word[:7]}).json(),
+        "low_stock": client.get("/api/items/low-stock", params={"count_only": True}).json()["count"],
+    }
+
+    client.portal.call(catalog_replica.load)
+    try:
+        page = catalog_replica.get_category(category, per_page=3)
+        assert as_json(item_list_payload(page)) == from_database["category"]
+        assert as_json(item_list_payload(catalog_replica.search_items(word[:7]))) == from_database["search"]
+        assert catalog_replica.count_low_stock() == from_database["low_stock"]
+    finally:
+        catalog_replica.close()
+
+def test_api_writes_are_applied_in_place(client, make_item, replica):
+    loads = replica.loads
+    item = make_item(quantity=3)
+    assert replica.get_one(item["id"]).quantity == 3
+    client.put(f"/api/items/{item['id']}", json={"name": "Renamed"})
+    assert replica.get_one(item["id"]).name == "Renamed"
+    assert replica.get_by_sku(item["sku"]).id == item["id"]
+    client.delete(f"/api/items/{item['id']}")
+    assert replica.get_one(item["id"]) is None
+    assert client.get(f"/api/items/{item['id']}").status_code == 404
+    assert (replica.ready, replica.loads) == (True, loads)
+
+def test_writes_from_outside_the_process_are_noticed(client, make_item, replica):
+    item = make_item()
+    assert not client.portal.call(replica._behind)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE items SET name = 'Elsewhere' WHERE id = :id"), {"id": item["id"]})
+    assert client.portal.call(replica._behind)
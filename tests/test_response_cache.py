@@ -0,0 +1,27 @@
+def test_item_sub_resources_are_not_cached(client, make_item):
+    item = make_item(quantity=5)
+    first = client.get(f"/api/items/{item['id']}/stock")
+    assert first.status_code == 200
+    assert "etag" not in first.headers
+    assert "etag" not in client.get(f"/api/items/{item['id']}/movements").headers
+    assert "etag" not in client.get(f"/api/items/{item['id']}/locations").headers
+
+
+def test_list_and_item_routes_are_cached(client, make_item):
+    item = make_item()
+    for url in ("/api/items", f"/api/items/{item['id']}", "/api/items/category/Tools", "/api/categories"):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert client.get(url, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+
+def test_wildcard_does_not_hide_a_missing_item(client):
+    response = client.get("/api/items/999999", headers={"If-None-Match": "*"})
+    assert response.status_code == 404
+
+
+def test_wildcard_matches_a_cached_response(client, make_item):
+    item = make_item()
+    url = f"/api/items/{item['id']}"
+    assert client.get(url, headers={"If-None-Match": "*"}).status_code == 200
+    assert client.get(url, headers={"If-None-Match": "*"}).status_code == 304
@@ -0,0 +1,38 @@
+import os
+
+def unique_word() -> str:
+    return f"qz{os.urandom(4).hex()}"
+
+def search(client, term):
+    response = client.get("/api/items", params={"search": term})
+    assert response.status_code == 200
+    return response.json()
+
+def test_every_word_matches_as_a_prefix(client, make_item):
+    word = unique_word()
+    match = make_item(name=f"Laptop {word}")
+    make_item(name=f"Desktop {word}")
+    body = search(client, f"{word[:6]} lap")
+    assert [item["id"] for item in body["items"]] == [match["id"]]
+    assert body["total"] == 1
+
+def test_name_matches_rank_above_description_matches(client, make_item):
+    word = unique_word()
+    in_description = make_item(name="Cable", description=f"Spare {word} cable")
+    in_name = make_item(name=f"Cable {word}")
+    body = search(client, word)
+    assert [item["id"] for item in body["items"]] == [in_name["id"], in_description["id"]]
+
+def test_index_follows_updates_and_deletes(client, make_item):
+    old, new = unique_word(), unique_word()
+    item = make_item(name=f"Drill {old}")
+    assert client.put(f"/api/items/{item['id']}", json={"name": f"Drill {new}"}).status_code == 200
+    assert search(client, old)["total"] == 0
+    assert [found["id"] for found in search(client, new)["items"]] == [item["id"]]
+    assert client.delete(f"/api/items/{item['id']}").status_code == 204
+    assert search(client, new)["total"] == 0
+
+def test_terms_without_words_fall_back_to_a_substring_scan(client, make_item):
+    word = unique_word()
+    item = make_item(name=f"Bracket {word}", sku=f"{word}-#%")
+    assert [found["id"] for found in search(client, "-#%")["items"]] == [item["id"]]
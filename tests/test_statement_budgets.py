@@ -0,0 +1,19 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+@pytest.mark.parametrize("async_sessions", ["on", "off"])
+def test_routes_stay_within_their_statement_budgets(tmp_path, async_sessions):
+    # benchmarks/statement_counts.py points the app at its own scratch
+    # database at import, so it runs in a process of its own
+    env = {**os.environ, "ASYNC_SESSIONS": async_sessions}
+    env.pop("DATABASE_URL", None)
+    result = subprocess.run(
+        [sys.executable, "benchmarks/statement_counts.py", "--rows", "2000", "--repeat", "3",
+         "--data-dir", str(tmp_path)],
+        env=env, capture_output=True, text=True, timeout=600
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -0,0 +1,10 @@
+def test_unknown_item_has_no_stock_or_movements(client):
+    assert client.get("/api/items/999999/stock").status_code == 404
+    assert client.get("/api/items/999999/movements").status_code == 404
+
+
+def test_deleted_item_has_no_stock_or_movements(client, make_item):
+    item = make_item(quantity=3)
+    assert client.delete(f"/api/items/{item['id']}").status_code == 204
+    assert client.get(f"/api/items/{item['id']}/stock").status_code == 404
+    assert client.get(f"/api/items/{item['id']}/movements").status_code == 404
@@ -0,0 +1,72 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from crud import ItemCRUD, _items_version
+from database import SessionLocal
+from models import ItemCreate, ItemUpdate
+from writes import WritePipeline, WriteQueueFull, write_pipeline
+
+def new_item(sku=None) -> ItemCreate:
+    return ItemCreate(name="Widget", category="Tools", price=1.5, quantity=1,
+                      sku=sku or f"WP-{os.urandom(4).hex()}")
+
+@pytest.fixture
+def pipeline(client):
+    client.portal.call(write_pipeline.start)
+    yield write_pipeline
+    client.portal.call(write_pipeline.close)
+
+def test_write_batch_isolates_failing_writes(client, make_item):
+    existing = make_item()
+    with SessionLocal() as db:
+        before = _items_version(db)
+        added = new_item()
+        results = ItemCRUD.write_batch(db, [
+            ("add", None, added),
+            ("add", None, new_item(existing["sku"])),
+            ("update", existing["id"], ItemUpdate(name="Batched")),
+            ("update", 10**9, ItemUpdate(name="Nobody")),
+            ("delete", existing["id"], None),
+        ])
+        after = _items_version(db)
+    assert results[0]["sku"] == added.sku
+    assert isinstance(results[1], IntegrityError)
+    assert results[2]["name"] == "Batched"
+    assert results[3] is None
+    assert results[4] is True
+    assert after == before + 3
+    assert client.get(f"/api/items/{results[0]['id']}").status_code == 200
+    assert client.get(f"/api/items/{existing['id']}").status_code == 404
+
+def test_concurrent_writes_share_a_commit(client, pipeline):
+    batches = pipeline.batches
+
+    async def burst():
+        return await asyncio.gather(*(pipeline.add(new_item()) for _ in range(20)))
+
+    created = client.portal.call(burst)
+    assert len({item["id"] for item in created}) == 20
+    assert pipeline.batches - batches < 20
+
+def test_routes_go_through_the_pipeline(client, pipeline):
+    writes = pipeline.writes
+    response = client.post("/api/items", json=new_item().dict())
+    assert response.status_code == 201
+    item = response.json()
+    assert client.put(f"/api/items/{item['id']}", json={"quantity": 7}).json()["quantity"] == 7
+    assert client.delete(f"/api/items/{item['id']}").status_code == 204
+    assert pipeline.writes == writes + 3
+
+def test_full_queue_gives_up_after_the_timeout():
+    async def submit_to_full_queue():
+        pipeline = WritePipeline(queue_size=1, queue_timeout=0.01)
+        pipeline.queue = asyncio.Queue(1)
+        pipeline.running = True
+        pipeline.queue.put_nowait(("delete", 1, None, None))
+        await pipeline.delete(2)
+
+    with pytest.raises(WriteQueueFull):
+        asyncio.run(submit_to_full_queue())
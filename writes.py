@@ -0,0 +1,180 @@
+"""
+Write pipeline: group commit for single-item writes.
+
+With WRITE_PIPELINE on, the add, update and delete item routes hand their
+write to one writer task per worker instead of each running its own
+transaction. The writer takes whatever has queued up, waiting up to
+WRITE_BATCH_DELAY for more, and applies up to WRITE_BATCH_SIZE writes in one
+transaction (ItemCRUD.write_batch). Each caller gets its own result once
+that transaction has committed, so a burst of scanner updates costs one
+commit (and with SQLITE_SYNCHRONOUS=FULL one fsync) per batch instead of
+one per request, and writers stop queueing on the database lock.
+
+The queue is bounded: when it holds WRITE_QUEUE_SIZE writes, callers wait
+for room, and give up with WriteQueueFull after WRITE_QUEUE_TIMEOUT.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import List, Optional
+
+from crud import ItemCRUD
+from database import SessionLocal
+from metrics import COUNT_BUCKETS, METRICS, Gauge, Histogram
+from models import ItemCreate, ItemUpdate
+
+logger = logging.getLogger(__name__)
+
+# Queue item writes for group commit (each worker runs one writer task)
+WRITE_PIPELINE = os.getenv("WRITE_PIPELINE", "off").lower() in ("1", "true", "on", "yes")
+
+# Most writes committed in one transaction
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", 200))
+
+# Seconds the writer waits for more writes before committing a partial batch.
+# At 0 a batch is whatever queued up while the previous one committed.
+WRITE_BATCH_DELAY = float(os.getenv("WRITE_BATCH_DELAY", 0))
+
+# Writes queued before callers have to wait for room
+WRITE_QUEUE_SIZE = int(os.getenv("WRITE_QUEUE_SIZE", 2000))
+
+# Seconds a caller waits for room in a full queue before giving up
+WRITE_QUEUE_TIMEOUT = float(os.getenv("WRITE_QUEUE_TIMEOUT", 5))
+
+WRITE_BATCH_SIZES = Histogram(
+    "inventory_write_batch_size", "Writes committed per group commit", (),
+    COUNT_BUCKETS + (500, 1000)
+)
+WRITE_COMMIT_LATENCY = Histogram(
+    "inventory_write_commit_seconds", "Time to apply and commit one group commit"
+)
+
+class WriteQueueFull(Exception):
+    """The write queue stayed full for WRITE_QUEUE_TIMEOUT"""
+
+class WritePipeline:
+    """Bounded queue of item writes drained by a single writer task.
+
+    Callers await submit() (or add, update and delete), which resolves with
+    what the matching ItemCRUD method returns, or raises its exception, once
+    the batch holding the write has committed. A write whose caller has gone
+    away is still committed.
+    """
+
+    def __init__(self, batch_size: int = WRITE_BATCH_SIZE, batch_delay: float = WRITE_BATCH_DELAY,
+                 queue_size: int = WRITE_QUEUE_SIZE, queue_timeout: float = WRITE_QUEUE_TIMEOUT):
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.running = False
+        self.batches = 0
+        self.writes = 0
+
+    def start(self):
+        """Start the writer task on the running event loop"""
+        self.queue = asyncio.Queue(self.queue_size)
+        self.task = asyncio.create_task(self._run())
+        self.running = True
+
+    async def close(self):
+        """Stop taking writes, commit everything already queued, and stop the writer"""
+        if not self.running:
+            return
+        self.running = False
+        await self.queue.put(None)
+        await self.task
+
+    async def submit(self, kind: str, item_id: Optional[int] = None, payload=None):
+        """Queue one write and wait until it has committed"""
+        if not self.running:
+            raise RuntimeError("The write pipeline is not running")
+        future = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(self.queue.put((kind, item_id, payload, future)), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise WriteQueueFull(f"{self.queue_size} writes already queued")
+        return await future
+
+    async def add(self, item: ItemCreate) -> dict:
+        return await self.submit("add", None, item)
+
+    async def update(self, item_id: int, item_update: ItemUpdate) -> Optional[dict]:
+        return await self.submit("update", item_id, item_update)
+
+    async def delete(self, item_id: int) -> bool:
+        return await self.submit("delete", item_id)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            write = await self.queue.get()
+            if write is None:
+                break
+            batch = [write]
+            deadline = loop.time() + self.batch_delay
+            while len(batch) < self.batch_size:
+                try:
+                    write = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        write = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if write is None:
+                    stopping = True
+                    break
+                batch.append(write)
+            await self._commit(batch)
+
+    async def _commit(self, batch: List[tuple]):
+        """Apply one batch and settle its callers' futures"""
+        start = time.perf_counter()
+        try:
+            results = await asyncio.to_thread(_write_batch, [write[:3] for write in batch])
+        except Exception as e:
+            logger.error(f"Group commit of {len(batch)} writes failed: {e}")
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        WRITE_COMMIT_LATENCY.observe(time.perf_counter() - start)
+        WRITE_BATCH_SIZES.observe(len(batch))
+        self.batches += 1
+        self.writes += len(batch)
+        for (*_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+def _write_batch(writes: List[tuple]) -> List[object]:
+    """Run a batch on the sync engine, in a worker thread: through aiosqlite
+    every statement would be a round trip through the busy event loop"""
+    with SessionLocal() as db:
+        return ItemCRUD.write_batch(db, writes)
+
+def _pipeline_status():
+    pipeline = write_pipeline
+    yield ("running",), int(pipeline.running)
+    yield ("queued",), pipeline.queue.qsize() if pipeline.queue is not None else 0
+    yield ("batches",), pipeline.batches
+    yield ("writes",), pipeline.writes
+
+write_pipeline = WritePipeline()
+
+METRICS.extend([
+    WRITE_BATCH_SIZES, WRITE_COMMIT_LATENCY,
+    Gauge("inventory_write_pipeline", "Write pipeline state: running (0/1), writes queued, batches and writes committed",
+          ("stat",), _pipeline_status),
+])